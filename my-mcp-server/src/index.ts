@@ -101,6 +101,223 @@ const tools = [
       },
       required: ["reference_slide_number", "target_slide_numbers", "shapes_to_align"],
     },
+  },
+  {
+    name: "align_layout_batch",
+    description: `Normalize the layout of many slides in ONE call by running a list of alignment jobs.
+  
+  WHAT IT DOES:
+  Each job copies selected geometry fields (left, top, width, height) of one shape role from a reference slide to target slides. All jobs run together, so a whole deck can be normalized without one call per shape type.
+  
+  WHEN TO USE:
+  - User says: "Standardize the layout of the whole deck using slide 2"
+  - User wants pictures, tables, charts, body placeholders or a named shape (e.g. a logo) aligned
+  - User only wants some fields copied, e.g. "line up the left edge of all charts"
+  
+  ROLES:
+  - "title", "subtitle", "footnote", "body", "picture", "table", "chart"
+  - "name:<shape name>" for a specific named shape, e.g. "name:Logo"
+  
+  JOB FIELDS:
+  - role: shape role to align (required)
+  - reference_slide_number: slide to copy FROM (required, 1-based)
+  - target_slide_numbers: slides to apply TO (optional, defaults to every other slide)
+  - fields: geometry fields to copy (optional, defaults to all four)
+  
+  EXAMPLE:
+  Query: "Make every slide's title and logo match slide 1, and left-align all charts with slide 3"
+  → jobs: [
+      {"role": "title", "reference_slide_number": 1},
+      {"role": "name:Logo", "reference_slide_number": 1, "fields": ["left", "top"]},
+      {"role": "chart", "reference_slide_number": 3, "fields": ["left"]}
+    ]
+  
+  IMPORTANT: Use 1-based indexing (slide 1 = first slide, not 0).
+  `,
+    inputSchema: {
+      type: "object",
+      properties: {
+        jobs: {
+          type: "array",
+          description: "Alignment jobs to run together",
+          items: {
+            type: "object",
+            properties: {
+              role: {
+                type: "string",
+                description: "Shape role: title, subtitle, footnote, body, picture, table, chart, or 'name:<shape name>'"
+              },
+              reference_slide_number: {
+                type: "number",
+                description: "Slide number to COPY the shape geometry FROM (1-based)"
+              },
+              target_slide_numbers: {
+                type: "array",
+                description: "Slide numbers to APPLY the geometry TO (1-based). Omit to target every other slide",
+                items: {
+                  type: "number"
+                }
+              },
+              fields: {
+                type: "array",
+                description: "Geometry fields to copy. Omit to copy all four",
+                items: {
+                  type: "string",
+                  enum: ["left", "top", "width", "height"]
+                }
+              }
+            },
+            required: ["role", "reference_slide_number"]
+          }
+        }
+      },
+      required: ["jobs"],
+    },
+  },
+  {
+    name: "run_batch_operations",
+    description: `Run several presentation edits in ONE call, all or nothing.
+  
+  WHAT IT DOES:
+  Executes an ordered list of API operations against the deck under a single lock. If any operation fails, every change made by the batch is rolled back.
+  
+  WHEN TO USE:
+  - Building or editing several slides in one step (create slide, add title, add bullets, align...)
+  - Any sequence of edits that should either fully apply or not apply at all
+  
+  OPERATION FORMAT:
+  - method: HTTP method of the route (default "POST")
+  - path: route path, e.g. "/api/v1/slide/{slide_id}/title"
+  - body: JSON body the route takes
+  - query: query parameters the route takes
+  Use "$<index>.<key>" to refer to a value returned by an earlier operation, e.g. "$0.slide_id".
+  
+  EXAMPLE:
+  Query: "Add a slide titled 'Q3 Review' with two bullets"
+  → operations: [
+      {"path": "/api/v1/slide", "query": {"layout": 1}},
+      {"path": "/api/v1/slide/$0.slide_id/title", "body": {"text": "Q3 Review"}},
+      {"path": "/api/v1/slide/$0.slide_id/bullet_points", "body": {"points": ["Revenue up", "Costs down"]}}
+    ]
+  `,
+    inputSchema: {
+      type: "object",
+      properties: {
+        operations: {
+          type: "array",
+          description: "Operations to run in order",
+          items: {
+            type: "object",
+            properties: {
+              method: { type: "string", description: "HTTP method, defaults to POST" },
+              path: { type: "string", description: "Route path; may contain $<index>.<key> references" },
+              body: { type: "object", description: "JSON body for the route" },
+              query: { type: "object", description: "Query parameters for the route" }
+            },
+            required: ["path"]
+          }
+        }
+      },
+      required: ["operations"],
+    },
+  },
+  {
+    name: "switch_theme",
+    description: `Switch the whole presentation to another theme, restyling existing slides.
+  
+  WHAT IT DOES:
+  Rewrites the fonts, sizes and colors of titles, subtitles, headings, body text and bullets on every slide to the new theme's styles, and replaces slide backgrounds. Slides created afterwards use the new theme as well.
+  
+  WHEN TO USE:
+  - "Make the deck use the pitchbook theme"
+  - "Switch slides 3-5 to the dark theme"
+  
+  Available themes: default, dark, modern, pitchbook, strategy_template
+  `,
+    inputSchema: {
+      type: "object",
+      properties: {
+        theme: {
+          type: "string",
+          description: "Name of the theme to switch to"
+        },
+        slide_numbers: {
+          type: "array",
+          items: { type: "number" },
+          description: "1-based slides to restyle (optional, defaults to all slides)"
+        },
+        backgrounds: {
+          type: "boolean",
+          description: "Also replace slide backgrounds (default true)"
+        }
+      },
+      required: ["theme"],
+    },
+  },
+  {
+    name: "add_components_bulk",
+    description: `Render many components across many slides in a single call.
+  
+  WHAT IT DOES:
+  Each item places one component (timeline, callout_box, two_column_text, ...) on a slide chosen by slide_id, 1-based slide_number, or a "new_slide" label. Items sharing a new_slide label go on the same new blank slide. All items are validated before anything is drawn, and each item gets its own result.
+  
+  WHEN TO USE:
+  - Building a whole deck from an outline in one step
+  - Adding the same kind of component to many slides
+  
+  Component types: header_with_image, bullet_with_title, two_column_text, comparison_table, icon_list, quote_block, timeline, process_flow, statistic_highlight, callout_box, section_divider, bar_chart, line_chart, pie_chart, scatter_chart
+  
+  Charts take columnar data: {"data": {"Month": ["Jan", "Feb"], "Revenue": [4.1, 5.3]}, "title": "..."} (or rows with a header row first). The first column is the categories (x values for scatter_chart), each other column a series. Large data is reduced on the server: line series are downsampled to max_points (default 1000, downsample "lttb" or "minmax"), scatter clouds thinned, and bar/pie rows grouped by category ("aggregate": "sum" or "mean") with the smallest folded into "Other" beyond max_categories.
+  `,
+    inputSchema: {
+      type: "object",
+      properties: {
+        items: {
+          type: "array",
+          items: {
+            type: "object",
+            properties: {
+              slide_id: { type: "string" },
+              slide_number: { type: "number" },
+              new_slide: { type: "string", description: "Label of a new blank slide to create" },
+              component_type: { type: "string" },
+              content: { type: "object" }
+            },
+            required: ["component_type", "content"]
+          },
+          description: "Components to render, each with exactly one of slide_id, slide_number or new_slide"
+        }
+      },
+      required: ["items"],
+    },
+  },
+  {
+    name: "generate_deck_from_outline",
+    description: `Append a whole deck from a structured outline in one call.
+  
+  WHAT IT DOES:
+  Creates one slide per outline entry, styled with the current theme. Large outlines are rendered in parallel on the server. If any slide fails, no slide is added.
+  
+  Slide types:
+  - {"type": "title", "title": "...", "subtitle": "..."}
+  - {"type": "section", "title": "..."}
+  - {"type": "bullets", "title": "...", "points": ["...", "..."]}
+  - {"type": "table", "title": "...", "data": [["Header", "..."], ["Row", "..."]]} (rows may be ragged; data can also be columns: {"Header": ["...", "..."]})
+  - {"type": "components", "components": [{"component_type": "timeline", "content": {...}}]}
+  Any slide may also set "layout" (slide layout index) and "components".
+  Tables too long for one slide continue on extra slides with the header row repeated, so more slide ids than outline entries can come back.
+  `,
+    inputSchema: {
+      type: "object",
+      properties: {
+        slides: {
+          type: "array",
+          items: { type: "object" },
+          description: "Outline slides in deck order"
+        }
+      },
+      required: ["slides"],
+    },
   }
 ];
 
@@ -142,6 +359,33 @@ server.setRequestHandler(CallToolRequestSchema, async (request) => {
           shapes_to_align: args?.shapes_to_align,
         });
         break;
+      case "align_layout_batch":
+        result = await callAPI("/api/v2/slides/align_batch", "POST", {
+          jobs: args?.jobs,
+        });
+        break;
+      case "run_batch_operations":
+        result = await callAPI("/api/v2/batch", "POST", {
+          operations: args?.operations,
+        });
+        break;
+      case "switch_theme":
+        result = await callAPI("/api/v2/theme/apply", "POST", {
+          theme: args?.theme,
+          slide_numbers: args?.slide_numbers,
+          backgrounds: args?.backgrounds,
+        });
+        break;
+      case "add_components_bulk":
+        result = await callAPI("/api/v2/slides/components", "POST", {
+          items: args?.items,
+        });
+        break;
+      case "generate_deck_from_outline":
+        result = await callAPI("/api/v2/presentation/generate", "POST", {
+          slides: args?.slides,
+        });
+        break;
       default:
         throw new Error(`Unknown tool: ${name}`);
     }
@@ -1,15 +1,23 @@
 from .main import app
-from .themes.theme import Theme, Style, THEMES
+from .themes.theme import Theme, Style
+from .themes.registry import THEMES, ThemeRegistry
 from .components.base import Component
 from .components.layouts import HeaderWithImage, BulletWithTitle, TwoColumnText
+from .components.registry import COMPONENTS
+from .state.session import PresentationSession
+from .state.store import SessionStore
 
 __all__ = [
     'app',
     'Theme',
     'Style',
     'THEMES',
+    'ThemeRegistry',
     'Component',
     'HeaderWithImage',
     'BulletWithTitle',
-    'TwoColumnText'
+    'TwoColumnText',
+    'COMPONENTS',
+    'PresentationSession',
+    'SessionStore'
 ] 
\ No newline at end of file
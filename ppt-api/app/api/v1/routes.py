@@ -1,29 +1,32 @@
 """
 API v1 routes - Deprecated endpoints
 """
-from fastapi import APIRouter, File
+from fastapi import APIRouter, Depends, File, Request, Response
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Any
 from pptx import Presentation
 from pptx.util import Inches
-import uuid
 import io
 import base64
 from pptx.enum.shapes import MSO_SHAPE_TYPE
 
-from ...themes.theme import THEMES
-from ...components.layouts import (
-    HeaderWithImage, BulletWithTitle, TwoColumnText,
-    ComparisonTable, IconList, QuoteBlock, Timeline, ProcessFlow, StatisticHighlight, CalloutBox, SectionDivider
-)
+from ...themes.registry import THEMES
+from ...state.dependencies import SessionRoute, get_session
+from ...state.session import PresentationSession
+from ...state.locks import read_locked, write_locked
+from ...state.parse_cache import ParseCache, content_digest
+from ...packaging.ingest import ingest_package
+from ...packaging.export import etag_matches
+from ...packaging.writer import COMPRESSION_LEVELS
+from ...components.registry import COMPONENTS, render_component
 from ...utils.text_formatting import apply_markdown_to_text_frame, configure_textbox_frame
 
-# This router will need access to global state from main.py
-# We'll pass these as dependencies or use a state management approach
-# For now, we'll import them - but they should be passed as dependencies in production
+# Every route resolves the caller's session (X-Session-Id header or session_id query param)
+# through the get_session dependency, then holds the session's lock: read_locked routes
+# run in parallel, write_locked routes are serialized per deck
 
-router = APIRouter(prefix="/api/v1", tags=["v1-deprecated"])
+router = APIRouter(prefix="/api/v1", tags=["v1-deprecated"], route_class=SessionRoute)
 
 # Models
 class ComponentContent(BaseModel):
@@ -64,59 +67,38 @@ class TitlePositionRequest(BaseModel):
     height: float
 
 
-# Helper function to get global state (will be injected from main)
-def get_state():
-    """Get global state from main.py"""
-    import sys
-    import importlib
-    # Import main module to access global state
-    # This avoids circular import by importing at runtime
-    main_module = sys.modules.get('app.main')
-    if main_module is None:
-        # If not already loaded, import it
-        import app.main as main_module
-    return main_module.prs, main_module.slide_map, main_module.current_theme
+def get_state(session: PresentationSession):
+    """Unpack a session into (prs, slide_map, current_theme)"""
+    return session.prs, session.slide_map, session.current_theme
 
 
 @router.post("/set/slideBase64")
-def set_slide_base64(req: SlideBase64Request):
+def set_slide_base64(req: SlideBase64Request, request: Request, session: PresentationSession = Depends(get_session)):
     """
     Initialize the presentation by clearing prs and loading from base64.
     This sets the current PowerPoint presentation we are working with.
+    Re-uploading bytes identical to an unedited deck skips parsing ("parse_skipped").
     DEPRECATED - Use v2 API instead
     """
-    import sys
-    import app.main as main_module
-    prs = main_module.prs
-    slide_map = main_module.slide_map
+    parse_cache: ParseCache = request.app.state.parse_cache
     
     try:
-        # Clear the current presentation and slide map
-        prs = Presentation()
-        slide_map.clear()
-        
-        # Decode the base64 string
+        # Decode and hash outside the lock so readers of the current deck are not blocked
         decoded_bytes = base64.b64decode(req.slideBase64)
+        digest = content_digest(decoded_bytes)
         
-        # Load the presentation from the decoded bytes
-        buffer = io.BytesIO(decoded_bytes)
-        prs = Presentation(buffer)
-        
-        # Optionally, populate slide_map with existing slides
-        for i, slide in enumerate(prs.slides):
-            slide_id = str(uuid.uuid4())
-            slide_map[slide_id] = slide
-        
-        # Update global state
-        main_module.prs = prs
-        main_module.slide_map = slide_map
+        parse_skipped = ingest_package(
+            session, parse_cache, digest, io.BytesIO(decoded_bytes), len(decoded_bytes)
+        )
         
-        return {
-            "status": "ok",
-            "message": "Presentation initialized from base64",
-            "slide_count": len(prs.slides),
-            "slide_ids": list(slide_map.keys())
-        }
+        with session.lock.read():
+            return {
+                "status": "ok",
+                "message": "Presentation initialized from base64",
+                "slide_count": len(session.prs.slides),
+                "slide_ids": list(session.slide_map.keys()),
+                "parse_skipped": parse_skipped
+            }
     except Exception as e:
         return {
             "status": "error",
@@ -131,20 +113,20 @@ def list_themes():
 
 
 @router.post("/theme")
-def set_theme(req: ThemeRequest):
+@write_locked
+def set_theme(req: ThemeRequest, session: PresentationSession = Depends(get_session)):
     """DEPRECATED - Use v2 API instead"""
     if req.theme_name not in THEMES:
         return {"error": "theme not found"}
-    import sys
-    import app.main as main_module
-    main_module.current_theme = THEMES[req.theme_name]
+    session.current_theme = THEMES[req.theme_name]
     return {"status": "ok"}
 
 
 @router.post("/slide/{slide_id}/title")
-def add_title(slide_id: str, req: TextRequest):
+@write_locked
+def add_title(slide_id: str, req: TextRequest, session: PresentationSession = Depends(get_session)):
     """Add title to a slide - DEPRECATED - Use v2 API instead"""
-    _, slide_map, current_theme = get_state()
+    _, slide_map, current_theme = get_state(session)
     
     if slide_id not in slide_map:
         return {"error": "slide not found"}
@@ -172,9 +154,10 @@ def add_title(slide_id: str, req: TextRequest):
 
 
 @router.post("/slide/{slide_id}/subtitle")
-def add_subtitle(slide_id: str, req: TextRequest):
+@write_locked
+def add_subtitle(slide_id: str, req: TextRequest, session: PresentationSession = Depends(get_session)):
     """Add subtitle to a slide - DEPRECATED - Use v2 API instead"""
-    _, slide_map, current_theme = get_state()
+    _, slide_map, current_theme = get_state(session)
     
     if slide_id not in slide_map:
         return {"error": "slide not found"}
@@ -210,9 +193,10 @@ def add_subtitle(slide_id: str, req: TextRequest):
 
 
 @router.post("/slide/{slide_id}/bullet_points")
-def add_bullet_points(slide_id: str, req: BulletPointsRequest):
+@write_locked
+def add_bullet_points(slide_id: str, req: BulletPointsRequest, session: PresentationSession = Depends(get_session)):
     """Add bullet points to a slide - DEPRECATED - Use v2 API instead"""
-    _, slide_map, current_theme = get_state()
+    _, slide_map, current_theme = get_state(session)
     
     if slide_id not in slide_map:
         return {"error": "slide not found"}
@@ -238,9 +222,10 @@ def add_bullet_points(slide_id: str, req: BulletPointsRequest):
 
 
 @router.post("/slide/{slide_id}/text_box")
-def add_text_box(slide_id: str, req: TextBoxRequest):
+@write_locked
+def add_text_box(slide_id: str, req: TextBoxRequest, session: PresentationSession = Depends(get_session)):
     """Add a text box to a slide - DEPRECATED - Use v2 API instead"""
-    _, slide_map, current_theme = get_state()
+    _, slide_map, current_theme = get_state(session)
     
     if slide_id not in slide_map:
         return {"error": "slide not found"}
@@ -259,46 +244,39 @@ def add_text_box(slide_id: str, req: TextBoxRequest):
 
 
 @router.post("/slide/{slide_id}/component")
-def add_component(slide_id: str, req: ComponentContent):
+@write_locked
+def add_component(slide_id: str, req: ComponentContent, session: PresentationSession = Depends(get_session)):
     """DEPRECATED - Use v2 API instead"""
-    _, slide_map, current_theme = get_state()
+    _, slide_map, current_theme = get_state(session)
     
     if slide_id not in slide_map:
         return {"error": "slide not found"}
     
     slide = slide_map[slide_id]
-    component_map = {
-        "header_with_image": HeaderWithImage,
-        "bullet_with_title": BulletWithTitle,
-        "two_column_text": TwoColumnText,
-        "comparison_table": ComparisonTable,
-        "icon_list": IconList,
-        "quote_block": QuoteBlock,
-        "timeline": Timeline,
-        "process_flow": ProcessFlow,
-        "statistic_highlight": StatisticHighlight,
-        "callout_box": CalloutBox,
-        "section_divider": SectionDivider
-    }
-    
-    if req.component_type not in component_map:
+    if req.component_type not in COMPONENTS:
         return {"error": "invalid component type"}
     
-    component_class = component_map[req.component_type]
-    component = component_class(theme=current_theme)
-    component.render(slide, req.content)
+    # Long tables continue on slides inserted right after this one
+    continuation = session.continuation(slide_id)
+    try:
+        render_component(slide, req.component_type, req.content, current_theme, new_slide=continuation)
+    except ValueError as e:
+        return {"error": str(e)}
     
+    if continuation.slide_ids:
+        return {"status": "ok", "continuation_slide_ids": continuation.slide_ids}
     return {"status": "ok"}
 
 
 @router.post("/slide")
-def create_slide(layout: int = 0):
+@write_locked
+def create_slide(layout: int = 0, session: PresentationSession = Depends(get_session)):
     """Create a new blank slide - DEPRECATED - Use v2 API instead"""
-    prs, slide_map, current_theme = get_state()
+    prs, slide_map, current_theme = get_state(session)
     
     slide = prs.slides.add_slide(prs.slide_layouts[layout])
-    slide_id = str(uuid.uuid4())
-    slide_map[slide_id] = slide
+    slide_id = session.new_slide_id()
+    slide_map.append(slide_id, slide)
     
     # Apply current theme to new slide
     current_theme.apply_to_slide(slide)
@@ -307,13 +285,14 @@ def create_slide(layout: int = 0):
 
 
 @router.post("/slide/blank")
-def create_blank_slide():
+@write_locked
+def create_blank_slide(session: PresentationSession = Depends(get_session)):
     """Create a new blank slide without any placeholders - DEPRECATED - Use v2 API instead"""
-    prs, slide_map, current_theme = get_state()
+    prs, slide_map, current_theme = get_state(session)
     
     slide = prs.slides.add_slide(prs.slide_layouts[6])  # Layout 6 is blank
-    slide_id = str(uuid.uuid4())
-    slide_map[slide_id] = slide
+    slide_id = session.new_slide_id()
+    slide_map.append(slide_id, slide)
     
     # Apply current theme to new slide
     current_theme.apply_to_slide(slide)
@@ -322,52 +301,62 @@ def create_blank_slide():
 
 
 @router.delete("/slide/{slide_id}")
-def delete_slide(slide_id: str):
+@write_locked
+def delete_slide(slide_id: str, session: PresentationSession = Depends(get_session)):
     """Delete a slide - DEPRECATED - Use v2 API instead"""
-    prs, slide_map, _ = get_state()
+    prs, slide_map, _ = get_state(session)
     
     if slide_id in slide_map:
-        slide = slide_map.pop(slide_id)
-        # Find the slide in the presentation and remove it
-        for idx, sld in enumerate(prs.slides):
-            if sld == slide:
-                xml_slides = prs.slides._sldIdLst
-                xml_slides.remove(xml_slides[idx])
-                return {"status": "deleted"}
-        return {"error": "slide not found in presentation"}
+        # The index tracks each slide's sldId position, so no scan of prs.slides is needed
+        idx = slide_map.position_of(slide_id)
+        xml_slides = prs.slides._sldIdLst
+        if idx >= len(xml_slides):
+            return {"error": "slide not found in presentation"}
+        xml_slides.remove(xml_slides[idx])
+        slide_map.pop(slide_id)
+        return {"status": "deleted"}
     return {"error": "slide not found"}
 
 
 @router.get("/slides")
-def list_slides():
+@read_locked
+def list_slides(session: PresentationSession = Depends(get_session)):
     """List all slides - DEPRECATED - Use v2 API instead"""
-    _, slide_map, _ = get_state()
+    _, slide_map, _ = get_state(session)
     return {"slide_ids": list(slide_map.keys())}
 
 
 @router.post("/save")
-def save_presentation(filename: str = "output.pptx"):
-    """Save the presentation - DEPRECATED - Use v2 API instead"""
-    prs, _, _ = get_state()
-    prs.save(filename)
+@read_locked
+def save_presentation(filename: str = "output.pptx", compression: Optional[str] = None, session: PresentationSession = Depends(get_session)):
+    """
+    Save the presentation - DEPRECATED - Use v2 API instead
+    
+    compression: stored, fast, default or max (server default when omitted)
+    """
+    if compression is not None and compression not in COMPRESSION_LEVELS:
+        return {"error": f"invalid compression. Valid modes: {list(COMPRESSION_LEVELS)}"}
+    with open(filename, "wb") as f:
+        session.write_package(f, compression)
     return {"status": "saved", "filename": filename}
 
 
 @router.get("/presentation/base64")
-def get_presentation_base64():
+@read_locked
+def get_presentation_base64(compression: Optional[str] = None, session: PresentationSession = Depends(get_session)):
     """Export the current presentation as base64 string - DEPRECATED - Use v2 API instead"""
-    prs, _, _ = get_state()
+    prs, _, _ = get_state(session)
+    
+    if compression is not None and compression not in COMPRESSION_LEVELS:
+        return {"error": f"invalid compression. Valid modes: {list(COMPRESSION_LEVELS)}"}
     
     try:
-        buffer = io.BytesIO()
-        prs.save(buffer)
-        buffer.seek(0)
-        
-        base64_data = base64.b64encode(buffer.read()).decode('utf-8')
+        # Serialized once per revision and reused until the next edit
+        export = session.export(compression)
         
         return {
             "status": "ok",
-            "base64": base64_data,
+            "base64": export.base64,
             "filename": "presentation.pptx",
             "slide_count": len(prs.slides)
         }
@@ -379,20 +368,36 @@ def get_presentation_base64():
 
 
 @router.get("/presentation/preview")
-def get_presentation_preview():
-    """Get presentation metadata and base64 for preview - DEPRECATED - Use v2 API instead"""
-    prs, slide_map, current_theme = get_state()
+@read_locked
+def get_presentation_preview(
+    request: Request,
+    response: Response,
+    compression: Optional[str] = None,
+    session: PresentationSession = Depends(get_session)
+):
+    """
+    Get presentation metadata and base64 for preview - DEPRECATED - Use v2 API instead
+    
+    The response carries an ETag; polling with If-None-Match returns 304 until the deck changes.
+    compression: stored, fast, default or max (server default when omitted). "stored"
+    suits the localhost round trip to the add-in.
+    """
+    prs, slide_map, current_theme = get_state(session)
+    
+    if compression is not None and compression not in COMPRESSION_LEVELS:
+        return {"error": f"invalid compression. Valid modes: {list(COMPRESSION_LEVELS)}"}
     
     try:
-        buffer = io.BytesIO()
-        prs.save(buffer)
-        buffer.seek(0)
-        
-        base64_data = base64.b64encode(buffer.read()).decode('utf-8')
+        # Serialized once per revision and reused until the next edit
+        export = session.export(compression)
+        if etag_matches(request.headers.get("if-none-match"), export.etag):
+            return Response(status_code=304, headers={"ETag": export.etag})
         
+        response.headers["ETag"] = export.etag
         return {
             "status": "ok",
-            "base64": base64_data,
+            "base64": export.base64,
+            "revision": session.revision,
             "slide_count": len(prs.slides),
             "slide_ids": list(slide_map.keys()),
             "current_theme": current_theme.name if hasattr(current_theme, 'name') else "default"
@@ -405,24 +410,24 @@ def get_presentation_preview():
 
 
 @router.post("/presentation/reset")
-def reset_presentation():
+@write_locked
+def reset_presentation(session: PresentationSession = Depends(get_session)):
     """Reset the presentation to start fresh - DEPRECATED - Use v2 API instead"""
-    import sys
-    import app.main as main_module
-    main_module.prs = Presentation()
-    main_module.slide_map = {}
+    session.reset()
     return {"status": "ok", "message": "Presentation reset"}
 
 
 @router.get("/slide/{slide_id}/shapes")
-def get_slide_shapes(slide_id: str):
+@read_locked
+def get_slide_shapes(slide_id: str, session: PresentationSession = Depends(get_session)):
     """Get detailed information about all shapes in a slide - DEPRECATED - Use v2 API instead"""
-    _, slide_map, _ = get_state()
+    _, slide_map, _ = get_state(session)
     
     if slide_id not in slide_map:
         return {"error": "slide not found"}
     
     slide = slide_map[slide_id]
+    title_shape = slide_map.roles(slide_id).title
     shapes_info = []
     
     for idx, shape in enumerate(slide.shapes):
@@ -466,7 +471,7 @@ def get_slide_shapes(slide_id: str):
         elif shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE:
             shape_info["shape_type"] = "auto_shape"
         
-        if hasattr(slide.shapes, "title") and slide.shapes.title == shape:
+        if title_shape is not None and title_shape.shape_id == shape.shape_id:
             shape_info["is_title"] = True
             shape_info["shape_type"] = "title"
         
@@ -486,26 +491,16 @@ def get_slide_shapes(slide_id: str):
 
 
 @router.post("/slide/{slide_id}/title/position")
-def set_title_position(slide_id: str, req: TitlePositionRequest):
+@write_locked
+def set_title_position(slide_id: str, req: TitlePositionRequest, session: PresentationSession = Depends(get_session)):
     """Set the position of the title shape on a slide - DEPRECATED - Use v2 API instead"""
-    _, slide_map, _ = get_state()
+    _, slide_map, _ = get_state(session)
     
     if slide_id not in slide_map:
         return {"error": "slide not found"}
     
-    slide = slide_map[slide_id]
-    
     # Find the title shape
-    title_shape = None
-    
-    if hasattr(slide.shapes, "title") and slide.shapes.title:
-        title_shape = slide.shapes.title
-    else:
-        for shape in slide.shapes:
-            if hasattr(shape, "placeholder_format"):
-                if shape.placeholder_format.type == 1:  # Title placeholder
-                    title_shape = shape
-                    break
+    title_shape = slide_map.roles(slide_id).title
     
     if not title_shape:
         return {
@@ -533,45 +528,50 @@ def set_title_position(slide_id: str, req: TitlePositionRequest):
 
 
 @router.get("/slide/{slide_id}/title/coordinates")
-def get_title_coordinates(slide_id: str):
+@read_locked
+def get_title_coordinates(slide_id: str, session: PresentationSession = Depends(get_session)):
     """Get the position and dimensions of the title shape - DEPRECATED - Use v2 API instead"""
-    _, slide_map, _ = get_state()
+    _, slide_map, _ = get_state(session)
     
     from ...utils.shape_alignment import get_title_coordinates as get_title_coords_util
     return get_title_coords_util(slide_map, slide_id)
 
 
 @router.post("/slides/bulk/title/position")
-def set_bulk_title_positions(request: dict):
+@write_locked
+def set_bulk_title_positions(request: dict, session: PresentationSession = Depends(get_session)):
     """Set the same title position for multiple slides - DEPRECATED - Use v2 API instead"""
-    _, slide_map, _ = get_state()
+    _, slide_map, _ = get_state(session)
     
     from ...utils.shape_alignment import set_bulk_title_positions as set_bulk_titles_util
     return set_bulk_titles_util(slide_map, request)
 
 
 @router.post("/slides/align_titles_to_reference")
-def align_titles_to_reference(request: dict):
+@write_locked
+def align_titles_to_reference(request: dict, session: PresentationSession = Depends(get_session)):
     """Align title positions to match a reference slide - DEPRECATED - Use v2 API instead"""
-    _, slide_map, _ = get_state()
+    _, slide_map, _ = get_state(session)
     
     from ...utils.shape_alignment import align_titles_to_reference as align_titles_util
     return align_titles_util(slide_map, request["reference_slide_number"], request["target_slide_numbers"])
 
 
 @router.post("/slides/align_subtitles_to_reference")
-def align_subtitles_to_reference(request: dict):
+@write_locked
+def align_subtitles_to_reference(request: dict, session: PresentationSession = Depends(get_session)):
     """Align subtitle positions to match a reference slide - DEPRECATED - Use v2 API instead"""
-    _, slide_map, _ = get_state()
+    _, slide_map, _ = get_state(session)
     
     from ...utils.shape_alignment import align_subtitles_to_reference as align_subtitles_util
     return align_subtitles_util(slide_map, request["reference_slide_number"], request["target_slide_numbers"])
 
 
 @router.post("/slides/align_footnotes_to_reference")
-def align_footnotes_to_reference(request: dict):
+@write_locked
+def align_footnotes_to_reference(request: dict, session: PresentationSession = Depends(get_session)):
     """Align footnote positions to match a reference slide - DEPRECATED - Use v2 API instead"""
-    _, slide_map, _ = get_state()
+    _, slide_map, _ = get_state(session)
     
     from ...utils.shape_alignment import align_footnotes_to_reference as align_footnotes_util
     return align_footnotes_util(slide_map, request["reference_slide_number"], request["target_slide_numbers"])
@@ -0,0 +1,183 @@
+"""
+Transactional batch execution of existing route operations.
+
+A batch is an ordered list of operations, each one an ordinary API call:
+{"method": "POST", "path": "/api/v1/slide/{id}/title", "body": {...}, "query": {...}}
+with the same payloads the individual routes take. Later operations can use
+values returned by earlier ones with "$<index>.<key>", e.g. "$0.slide_id" for
+the id of a slide created by the first operation.
+"""
+import inspect
+import re
+from typing import Any, Dict, List
+
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+# Endpoints that may run inside a batch: synchronous, session-scoped and returning JSON
+BATCHABLE_ENDPOINTS = {
+    # v1
+    "set_theme", "create_slide", "create_blank_slide", "delete_slide", "list_slides",
+    "reset_presentation", "add_title", "add_subtitle", "add_bullet_points", "add_text_box",
+    "add_component", "get_slide_shapes", "set_title_position", "get_title_coordinates",
+    "set_bulk_title_positions", "align_titles_to_reference", "align_subtitles_to_reference",
+    "align_footnotes_to_reference",
+    # v2
+    "align_shapes_to_reference", "align_batch", "analyze_geometry", "normalize_geometry", "move_slide", "apply_theme",
+    "render_components", "generate_from_outline",
+    "list_revisions", "diff_revisions", "diff_revision_shapes", "revert_slide_to_revision", "revert_shape_to_revision"
+}
+
+_REFERENCE = re.compile(r"\$(\d+)\.(\w+)")
+
+
+class BatchError(Exception):
+    """Raised when an operation cannot be resolved or bound to a route"""
+
+
+def resolve_references(value, results: List[Dict[str, Any]]):
+    """Replace "$<index>.<key>" references with values from earlier results"""
+    if isinstance(value, dict):
+        return {key: resolve_references(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(item, results) for item in value]
+    if not isinstance(value, str) or "$" not in value:
+        return value
+
+    def lookup(match):
+        idx, key = int(match.group(1)), match.group(2)
+        if idx >= len(results):
+            raise BatchError(f"Reference {match.group(0)} points at an operation that has not run")
+        if key not in results[idx]:
+            raise BatchError(f"Reference {match.group(0)}: operation {idx} returned no '{key}'")
+        return results[idx][key]
+
+    # A reference that is the whole string keeps the referenced value's type
+    whole = _REFERENCE.fullmatch(value)
+    if whole:
+        return lookup(whole)
+    return _REFERENCE.sub(lambda match: str(lookup(match)), value)
+
+
+def find_route(routes, method: str, path: str):
+    """The batchable route matching method and path, with its converted path params"""
+    for route in routes:
+        if not isinstance(route, APIRoute) or method not in route.methods:
+            continue
+        match = route.path_regex.match(path)
+        if match is None:
+            continue
+        if route.endpoint.__name__ not in BATCHABLE_ENDPOINTS:
+            raise BatchError(f"{method} {path} cannot be used in a batch")
+        path_params = {
+            name: route.param_convertors[name].convert(value)
+            for name, value in match.groupdict().items()
+        }
+        return route, path_params
+    raise BatchError(f"No route for {method} {path}")
+
+
+def _bind(endpoint, path_params: Dict[str, Any], query: Dict[str, Any], body, session) -> Dict[str, Any]:
+    """Build the keyword arguments FastAPI would have passed to endpoint"""
+    kwargs = {}
+    for name, param in inspect.signature(endpoint).parameters.items():
+        annotation = param.annotation
+        if name == "session":
+            kwargs[name] = session
+        elif name in path_params:
+            kwargs[name] = path_params[name]
+        elif inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+            kwargs[name] = annotation(**(body or {}))
+        elif annotation in (dict, Dict):
+            kwargs[name] = body or {}
+        elif name in query:
+            value = query[name]
+            kwargs[name] = annotation(value) if annotation in (int, float, str) else value
+        elif param.default is not inspect.Parameter.empty:
+            kwargs[name] = param.default
+        else:
+            raise BatchError(f"Missing parameter '{name}'")
+    return kwargs
+
+
+def _failed(result) -> bool:
+    """Routes report failures as {"error": ...} or {"status": "error", ...}"""
+    return not isinstance(result, dict) or "error" in result or result.get("status") == "error"
+
+
+def execute_operation(session, routes, operation: Dict[str, Any], results: List[Dict[str, Any]]):
+    """Run a single operation against session and return the route's response"""
+    if not isinstance(operation, dict) or "path" not in operation:
+        raise BatchError("Each operation needs at least a 'path'")
+    method = str(operation.get("method", "POST")).upper()
+    path = resolve_references(operation["path"], results)
+    query = resolve_references(operation.get("query") or {}, results)
+    body = resolve_references(operation.get("body"), results)
+
+    route, path_params = find_route(routes, method, path)
+    kwargs = _bind(route.endpoint, path_params, query, body, session)
+    return route.endpoint(**kwargs)
+
+
+def replay_operation(routes, session, entry: Dict[str, Any]):
+    """
+    Re-run a journaled operation (see app.state.journal) against session.
+    Body models are rebuilt from their logged fields; everything else is
+    passed through as logged.
+    """
+    endpoint = next(
+        (route.endpoint for route in routes
+         if isinstance(route, APIRoute) and route.endpoint.__name__ == entry["endpoint"]),
+        None
+    )
+    if endpoint is None:
+        raise BatchError(f"No route named {entry['endpoint']}")
+
+    logged = entry.get("kwargs") or {}
+    kwargs = {}
+    for name, param in inspect.signature(endpoint).parameters.items():
+        annotation = param.annotation
+        if name == "session":
+            kwargs[name] = session
+        elif name in logged:
+            value = logged[name]
+            if inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+                value = annotation(**value)
+            kwargs[name] = value
+        elif param.default is inspect.Parameter.empty:
+            raise BatchError(f"Logged {entry['endpoint']} call is missing '{name}'")
+    return endpoint(**kwargs)
+
+
+def run_batch(session, routes, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Run operations in order against one deck. If any operation fails, the deck
+    is restored to how it was before the batch and nothing is kept, not even
+    the operations' revisions in the history.
+    Must be called holding the session's write lock.
+    """
+    snapshot = session.snapshot()
+    results = []
+    for idx, operation in enumerate(operations):
+        try:
+            result = execute_operation(session, routes, operation, results)
+        except Exception as e:
+            result = {"status": "error", "error": str(e)}
+
+        if _failed(result):
+            session.restore(snapshot)
+            error = result.get("error") if isinstance(result, dict) else "unexpected response"
+            return {
+                "status": "error",
+                "error": f"Operation {idx} failed: {error}",
+                "failed_operation": idx,
+                "rolled_back": True,
+                "results": results + [result]
+            }
+        results.append(result)
+
+    return {
+        "status": "ok",
+        "operations": len(results),
+        "results": results
+    }
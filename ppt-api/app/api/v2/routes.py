@@ -1,40 +1,101 @@
 """
 API v2 routes - Current active endpoints
 """
-from fastapi import APIRouter
-from typing import Dict
-from ...utils.shape_alignment import (
-    align_titles_to_reference,
-    align_subtitles_to_reference,
-    align_footnotes_to_reference
-)
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+import hashlib
+import io
+from ...state.dependencies import SessionRoute, get_session
+from ...state.session import PresentationSession
+from ...state.locks import read_locked, write_locked
+from ...state.history import HistoryError, revert_shape, revert_slide
+from ..v1.routes import router as v1_router
+from .batch import run_batch
+from ...packaging.delta import DeltaError, apply_delta, needed_parts, normalize_manifest
+from ...packaging.ingest import ingest_package
+from ...packaging.merge import MergeError
+from ...packaging.export import content_disposition, etag_matches
+from ...packaging.writer import COMPRESSION_LEVELS
+from ...packaging.streaming import PPTX_MEDIA_TYPE, iter_file, save_to_spool, spooled_file
+from ...utils.deck_diff import structural_diff
+from ...utils.geometry_analysis import analyze_deck_geometry
+from ...utils.theme_switch import switch_theme
+from ...utils.bulk_components import render_component_items, validate_component_items
+from ...utils.deck_generation import GenerationError, generate_slides, validate_outline
+from ...themes.registry import THEMES, ThemeDefinitionError, definition_from_pptx
+from ...utils.shape_alignment import ROLE_SELECTORS, NAME_SELECTOR_PREFIX, run_align_jobs, validate_align_jobs
 
-router = APIRouter(prefix="/api/v2", tags=["v2"])
+router = APIRouter(prefix="/api/v2", tags=["v2"], route_class=SessionRoute)
 
 # Backward compatibility router (no prefix) for the non-deprecated endpoint
-backward_compat_router = APIRouter()
+backward_compat_router = APIRouter(route_class=SessionRoute)
 
 
-def get_state():
-    """Get global state from main.py"""
-    import sys
-    import app.main as main_module
-    return main_module.slide_map
+# Models
+class MoveSlideRequest(BaseModel):
+    # 1-based slide number the slide should end up at
+    position: int
+
+class DeltaManifestRequest(BaseModel):
+    # partname -> sha256 hex digest of the part's uncompressed bytes
+    parts: Dict[str, str]
+
+class DeltaApplyRequest(BaseModel):
+    manifest: Dict[str, str]
+    # partname -> base64 bytes, only for parts the server reported as needed
+    parts: Dict[str, str] = {}
+
+
+class RevertRequest(BaseModel):
+    # Revision to go back to, as listed by GET /api/v2/history
+    revision: int
+
+class BatchRequest(BaseModel):
+    # Ordered operations: {"method", "path", "body", "query"}, see app.api.v2.batch
+    operations: List[Dict[str, Any]]
+
+class ComponentBulkRequest(BaseModel):
+    # {"slide_id" | "slide_number" | "new_slide", "component_type", "content"}, see app.utils.bulk_components
+    items: List[Dict[str, Any]]
+
+class OutlineRequest(BaseModel):
+    # Slides to append, see app.utils.deck_generation
+    slides: List[Dict[str, Any]]
+
+class ThemeSwitchRequest(BaseModel):
+    theme: str
+    # 1-based slide numbers to restyle; all slides when omitted
+    slide_numbers: Optional[List[int]] = None
+    # Also replace slide backgrounds
+    backgrounds: bool = True
+
+
+def get_state(session: PresentationSession):
+    """Get the slide_map of the caller's session"""
+    return session.slide_map
 
 
 @router.post("/slides/align_shapes_to_reference")
-def align_shapes_to_reference(request: Dict):
+@write_locked
+def align_shapes_to_reference(request: Dict, session: PresentationSession = Depends(get_session)):
     """
-    Align multiple shape types (title, subtitle, footnote) to match a reference slide
+    Align multiple shape types to match a reference slide
     
     Expected body format:
     {
         "reference_slide_number": 2,
         "target_slide_numbers": [1, 3, 4, 5],
-        "shapes_to_align": ["title", "subtitle", "footnote"]
+        "shapes_to_align": ["title", "subtitle", "footnote"],
+        "fields": ["left", "top", "width", "height"]
     }
+    
+    shapes_to_align also accepts body, picture, table, chart and "name:<shape name>";
+    fields is optional and defaults to all four.
     """
-    slide_map = get_state()
+    slide_map = get_state(session)
     
     if "reference_slide_number" not in request or "target_slide_numbers" not in request or "shapes_to_align" not in request:
         return {"error": "Missing required fields: 'reference_slide_number', 'target_slide_numbers', or 'shapes_to_align'"}
@@ -50,37 +111,37 @@ def align_shapes_to_reference(request: Dict):
     if not isinstance(shapes_to_align, list) or len(shapes_to_align) == 0:
         return {"error": "shapes_to_align must be a non-empty array"}
     
-    valid_shapes = ["title", "subtitle", "footnote"]
     for shape in shapes_to_align:
-        if shape not in valid_shapes:
-            return {"error": f"Invalid shape type '{shape}'. Valid types: {valid_shapes}"}
+        if not isinstance(shape, str) or not (shape in ROLE_SELECTORS or shape.startswith(NAME_SELECTOR_PREFIX)):
+            return {"error": f"Invalid shape type '{shape}'. Valid types: {list(ROLE_SELECTORS)} or '{NAME_SELECTOR_PREFIX}<shape name>'"}
     
-    # Dispatch to individual alignment functions
-    results = {}
+    total_slides = len(slide_map)
+    if slide_map.id_at(reference_slide_num) is None:
+        invalid = {"error": f"Invalid reference slide number. Valid range is 1-{total_slides}"}
+        return {
+            "reference_slide": reference_slide_num,
+            "target_slides": target_slide_numbers,
+            "shapes_aligned": shapes_to_align,
+            "results": {shape: invalid for shape in shapes_to_align}
+        }
     
-    if "title" in shapes_to_align:
-        title_result = align_titles_to_reference(
-            slide_map,
-            reference_slide_num,
-            target_slide_numbers
-        )
-        results["title"] = title_result
-    
-    if "subtitle" in shapes_to_align:
-        subtitle_result = align_subtitles_to_reference(
-            slide_map,
-            reference_slide_num,
-            target_slide_numbers
-        )
-        results["subtitle"] = subtitle_result
-    
-    if "footnote" in shapes_to_align:
-        footnote_result = align_footnotes_to_reference(
-            slide_map,
-            reference_slide_num,
-            target_slide_numbers
-        )
-        results["footnote"] = footnote_result
+    jobs, error = validate_align_jobs([
+        {
+            "role": shape,
+            "fields": request.get("fields"),
+            "reference_slide_number": reference_slide_num,
+            "target_slide_numbers": target_slide_numbers
+        }
+        for shape in shapes_to_align
+    ], total_slides)
+    if error:
+        return {"error": error}
+    
+    # One pass over the deck for every requested shape type
+    job_results = run_align_jobs(slide_map, jobs)["results"]
+    results = {}
+    for shape, result in zip(shapes_to_align, job_results):
+        results[shape] = {"error": result["error"]} if "error" in result else {"data": "Success"}
     
     return {
         "reference_slide": reference_slide_num,
@@ -90,11 +151,479 @@ def align_shapes_to_reference(request: Dict):
     }
 
 
+@router.post("/slides/align_batch")
+@write_locked
+def align_batch(request: Dict, session: PresentationSession = Depends(get_session)):
+    """
+    Run many alignment jobs in one request, e.g. to normalize a whole deck's layout
+    
+    Expected body format:
+    {
+        "jobs": [
+            {"role": "title", "reference_slide_number": 2},
+            {"role": "picture", "fields": ["left", "top"], "reference_slide_number": 3, "target_slide_numbers": [4, 5]},
+            {"role": "name:Logo", "fields": ["left", "top"], "reference_slide_number": 1}
+        ]
+    }
+    
+    Roles: title, subtitle, footnote, body, picture, table, chart or "name:<shape name>".
+    fields defaults to all of left/top/width/height and target_slide_numbers to
+    every slide except the reference. All shapes are resolved before any
+    geometry is written, so jobs never see each other's changes.
+    """
+    slide_map = get_state(session)
+    
+    jobs, error = validate_align_jobs(request.get("jobs"), len(slide_map))
+    if error:
+        return {"error": error}
+    
+    return run_align_jobs(slide_map, jobs)
+
+
+@router.post("/slides/geometry/analyze")
+@read_locked
+def analyze_geometry(request: Dict, session: PresentationSession = Depends(get_session)):
+    """
+    Report shapes that are off the deck's canonical position for their role
+    
+    Expected body format (every field optional):
+    {
+        "roles": ["title", "subtitle", "footnote"],
+        "fields": ["left", "top", "width", "height"],
+        "tolerance": 0.05,
+        "slide_numbers": [1, 2, 3]
+    }
+    
+    Each role's report has the canonical position (inches), the outlier slides
+    with their deviation, and a reference_slide_number that matches the
+    canonical position and can be passed to align_shapes_to_reference.
+    """
+    slide_map = get_state(session)
+    return analyze_deck_geometry(slide_map, request)
+
+
+@router.post("/slides/geometry/normalize")
+@write_locked
+def normalize_geometry(request: Dict, session: PresentationSession = Depends(get_session)):
+    """
+    Same analysis as /slides/geometry/analyze, then move every outlier onto
+    its role's canonical position
+    """
+    slide_map = get_state(session)
+    return analyze_deck_geometry(slide_map, request, apply=True)
+
+
+@router.post("/slides/components")
+@write_locked
+def render_components(req: ComponentBulkRequest, session: PresentationSession = Depends(get_session)):
+    """
+    Render many components across many slides in one request
+    
+    Expected body format:
+    {
+        "items": [
+            {"new_slide": "intro", "component_type": "section_divider", "content": {"title": "Q3 Review"}},
+            {"slide_number": 2, "component_type": "timeline", "content": {"milestones": ["Plan", "Build", "Ship"]}},
+            {"slide_id": "...", "component_type": "callout_box", "content": {"message": "On track"}}
+        ]
+    }
+    
+    Component types and content are the same as /api/v1/slide/{slide_id}/component.
+    Items with the same "new_slide" label go on one new blank slide; the
+    response maps each label to the created slide id. Every item is validated
+    before anything is rendered, so a malformed request changes nothing.
+    Results are returned per item, in request order.
+    """
+    slide_map = get_state(session)
+    
+    items, error = validate_component_items(req.items, slide_map)
+    if error:
+        return {"error": error}
+    
+    return render_component_items(session, items)
+
+
+@router.post("/presentation/generate")
+@write_locked
+def generate_from_outline(req: OutlineRequest, session: PresentationSession = Depends(get_session)):
+    """
+    Append a whole deck section from a structured outline
+    
+    Expected body format:
+    {
+        "slides": [
+            {"type": "title", "title": "Q3 Review", "subtitle": "Board meeting"},
+            {"type": "section", "title": "Results"},
+            {"type": "bullets", "title": "Highlights", "points": ["Revenue up 12%", "Margin stable"]},
+            {"type": "table", "title": "By region", "data": [["Region", "Revenue"], ["EMEA", "4.1"]]},
+            {"type": "components", "components": [{"component_type": "timeline", "content": {"milestones": ["Q1", "Q2"]}}]}
+        ]
+    }
+    
+    Slides use the current theme. Any slide can set "layout" and add
+    "components" (as in /api/v1/slide/{slide_id}/component). Large outlines
+    are rendered in parallel worker processes. The outline is validated first,
+    and if any slide fails to render no slide is added.
+    """
+    slides, error = validate_outline(req.slides, len(session.prs.slide_layouts))
+    if error:
+        return {"error": error}
+    
+    try:
+        result = generate_slides(session, slides)
+    except (GenerationError, MergeError) as e:
+        return {"error": str(e)}
+    return {"status": "ok", "slides_generated": len(result["slide_ids"]), **result}
+
+
+@router.get("/themes")
+def list_themes():
+    """Available themes with their display names, reloaded from the definition files when they change"""
+    return {
+        "themes": [
+            {"key": key, "name": theme.name, "font_family": theme.font_family,
+             "primary_color": theme.primary_color, "background_color": theme.background_color}
+            for key, theme in THEMES.items()
+        ]
+    }
+
+
+@router.post("/themes/{key}")
+def define_theme(key: str, definition: Dict):
+    """
+    Add or replace a theme from a JSON definition (see app.themes.registry).
+    The definition is saved to the themes directory, so it survives restarts
+    and other workers pick it up.
+    """
+    try:
+        theme = THEMES.register(key, definition)
+    except ThemeDefinitionError as e:
+        return {"status": "error", "error": str(e)}
+    return {"status": "ok", "key": key, "name": theme.name}
+
+
+@router.put("/themes/{key}")
+async def import_theme(key: str, request: Request, name: Optional[str] = None):
+    """
+    Add or replace a theme extracted from the slide master of a raw .pptx
+    request body: its theme fonts, colors and master text sizes
+    """
+    spool = spooled_file()
+    try:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+
+        def extract():
+            definition = definition_from_pptx(spool, name or key)
+            return THEMES.register(key, definition), definition
+
+        theme, definition = await run_in_threadpool(extract)
+        return {"status": "ok", "key": key, "name": theme.name, "definition": definition}
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+    finally:
+        spool.close()
+
+
+@router.post("/theme/apply")
+@write_locked
+def apply_theme(req: ThemeSwitchRequest, session: PresentationSession = Depends(get_session)):
+    """
+    Switch the deck to another theme and restyle the existing slides to match:
+    titles, subtitles, headings, body text and bullets get the new theme's
+    fonts and colors, and slides get its background. New slides use the
+    theme too, as with /api/v1/theme. Restyling only some slides
+    (slide_numbers) leaves the deck's theme unchanged.
+    """
+    if req.theme not in THEMES:
+        return {"error": f"Theme '{req.theme}' not found. Available themes: {list(THEMES.keys())}"}
+    slide_map = get_state(session)
+    if req.slide_numbers is not None:
+        invalid = [num for num in req.slide_numbers if not 1 <= num <= len(slide_map)]
+        if invalid:
+            return {"error": f"Invalid slide numbers {invalid}. Presentation has {len(slide_map)} slides."}
+
+    new_theme = THEMES[req.theme]
+    # Earlier versions of reloaded themes too, for text styled before the reload
+    old_theme = session.current_theme
+    others = [theme for theme in THEMES.versions() if theme is not old_theme]
+    result = switch_theme(slide_map, old_theme, new_theme, others,
+                          slide_numbers=req.slide_numbers, backgrounds=req.backgrounds)
+    if req.slide_numbers is None:
+        session.current_theme = new_theme
+    return {"status": "ok", "theme": req.theme, **result}
+
+
+@router.post("/slide/{slide_id}/move")
+@write_locked
+def move_slide(slide_id: str, req: MoveSlideRequest, session: PresentationSession = Depends(get_session)):
+    """Move a slide to a new 1-based position, shifting the slides in between"""
+    slide_map = get_state(session)
+    
+    if slide_id not in slide_map:
+        return {"error": "slide not found"}
+    
+    total_slides = len(slide_map)
+    if req.position < 1 or req.position > total_slides:
+        return {"error": f"Invalid position. Valid range is 1-{total_slides}"}
+    
+    # Reorder the sldId element and the index together so they cannot drift apart
+    xml_slides = session.prs.slides._sldIdLst
+    sld_id = xml_slides[slide_map.position_of(slide_id)]
+    xml_slides.remove(sld_id)
+    xml_slides.insert(req.position - 1, sld_id)
+    slide_map.move(slide_id, req.position - 1)
+    
+    return {
+        "status": "ok",
+        "slide_id": slide_id,
+        "slide_number": req.position,
+        "slide_ids": list(slide_map.keys())
+    }
+
+
+@router.post("/batch")
+@write_locked
+def batch(req: BatchRequest, session: PresentationSession = Depends(get_session)):
+    """
+    Run an ordered list of operations against the deck under one lock, all or nothing
+    
+    Expected body format:
+    {
+        "operations": [
+            {"method": "POST", "path": "/api/v1/slide", "query": {"layout": 1}},
+            {"method": "POST", "path": "/api/v1/slide/$0.slide_id/title", "body": {"text": "Q3 Review"}},
+            {"method": "POST", "path": "/api/v2/slides/align_shapes_to_reference", "body": {...}}
+        ]
+    }
+    
+    Payloads are the same as the individual routes. "$<index>.<key>" is replaced
+    by a value returned by an earlier operation. If any operation fails, the deck
+    is rolled back to its state before the batch.
+    """
+    if not req.operations:
+        return {"error": "operations must be a non-empty array"}
+    
+    return run_batch(session, v1_router.routes + router.routes, req.operations)
+
+
+@router.get("/history")
+@read_locked
+def list_revisions(session: PresentationSession = Depends(get_session)):
+    """List the recorded revisions of the deck, oldest first"""
+    return {
+        "revision": session.revision,
+        "revisions": session.history.revisions()
+    }
+
+
+@router.get("/history/diff")
+@read_locked
+def diff_revisions(from_revision: int, to_revision: Optional[int] = None, session: PresentationSession = Depends(get_session)):
+    """
+    Slides added, removed, changed or moved between two revisions.
+    to_revision defaults to the current revision.
+    """
+    history = session.history
+    old = history.get(from_revision)
+    new = history.get(to_revision if to_revision is not None else session.revision)
+    if old is None or new is None:
+        return {"error": "revision not found in history"}
+    return history.diff(old, new)
+
+
+@router.get("/history/diff/shapes")
+@read_locked
+def diff_revision_shapes(from_revision: int, to_revision: Optional[int] = None, session: PresentationSession = Depends(get_session)):
+    """
+    Component-level changes between two revisions: for each changed slide the
+    shapes added, removed and modified (moved, resized, text_changed, restyled,
+    renamed, reordered) with geometry and text deltas. Shapes are matched by
+    shape id. to_revision defaults to the current revision.
+    """
+    history = session.history
+    old = history.get(from_revision)
+    new = history.get(to_revision if to_revision is not None else session.revision)
+    if old is None or new is None:
+        return {"error": "revision not found in history"}
+    return structural_diff(history, old, new)
+
+
+@router.post("/slide/{slide_id}/revert")
+@write_locked
+def revert_slide_to_revision(slide_id: str, req: RevertRequest, session: PresentationSession = Depends(get_session)):
+    """Reject all changes made to one slide since a revision"""
+    try:
+        revision = revert_slide(session, session.history, slide_id, req.revision)
+    except HistoryError as e:
+        return {"error": str(e)}
+    return {
+        "status": "ok",
+        "slide_id": slide_id,
+        "reverted_to": revision.number
+    }
+
+
+@router.post("/slide/{slide_id}/shape/{shape_id}/revert")
+@write_locked
+def revert_shape_to_revision(slide_id: str, shape_id: int, req: RevertRequest, session: PresentationSession = Depends(get_session)):
+    """
+    Reject the changes made to one component (shape, matched by its shape id)
+    since a revision, leaving the rest of the slide as it is
+    """
+    try:
+        action = revert_shape(session, session.history, slide_id, shape_id, req.revision)
+    except HistoryError as e:
+        return {"error": str(e)}
+    return {
+        "status": "ok",
+        "slide_id": slide_id,
+        "shape_id": shape_id,
+        "action": action
+    }
+
+
+@router.post("/presentation/delta/manifest")
+@read_locked
+def delta_manifest(req: DeltaManifestRequest, session: PresentationSession = Depends(get_session)):
+    """
+    First step of a delta upload: compare the client's per-part hashes with what
+    the server already holds and return the partnames that must be uploaded.
+    """
+    manifest = normalize_manifest(req.parts)
+    needed = needed_parts(session, manifest)
+    return {
+        "status": "ok",
+        "needed": needed,
+        "total_parts": len(manifest)
+    }
+
+
+@router.post("/presentation/delta/apply")
+def delta_apply(req: DeltaApplyRequest, session: PresentationSession = Depends(get_session)):
+    """
+    Second step of a delta upload: send the full manifest plus the needed parts
+    (base64). Leaf parts are patched into the live package; structural changes
+    rebuild it. Slide ids are kept for slides that still exist.
+    """
+    try:
+        # apply_delta bumps the revision itself, and only when something changed
+        with session.lock.write():
+            result = apply_delta(session, req.manifest, req.parts)
+            # Uploaded parts are not logged as operations, so the result is on disk before returning
+            if result["mode"] != "unchanged":
+                session.checkpoint(durable=True)
+            return {
+                "status": "ok",
+                **result,
+                "slide_count": len(session.prs.slides),
+                "slide_ids": list(session.slide_map.keys())
+            }
+    except DeltaError as e:
+        return {
+            "status": "error",
+            "error": str(e),
+            "needed": e.needed
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": str(e)
+        }
+
+
+@router.put("/presentation")
+async def upload_presentation(request: Request, session: PresentationSession = Depends(get_session)):
+    """
+    Replace the session's deck with a raw .pptx request body
+    (Content-Type: application/vnd.openxmlformats-officedocument.presentationml.presentation).
+    The body is streamed (chunked transfer encoding is fine) into a spooled temp file
+    and hashed on the way, so no base64 or in-memory copy of a large deck is made.
+    """
+    spool = spooled_file()
+    hasher = hashlib.sha256()
+    size = 0
+    
+    def load():
+        parse_skipped = ingest_package(session, request.app.state.parse_cache, hasher.hexdigest(), spool, size)
+        with session.lock.read():
+            return {
+                "status": "ok",
+                "message": "Presentation initialized from binary upload",
+                "slide_count": len(session.prs.slides),
+                "slide_ids": list(session.slide_map.keys()),
+                "bytes_received": size,
+                "parse_skipped": parse_skipped
+            }
+    
+    try:
+        async for chunk in request.stream():
+            hasher.update(chunk)
+            spool.write(chunk)
+            size += len(chunk)
+        spool.seek(0)
+        
+        # Parsing is CPU-bound and takes the session lock, so keep it off the event loop
+        return await run_in_threadpool(load)
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": str(e)
+        }
+    finally:
+        spool.close()
+
+
+@router.get("/presentation")
+def download_presentation(
+    request: Request,
+    filename: str = "presentation.pptx",
+    compression: Optional[str] = None,
+    session: PresentationSession = Depends(get_session)
+):
+    """
+    Stream the session's deck as a raw .pptx. Reuses the cached serialization
+    when the deck is unchanged since the last export; otherwise the package is
+    serialized into a spooled temp file under the read lock and streamed in
+    chunks after the lock is released. Honors If-None-Match.
+    
+    compression: stored, fast, default or max (server default when omitted)
+    """
+    if compression is not None and compression not in COMPRESSION_LEVELS:
+        return {"error": f"invalid compression. Valid modes: {list(COMPRESSION_LEVELS)}"}
+    
+    with session.lock.read():
+        export = session.cached_export(compression)
+        if export is None:
+            spool = save_to_spool(session, compression)
+            etag = None
+        else:
+            spool = io.BytesIO(export.data)
+            etag = export.etag
+        slide_count = len(session.prs.slides)
+    
+    if etag is not None and etag_matches(request.headers.get("if-none-match"), etag):
+        spool.close()
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    size = spool.seek(0, 2)
+    spool.seek(0)
+    headers = {
+        "Content-Disposition": content_disposition(filename),
+        "Content-Length": str(size),
+        "X-Slide-Count": str(slide_count)
+    }
+    if etag is not None:
+        headers["ETag"] = etag
+    return StreamingResponse(iter_file(spool), media_type=PPTX_MEDIA_TYPE, headers=headers)
+
+
 # Backward compatibility: also expose at the old path (without /api/v2 prefix)
 @backward_compat_router.post("/slides/align_shapes_to_reference")
-def align_shapes_to_reference_backward_compat(request: Dict):
+def align_shapes_to_reference_backward_compat(request: Dict, session: PresentationSession = Depends(get_session)):
     """
     Backward compatibility wrapper - same as /api/v2/slides/align_shapes_to_reference
     """
-    return align_shapes_to_reference(request)
+    return align_shapes_to_reference(request=request, session=session)
 
@@ -1,13 +1,17 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, List, Optional
 from pptx.slide import Slide
 from ..themes.theme import Theme, Style
 
 class Component(ABC):
     """Base class for all slide components"""
     
-    def __init__(self, theme: Optional[Theme] = None):
+    def __init__(self, theme: Optional[Theme] = None, new_slide: Optional[Callable[[], Slide]] = None):
         self.theme = theme or Theme("default")
+        # Creates a slide right after the last one the component is on, for
+        # content that overflows; None keeps the component on its one slide
+        self.new_slide = new_slide
+        self.continuation_slides: List[Slide] = []
 
     @abstractmethod
     def render(self, slide: Slide, content: Dict[str, Any]) -> None:
@@ -20,6 +24,12 @@ class Component(ABC):
         """
         pass
 
+    def _continuation_slide(self) -> Slide:
+        """A new slide to continue the component on"""
+        slide = self.new_slide()
+        self.continuation_slides.append(slide)
+        return slide
+
     def _apply_style(self, text_frame, style_name: str) -> None:
         """Apply a named style from the theme to a text frame"""
         if self.theme:
@@ -0,0 +1,398 @@
+"""
+Native chart components fed from columnar data.
+
+Charts are real PowerPoint charts: chart XML plus an embedded workbook with
+the plotted data, so they stay editable. Every plotted point is written to
+both, so large inputs are reduced before anything is embedded: long line
+series are downsampled (Largest-Triangle-Three-Buckets, or the min and max of
+each bucket), scatter clouds are thinned to one point per cell of a grid, and
+bar and pie rows are grouped by category with the smallest categories folded
+into "Other".
+"""
+import math
+from abc import abstractmethod
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from pptx.chart.data import CategoryChartData, XyChartData
+from pptx.chart.xlsx import CategoryWorkbookWriter
+from pptx.dml.color import RGBColor
+from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
+from pptx.slide import Slide
+from pptx.util import Inches, Pt, lazyproperty
+
+from .base import Component
+from .layouts import clamp_box
+
+# Points kept per line or scatter chart, shared between its series
+MAX_POINTS = 1000
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+AGGREGATES = ("sum", "mean")
+OTHER_LABEL = "Other"
+
+
+# --- input ---
+
+def chart_columns(data: Any) -> Tuple[List[str], List[list]]:
+    """
+    Column names and values of chart data given as columns ({"name": [values]}),
+    a DataFrame (anything with columns and to_numpy()), or rows with a header
+    row first. Short columns are padded with None.
+    """
+    if isinstance(data, dict):
+        names = list(data)
+        columns = [data[name].tolist() if hasattr(data[name], "tolist") else list(data[name]) for name in names]
+    elif hasattr(data, "columns") and hasattr(data, "to_numpy"):
+        names = list(data.columns)
+        values = data.to_numpy()
+        columns = [values[:, idx].tolist() for idx in range(len(names))]
+    elif isinstance(data, list) and data and all(isinstance(row, (list, tuple)) for row in data):
+        names = list(data[0])
+        columns = [[row[idx] if idx < len(row) else None for row in data[1:]] for idx in range(len(names))]
+    else:
+        raise ValueError('data must be columns ({"name": [values]}) or rows with a header row first')
+    if len(names) < 2:
+        raise ValueError("data needs a category (or x) column and at least one value column")
+
+    length = max(len(column) for column in columns)
+    for column in columns:
+        column.extend([None] * (length - len(column)))
+    return [str(name) for name in names], columns
+
+
+def numeric_column(name: str, values: list) -> np.ndarray:
+    """values as floats, None and empty strings becoming NaN"""
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return np.array([np.nan if value is None or value == "" else value for value in values], dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError(f"Column '{name}' must be numeric")
+
+
+def _finite_points(x: np.ndarray, y: np.ndarray):
+    """Indexes of the points with both coordinates set"""
+    return np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+
+
+def _optional_values(values: np.ndarray) -> list:
+    """Values for python-pptx, NaN becoming None (a gap)"""
+    return [None if math.isnan(value) else value for value in values.tolist()]
+
+
+# --- reduction ---
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indexes of the points Largest-Triangle-Three-Buckets keeps out of x, y
+    (x ascending, no NaN): the first and last points, plus from each of
+    threshold - 2 equal buckets in between the point forming the largest
+    triangle with the point kept before it and the next bucket's average.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    kept = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[kept] - next_x) * (y[start:end] - y[kept])
+            - (x[kept] - x[start:end]) * (next_y - y[kept])
+        )
+        kept = start + int(np.argmax(area))
+        keep[bucket + 1] = kept
+    return keep
+
+
+def min_max_buckets(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indexes of the first and last points plus the lowest and highest point of
+    each of (threshold - 2) // 2 equal buckets, in order (y without NaN).
+    Unlike LTTB this keeps every spike, at the cost of a noisier line.
+    """
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    buckets = max(1, (threshold - 2) // 2)
+    bucket = np.arange(n) * buckets // n
+    # Sorted by bucket, then value: each bucket's run starts at its min and ends at its max
+    order = np.lexsort((y, bucket))
+    ends = np.cumsum(np.bincount(bucket, minlength=buckets))
+    starts = ends - np.bincount(bucket, minlength=buckets)
+    return np.unique(np.concatenate(([0, n - 1], order[starts], order[ends - 1])))
+
+
+def grid_thin(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Indexes of one point per occupied cell of a grid laid over the x, y range,
+    as fine as max_points allows. Keeps the shape of a cloud and its outliers,
+    where sampling would keep mostly its dense middle.
+    """
+    n = len(x)
+    if n <= max_points:
+        return np.arange(n)
+
+    def cells(values: np.ndarray, side: int) -> np.ndarray:
+        low, high = values.min(), values.max()
+        if high == low:
+            return np.zeros(len(values), dtype=np.int64)
+        return np.minimum(((values - low) / (high - low) * side).astype(np.int64), side - 1)
+
+    def thin(side: int) -> np.ndarray:
+        _, first = np.unique(cells(x, side) * side + cells(y, side), return_index=True)
+        return np.sort(first)
+
+    # A side of sqrt(max_points) cannot overflow; outliers stretching the range
+    # leave most cells empty though, so refine while the points still fit
+    side = max(1, math.isqrt(max_points))
+    kept = thin(side)
+    while side < n:
+        side *= 2
+        finer = thin(side)
+        if len(finer) > max_points:
+            break
+        kept = finer
+    return kept
+
+
+def group_categories(labels: list, series: List[np.ndarray], max_categories: int, aggregate: str):
+    """
+    Rows with the same category label combined (sum or mean, NaN skipped), in
+    order of first appearance. Beyond max_categories, the categories with the
+    largest total across series stay, in their order, and the rest become one
+    "Other" category. Returns (labels, series).
+    """
+    keys = np.array([str(label) for label in labels])
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    group = rank[inverse]
+    groups = len(order)
+    labels = [labels[first[idx]] for idx in order]
+
+    sums = [np.bincount(group, weights=np.nan_to_num(values), minlength=groups) for values in series]
+    counts = [np.bincount(group, weights=np.isfinite(values), minlength=groups) for values in series]
+
+    if groups > max_categories:
+        totals = np.sum([np.abs(values) for values in sums], axis=0)
+        top = np.sort(np.argsort(-totals, kind="stable")[:max_categories - 1])
+        rest = np.setdiff1d(np.arange(groups), top)
+        labels = [labels[idx] for idx in top] + [OTHER_LABEL]
+        sums = [np.append(values[top], values[rest].sum()) for values in sums]
+        counts = [np.append(values[top], values[rest].sum()) for values in counts]
+
+    if aggregate == "mean":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return labels, [total / count for total, count in zip(sums, counts)]
+    return labels, [np.where(count > 0, total, np.nan) for total, count in zip(sums, counts)]
+
+
+# --- chart data ---
+
+class _CategoryWorkbookWriter(CategoryWorkbookWriter):
+    """
+    Writes single-level categories as one column. python-pptx looks up each
+    category's row with a scan of all categories, which is quadratic: about a
+    second for 2,000 points.
+    """
+
+    def _write_categories(self, workbook, worksheet):
+        categories = self._chart_data.categories
+        if categories.depth != 1:
+            return super()._write_categories(workbook, worksheet)
+        num_format = workbook.add_format({"num_format": categories.number_format})
+        worksheet.set_column(0, 0, 10)  # wide enough for a date
+        worksheet.write_column(1, 0, [category.label for category in categories], num_format)
+
+
+class ColumnarChartData(CategoryChartData):
+    """CategoryChartData whose embedded workbook is written in linear time"""
+
+    @lazyproperty
+    def _workbook_writer(self):
+        return _CategoryWorkbookWriter(self)
+
+
+def _category_chart_data(labels: list, names: List[str], series: List[np.ndarray], number_format) -> ColumnarChartData:
+    chart_data = ColumnarChartData(number_format=number_format or "General")
+    chart_data.categories = labels
+    for name, values in zip(names, series):
+        chart_data.add_series(name, _optional_values(values))
+    return chart_data
+
+
+def _option(content: Dict[str, Any], key: str, default, valid=None, minimum=None):
+    value = content.get(key, default)
+    if valid is not None and value not in valid:
+        raise ValueError(f"Invalid {key} '{value}'. Valid values: {list(valid)}")
+    if minimum is not None and (not isinstance(value, int) or isinstance(value, bool) or value < minimum):
+        raise ValueError(f"{key} must be an integer of at least {minimum}")
+    return value
+
+
+# --- components ---
+
+class ChartComponent(Component):
+    """
+    A native chart. data is columnar: {"name": [values]}, a DataFrame, or rows
+    with a header row first. The first column holds the categories (the x
+    values of a scatter chart), every other column is one series.
+    """
+    chart_type = None
+    # Show a legend by default only when there is more than one series
+    legend_always = False
+
+    @abstractmethod
+    def chart_data(self, names: List[str], columns: List[list], content: Dict[str, Any]):
+        """The reduced data to embed, as python-pptx chart data"""
+        pass
+
+    def render(self, slide: Slide, content: Dict[str, Any]) -> None:
+        names, columns = chart_columns(content.get("data"))
+        chart_data = self.chart_data(names, columns, content)
+        left = content.get("left", 1)
+        top = content.get("top", 1.5)
+        width = content.get("width", 8)
+        height = content.get("height", 5)
+        left, top, width, height = clamp_box(left, top, width, height)
+        chart = slide.shapes.add_chart(
+            self.chart_type, Inches(left), Inches(top), Inches(width), Inches(height), chart_data
+        ).chart
+        self._style_chart(chart, content)
+
+    def _style_chart(self, chart, content: Dict[str, Any]) -> None:
+        body = self.theme.get_style("body")
+        chart.font.size = Pt(12)
+        if body and body.font_family:
+            chart.font.name = body.font_family
+        primary = RGBColor.from_string(self.theme.primary_color.lstrip("#"))
+
+        title = content.get("title")
+        chart.has_title = bool(title)
+        if title:
+            chart.chart_title.text_frame.text = title
+            font = chart.chart_title.text_frame.paragraphs[0].font
+            font.size = Pt(18)
+            font.bold = True
+            font.color.rgb = primary
+
+        plot = chart.plots[0]
+        chart.has_legend = bool(content.get("legend", self.legend_always or len(plot.series) > 1))
+        if chart.has_legend:
+            chart.legend.position = XL_LEGEND_POSITION.BOTTOM
+            chart.legend.include_in_layout = False
+        if content.get("data_labels"):
+            plot.has_data_labels = True
+        if len(plot.series) == 1:
+            self._color_series(plot.series[0], primary)
+
+    def _color_series(self, series, color: RGBColor) -> None:
+        """Give a lone series the theme's primary color"""
+        series.format.fill.solid()
+        series.format.fill.fore_color.rgb = color
+
+
+class BarChart(ChartComponent):
+    """
+    Clustered bars per category. Rows sharing a category are combined
+    (aggregate: sum or mean); beyond max_categories the smallest are grouped
+    as "Other".
+    """
+    chart_type = XL_CHART_TYPE.COLUMN_CLUSTERED
+    max_categories = 50
+
+    def chart_data(self, names, columns, content):
+        aggregate = _option(content, "aggregate", "sum", valid=AGGREGATES)
+        max_categories = _option(content, "max_categories", self.max_categories, minimum=2)
+        series = [numeric_column(name, column) for name, column in zip(names[1:], columns[1:])]
+        labels, series = group_categories(columns[0], series, max_categories, aggregate)
+        return _category_chart_data(labels, names[1:], series, content.get("number_format"))
+
+
+class PieChart(BarChart):
+    """A pie of the first value column, grouped by category as for BarChart"""
+    chart_type = XL_CHART_TYPE.PIE
+    max_categories = 8
+    legend_always = True
+
+    def chart_data(self, names, columns, content):
+        return super().chart_data(names[:2], columns[:2], content)
+
+    def _color_series(self, series, color: RGBColor) -> None:
+        """Slices keep their varied colors"""
+
+
+class LineChart(ChartComponent):
+    """
+    Lines over the categories, in order. Series longer than max_points are
+    downsampled (downsample: lttb or minmax); the categories kept are the
+    union of what each series needs, so all series stay aligned.
+    """
+    chart_type = XL_CHART_TYPE.LINE
+
+    def chart_data(self, names, columns, content):
+        method = _option(content, "downsample", "lttb", valid=DOWNSAMPLE_METHODS)
+        max_points = _option(content, "max_points", MAX_POINTS, minimum=3)
+        labels = columns[0]
+        series = [numeric_column(name, column) for name, column in zip(names[1:], columns[1:])]
+
+        if len(labels) > max_points:
+            # Numeric, ascending categories are the x axis; anything else is plotted evenly spaced
+            try:
+                x = numeric_column(names[0], labels)
+            except ValueError:
+                x = None
+            if x is None or not np.all(np.diff(x) > 0):
+                x = np.arange(len(labels), dtype=float)
+            budget = max(3, max_points // len(series))
+            keep = []
+            for values in series:
+                points = _finite_points(x, values)
+                if method == "lttb":
+                    chosen = lttb(x[points], values[points], budget)
+                else:
+                    chosen = min_max_buckets(values[points], budget)
+                keep.append(points[chosen])
+            keep = np.unique(np.concatenate(keep)) if keep else np.arange(0)
+            labels = [labels[idx] for idx in keep.tolist()]
+            series = [values[keep] for values in series]
+
+        return _category_chart_data(labels, names[1:], series, content.get("number_format"))
+
+    def _color_series(self, series, color: RGBColor) -> None:
+        series.format.line.color.rgb = color
+
+
+class ScatterChart(ChartComponent):
+    """
+    Points of each value column against the first column. Clouds larger than
+    max_points (shared between series) are thinned on a grid.
+    """
+    chart_type = XL_CHART_TYPE.XY_SCATTER
+
+    def chart_data(self, names, columns, content):
+        max_points = _option(content, "max_points", MAX_POINTS, minimum=3)
+        x = numeric_column(names[0], columns[0])
+        budget = max(1, max_points // (len(names) - 1))
+        chart_data = XyChartData(number_format=content.get("number_format") or "General")
+        for name, column in zip(names[1:], columns[1:]):
+            y = numeric_column(name, column)
+            points = _finite_points(x, y)
+            points = points[grid_thin(x[points], y[points], budget)]
+            series = chart_data.add_series(name)
+            for x_value, y_value in zip(x[points].tolist(), y[points].tolist()):
+                series.add_data_point(x_value, y_value)
+        return chart_data
+
+    def _color_series(self, series, color: RGBColor) -> None:
+        series.marker.format.fill.solid()
+        series.marker.format.fill.fore_color.rgb = color
@@ -2,12 +2,16 @@ from typing import Any, Dict, List
 from pptx.util import Inches, Pt
 from pptx.slide import Slide
 from .base import Component
+from .tables import BulkTable, table_rows
+from .templates import TemplateComponent, insert_shapes
 from pptx.enum.text import MSO_AUTO_SIZE, MSO_VERTICAL_ANCHOR
 from pptx.dml.color import RGBColor
 
 # Utility to clamp box within slide
 SLIDE_WIDTH = 10
 SLIDE_HEIGHT = 7.5
+# Space kept free below tables that continue on further slides
+TABLE_BOTTOM_MARGIN = 0.5
 
 def clamp_box(left, top, width, height):
     left = max(0, min(left, SLIDE_WIDTH))
@@ -82,12 +86,33 @@ class BulletWithTitle(Component):
                 p = tf.add_paragraph()
                 p.text = point
                 p.level = 0
-                self._apply_style(tf, "bullet")
+            self._apply_style(tf, "bullet")
 
-class TwoColumnText(Component):
+class TwoColumnText(TemplateComponent):
     """A slide layout with two columns of text"""
 
+    def prototypes(self, slide: Slide) -> Dict[str, Any]:
+        title_box = slide.shapes.add_textbox(0, 0, Inches(1), Inches(1))
+        title_box.text_frame.text = "{{title}}"
+        self._apply_style(title_box.text_frame, "title")
+
+        column = slide.shapes.add_textbox(0, 0, Inches(1), Inches(1))
+        tf = column.text_frame
+        tf.word_wrap = True
+        tf.auto_size = MSO_AUTO_SIZE.NONE  # No auto resizing
+        tf.vertical_anchor = MSO_VERTICAL_ANCHOR.TOP
+        tf.margin_top = Inches(0.05)
+        tf.margin_bottom = Inches(0.05)
+        tf.margin_left = Inches(0.05)
+        tf.margin_right = Inches(0.05)
+        tf.paragraphs[0].text = "{{text}}"
+        self._apply_style(tf, "body")
+        return {"title": title_box, "column": column}
+
     def render(self, slide: Slide, content: Dict[str, Any]) -> None:
+        templates = self.templates()
+        shapes = []
+
         # Title
         title_text = self._get_safe_content(content, "title")
         left = content.get("left", 1)
@@ -102,71 +127,75 @@ class TwoColumnText(Component):
             title_shape.text = title_text
             self._apply_style(title_shape.text_frame, "title")
         else:
-            title_box = slide.shapes.add_textbox(Inches(left), Inches(top - 0.5), Inches(width * 2 + column_gap), Inches(1))
-            title_box.text_frame.text = title_text
-            self._apply_style(title_box.text_frame, "title")
+            shapes.append(templates["title"].instantiate(
+                left, top - 0.5, width * 2 + column_gap, 1,
+                [("title", line) for line in title_text.split("\n")]
+            ))
 
-        # Helper to configure textbox safely
-        def configure_textbox(shape, text, style_name):
-            tf = shape.text_frame
-            tf.word_wrap = True
-            tf.auto_size = MSO_AUTO_SIZE.NONE  # No auto resizing
-            tf.vertical_anchor = MSO_VERTICAL_ANCHOR.TOP
-            tf.margin_top = Inches(0.05)
-            tf.margin_bottom = Inches(0.05)
-            tf.margin_left = Inches(0.05)
-            tf.margin_right = Inches(0.05)
-            p = tf.paragraphs[0]
-            p.text = text
-            self._apply_style(tf, style_name)
-
-        # Left column
+        # Left column, below the title
         left_text = self._get_safe_content(content, "left_text")
         if left_text:
-            left_box = slide.shapes.add_textbox(
-                Inches(left),
-                Inches(top + 1.0),  # Adjust top to leave space for title
-                Inches(width),
-                Inches(height)
-            )
-            configure_textbox(left_box, left_text, "body")
+            shapes.append(templates["column"].instantiate(left, top + 1.0, width, height, [("text", left_text)]))
 
         # Right column
         right_text = self._get_safe_content(content, "right_text")
         if right_text:
-            right_box = slide.shapes.add_textbox(
-                Inches(left + width + column_gap),
-                Inches(top + 1.0),
-                Inches(width),
-                Inches(height)
-            )
-            configure_textbox(right_box, right_text, "body")
+            shapes.append(templates["column"].instantiate(
+                left + width + column_gap, top + 1.0, width, height, [("text", right_text)]
+            ))
+
+        insert_shapes(slide, shapes)
 
 
 class ComparisonTable(Component):
-    """A table for comparing features, metrics, or options"""
+    """
+    A table for comparing features, metrics, or options. data is a list of
+    rows (header first), a NumPy array or DataFrame, or columns as
+    {"header": [values]}; ragged rows are padded. Rows that do not fit above
+    max_height continue on new slides under a repeated header row.
+    """
     def render(self, slide: Slide, content: Dict[str, Any]) -> None:
-        data: List[List[str]] = content.get("data", [])
+        rows = table_rows(content.get("data", []))
         left = content.get("left", 1)
         top = content.get("top", 2)
         width = content.get("width", 8)
         height = content.get("height", 3)
         left, top, width, height = clamp_box(left, top, width, height)
-        if data:
-            rows = len(data)
-            cols = len(data[0])
-            table = slide.shapes.add_table(rows, cols, Inches(left), Inches(top), Inches(width), Inches(height)).table
-            for r, row in enumerate(data):
-                for c, cell in enumerate(row):
-                    table.cell(r, c).text = str(cell)
-                    # Optionally style header row
-                    if r == 0:
-                        for paragraph in table.cell(r, c).text_frame.paragraphs:
-                            for run in paragraph.runs:
-                                run.font.bold = True
-
-class IconList(Component):
+        if not rows:
+            return
+
+        table = BulkTable(rows, Inches(width), font_size=content.get("font_size"))
+        capacity = None
+        if self.new_slide is not None:
+            max_height = content.get("max_height", SLIDE_HEIGHT - top - TABLE_BOTTOM_MARGIN)
+            capacity = Inches(max(height, max_height))
+
+        title = slide.shapes.title.text_frame.text.strip() if slide.shapes.title is not None else ""
+        for page_number, page in enumerate(table.pages(capacity)):
+            if page_number > 0:
+                slide = self._continuation_slide()
+                if title and slide.shapes.title is not None:
+                    slide.shapes.title.text = f"{title} (cont.)"
+                    self._apply_style(slide.shapes.title.text_frame, "title")
+            heights = table.row_heights(page, Inches(height), capacity)
+            insert_shapes(slide, [table.graphic_frame(page, Inches(left), Inches(top), heights)])
+
+class IconList(TemplateComponent):
     """A list with icons (uses bullet points as icons for simplicity)"""
+    def prototypes(self, slide: Slide) -> Dict[str, Any]:
+        shape = slide.shapes.add_textbox(0, 0, Inches(1), Inches(1))
+        tf = shape.text_frame
+        tf.clear()
+        p = tf.add_paragraph()
+        p.text = "{{item}}"
+        p.level = 0
+        p.font.size = Pt(18)
+        p.font.bold = False
+        p.font.italic = False
+        p.font.name = "Arial"
+        p.font.color.rgb = RGBColor(0, 0, 0)  # Example: black
+        return {"list": shape}
+
     def render(self, slide: Slide, content: Dict[str, Any]) -> None:
         items: List[str] = content.get("items", [])
         left = content.get("left", 1)
@@ -174,22 +203,27 @@ class IconList(Component):
         width = content.get("width", 8)
         height = content.get("height", 4)
         left, top, width, height = clamp_box(left, top, width, height)
-        shape = slide.shapes.add_textbox(Inches(left), Inches(top), Inches(width), Inches(height))
+        shape = self.templates()["list"].instantiate(left, top, width, height, [("item", item) for item in items])
+        insert_shapes(slide, [shape])
+
+class QuoteBlock(TemplateComponent):
+    """A stylized block for a quote, with optional attribution"""
+    def prototypes(self, slide: Slide) -> Dict[str, Any]:
+        shape = slide.shapes.add_textbox(0, 0, Inches(1), Inches(1))
         tf = shape.text_frame
+        configure_textbox_frame(tf)
         tf.clear()
-        for item in items:
-            p = tf.add_paragraph()
-            p.text = item
-            p.level = 0
-            p.font.size = Pt(18)
-            p.font.bold = False
-            p.font.italic = False
-            p.font.name = "Arial"
-            p.bullet = True
-            p.font.color.rgb = RGBColor(0, 0, 0)  # Example: black
-
-class QuoteBlock(Component):
-    """A stylized block for a quote, with optional attribution"""
+        p = tf.add_paragraph()
+        p.text = "{{quote}}"
+        p.font.size = Pt(24)
+        p.font.italic = True
+        p = tf.add_paragraph()
+        p.text = "{{author}}"
+        p.font.size = Pt(16)
+        p.font.italic = False
+        p.font.bold = True
+        return {"quote": shape}
+
     def render(self, slide: Slide, content: Dict[str, Any]) -> None:
         quote = content.get("quote", "")
         author = content.get("author", "")
@@ -202,23 +236,23 @@ class QuoteBlock(Component):
         max_chars = int(width * height * 20)  # rough estimate
         if len(quote) > max_chars:
             quote = quote[:max_chars-3] + "..."
-        shape = slide.shapes.add_textbox(Inches(left), Inches(top), Inches(width), Inches(height))
+        paragraphs = [("quote", f'“{quote}”')]
+        if author:
+            paragraphs.append(("author", f'- {author}'))
+        insert_shapes(slide, [self.templates()["quote"].instantiate(left, top, width, height, paragraphs)])
+
+class Timeline(TemplateComponent):
+    """A horizontal timeline with labeled milestones"""
+    def prototypes(self, slide: Slide) -> Dict[str, Any]:
+        shape = slide.shapes.add_textbox(0, 0, Inches(1), Inches(1))
         tf = shape.text_frame
-        configure_textbox_frame(tf)
         tf.clear()
         p = tf.add_paragraph()
-        p.text = f'“{quote}”'
-        p.font.size = Pt(24)
-        p.font.italic = True
-        if author:
-            p = tf.add_paragraph()
-            p.text = f'- {author}'
-            p.font.size = Pt(16)
-            p.font.italic = False
-            p.font.bold = True
+        p.text = "{{label}}"
+        p.font.size = Pt(14)
+        p.font.bold = True
+        return {"milestone": shape}
 
-class Timeline(Component):
-    """A horizontal timeline with labeled milestones"""
     def render(self, slide: Slide, content: Dict[str, Any]) -> None:
         milestones: List[str] = content.get("milestones", [])
         left = content.get("left", 1)
@@ -229,19 +263,25 @@ class Timeline(Component):
         if not milestones:
             return
         step = width / max(1, len(milestones)-1)
-        for i, label in enumerate(milestones):
-            x = left + i * step
-            shape = slide.shapes.add_textbox(Inches(x), Inches(top), Inches(1.2), Inches(height))
-            tf = shape.text_frame
-            tf.clear()
-            p = tf.add_paragraph()
-            p.text = label
-            p.font.size = Pt(14)
-            p.font.bold = True
-            # Optionally, add a line/arrow between milestones (not implemented here)
-
-class ProcessFlow(Component):
+        milestone = self.templates()["milestone"]
+        insert_shapes(slide, [
+            milestone.instantiate(left + i * step, top, 1.2, height, [("label", label)])
+            for i, label in enumerate(milestones)
+        ])
+        # Optionally, add a line/arrow between milestones (not implemented here)
+
+class ProcessFlow(TemplateComponent):
     """A series of labeled boxes/arrows to show a process or workflow"""
+    def prototypes(self, slide: Slide) -> Dict[str, Any]:
+        shape = slide.shapes.add_textbox(0, 0, Inches(1), Inches(1))
+        tf = shape.text_frame
+        tf.clear()
+        p = tf.add_paragraph()
+        p.text = "{{label}}"
+        p.font.size = Pt(14)
+        p.font.bold = True
+        return {"step": shape}
+
     def render(self, slide: Slide, content: Dict[str, Any]) -> None:
         steps: List[str] = content.get("steps", [])
         left = content.get("left", 1)
@@ -252,19 +292,33 @@ class ProcessFlow(Component):
         if not steps:
             return
         step_width = width / max(1, len(steps))
-        for i, label in enumerate(steps):
-            x = left + i * step_width
-            shape = slide.shapes.add_textbox(Inches(x), Inches(top), Inches(step_width-0.2), Inches(height))
-            tf = shape.text_frame
-            tf.clear()
-            p = tf.add_paragraph()
-            p.text = label
-            p.font.size = Pt(14)
-            p.font.bold = True
-            # Optionally, add arrows between boxes (not implemented here)
-
-class StatisticHighlight(Component):
+        step = self.templates()["step"]
+        insert_shapes(slide, [
+            step.instantiate(left + i * step_width, top, step_width-0.2, height, [("label", label)])
+            for i, label in enumerate(steps)
+        ])
+        # Optionally, add arrows between boxes (not implemented here)
+
+class StatisticHighlight(TemplateComponent):
     """A large, bold number or percentage with a label and optional supporting text"""
+    def prototypes(self, slide: Slide) -> Dict[str, Any]:
+        shape = slide.shapes.add_textbox(0, 0, Inches(1), Inches(1))
+        tf = shape.text_frame
+        tf.clear()
+        p = tf.add_paragraph()
+        p.text = "{{value}}"
+        p.font.size = Pt(48)
+        p.font.bold = True
+        p = tf.add_paragraph()
+        p.text = "{{label}}"
+        p.font.size = Pt(20)
+        p.font.bold = False
+        p = tf.add_paragraph()
+        p.text = "{{subtext}}"
+        p.font.size = Pt(14)
+        p.font.italic = True
+        return {"statistic": shape}
+
     def render(self, slide: Slide, content: Dict[str, Any]) -> None:
         value = content.get("value", "")
         label = content.get("label", "")
@@ -274,26 +328,29 @@ class StatisticHighlight(Component):
         width = content.get("width", 4)
         height = content.get("height", 2)
         left, top, width, height = clamp_box(left, top, width, height)
-        shape = slide.shapes.add_textbox(Inches(left), Inches(top), Inches(width), Inches(height))
+        paragraphs = [("value", str(value))]
+        if label:
+            paragraphs.append(("label", label))
+        if subtext:
+            paragraphs.append(("subtext", subtext))
+        insert_shapes(slide, [self.templates()["statistic"].instantiate(left, top, width, height, paragraphs)])
+
+class CalloutBox(TemplateComponent):
+    """A colored box with a key message, optionally with an icon"""
+    def prototypes(self, slide: Slide) -> Dict[str, Any]:
+        shape = slide.shapes.add_textbox(0, 0, Inches(1), Inches(1))
+        fill = shape.fill
+        fill.solid()
+        fill.fore_color.rgb = RGBColor(255, 215, 0)  # Default: gold
         tf = shape.text_frame
+        configure_textbox_frame(tf)
         tf.clear()
         p = tf.add_paragraph()
-        p.text = str(value)
-        p.font.size = Pt(48)
+        p.text = "{{message}}"
+        p.font.size = Pt(20)
         p.font.bold = True
-        if label:
-            p = tf.add_paragraph()
-            p.text = label
-            p.font.size = Pt(20)
-            p.font.bold = False
-        if subtext:
-            p = tf.add_paragraph()
-            p.text = subtext
-            p.font.size = Pt(14)
-            p.font.italic = True
+        return {"callout": shape}
 
-class CalloutBox(Component):
-    """A colored box with a key message, optionally with an icon"""
     def render(self, slide: Slide, content: Dict[str, Any]) -> None:
         message = content.get("message", "")
         left = content.get("left", 1)
@@ -301,24 +358,27 @@ class CalloutBox(Component):
         width = content.get("width", 8)
         height = content.get("height", 1)
         left, top, width, height = clamp_box(left, top, width, height)
-        shape = slide.shapes.add_textbox(Inches(left), Inches(top), Inches(width), Inches(height))
-        fill = shape.fill
-        fill.solid()
         color = content.get("color", None)
-        if isinstance(color, (list, tuple)) and len(color) == 3:
-            fill.fore_color.rgb = RGBColor(*color)
-        else:
-            fill.fore_color.rgb = RGBColor(255, 215, 0)  # Default: gold
+        fill = RGBColor(*color) if isinstance(color, (list, tuple)) and len(color) == 3 else None
+        shape = self.templates()["callout"].instantiate(left, top, width, height, [("message", message)], fill=fill)
+        insert_shapes(slide, [shape])
+
+class SectionDivider(TemplateComponent):
+    """A slide with a big title and a visual separator"""
+    def prototypes(self, slide: Slide) -> Dict[str, Any]:
+        shape = slide.shapes.add_textbox(0, 0, Inches(1), Inches(1))
         tf = shape.text_frame
-        configure_textbox_frame(tf)
         tf.clear()
         p = tf.add_paragraph()
-        p.text = message
-        p.font.size = Pt(20)
+        p.text = "{{title}}"
+        p.font.size = Pt(36)
         p.font.bold = True
+        line = slide.shapes.add_shape(
+            1,  # msoShapeLine
+            0, 0, Inches(1), Inches(1)
+        )
+        return {"title": shape, "line": line}
 
-class SectionDivider(Component):
-    """A slide with a big title and a visual separator"""
     def render(self, slide: Slide, content: Dict[str, Any]) -> None:
         title = content.get("title", "Section")
         left = content.get("left", 1)
@@ -326,15 +386,9 @@ class SectionDivider(Component):
         width = content.get("width", 8)
         height = content.get("height", 2)
         left, top, width, height = clamp_box(left, top, width, height)
-        shape = slide.shapes.add_textbox(Inches(left), Inches(top), Inches(width), Inches(height))
-        tf = shape.text_frame
-        tf.clear()
-        p = tf.add_paragraph()
-        p.text = title
-        p.font.size = Pt(36)
-        p.font.bold = True
-        # Add a line below the title
-        slide.shapes.add_shape(
-            1,  # msoShapeLine
-            Inches(left), Inches(top + 1.5), Inches(width), Inches(0.05)
-        ) 
\ No newline at end of file
+        templates = self.templates()
+        insert_shapes(slide, [
+            templates["title"].instantiate(left, top, width, height, [("title", title)]),
+            # A line below the title
+            templates["line"].instantiate(left, top + 1.5, width, 0.05)
+        ])
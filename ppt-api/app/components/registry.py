@@ -0,0 +1,56 @@
+"""
+Component registry: component type name -> component class.
+
+Built once at import instead of per request. Templated components compile
+their shapes on first use per theme (see templates.py), so after warm-up an
+add_component call is a dict lookup plus a handful of element copies.
+"""
+from typing import Any, Callable, Dict, List, Optional, Type
+
+from pptx.slide import Slide
+
+from ..themes.theme import Theme
+from .base import Component
+from .charts import BarChart, LineChart, PieChart, ScatterChart
+from .layouts import (
+    HeaderWithImage, BulletWithTitle, TwoColumnText,
+    ComparisonTable, IconList, QuoteBlock, Timeline, ProcessFlow, StatisticHighlight, CalloutBox, SectionDivider
+)
+
+COMPONENTS: Dict[str, Type[Component]] = {
+    "header_with_image": HeaderWithImage,
+    "bullet_with_title": BulletWithTitle,
+    "two_column_text": TwoColumnText,
+    "comparison_table": ComparisonTable,
+    "icon_list": IconList,
+    "quote_block": QuoteBlock,
+    "timeline": Timeline,
+    "process_flow": ProcessFlow,
+    "statistic_highlight": StatisticHighlight,
+    "callout_box": CalloutBox,
+    "section_divider": SectionDivider,
+    "bar_chart": BarChart,
+    "line_chart": LineChart,
+    "pie_chart": PieChart,
+    "scatter_chart": ScatterChart
+}
+
+
+def render_component(
+    slide: Slide,
+    component_type: str,
+    content: Dict[str, Any],
+    theme: Theme,
+    new_slide: Optional[Callable[[], Slide]] = None
+) -> List[Slide]:
+    """
+    Render a component onto slide, the theme's defaults for the component
+    overridden by content. Components that overflow (long tables) continue on
+    slides made by new_slide, if given; those slides are returned in order.
+    Raises KeyError for an unknown component type.
+    """
+    component_class = COMPONENTS[component_type]
+    content = {**theme.component_defaults.get(component_type, {}), **content}
+    component = component_class(theme=theme, new_slide=new_slide)
+    component.render(slide, content)
+    return component.continuation_slides
@@ -0,0 +1,199 @@
+"""
+Table engine for large tables.
+
+A table is written as XML in bulk: all its rows are formatted into one string
+and parsed once, instead of creating an empty table through python-pptx and
+setting every cell's text through its proxies. Row heights are estimated from
+the length of the text against the column widths, so rows that do not fit
+below the table's top can be moved onto continuation slides, each starting
+with a copy of the header row.
+"""
+import math
+import numbers
+import re
+from itertools import zip_longest
+from typing import Any, List, Optional
+from xml.sax.saxutils import escape
+
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls
+from pptx.oxml.shapes.graphfrm import CT_GraphicalObjectFrame
+
+EMU_PER_PT = 12700
+# Default a:tcPr margins
+CELL_MARGIN_X = 91440
+CELL_MARGIN_Y = 45720
+# PowerPoint's size for table text that sets none
+DEFAULT_FONT_SIZE = 18
+# Range of a:rPr sz (100-400000 hundredths of a point), in points
+MIN_FONT_SIZE = 1
+MAX_FONT_SIZE = 4000
+# Average glyph width and line pitch, as fractions of the font size
+CHAR_WIDTH = 0.5
+LINE_PITCH = 1.2
+
+# Control characters python-pptx escapes in run text; tab and line feed are kept
+_CTRL_CHARS = re.compile(r"[\x00-\x08\x0B-\x1F]")
+_LINE_BREAKS = re.compile("\n|\v")
+
+
+def _as_list(values) -> list:
+    if hasattr(values, "tolist"):
+        values = values.tolist()
+    if isinstance(values, (list, tuple)):
+        return list(values)
+    if isinstance(values, (str, bytes, dict)) or not hasattr(values, "__iter__"):
+        return [values]
+    return list(values)
+
+
+def _cell_text(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value)
+
+
+def table_rows(data: Any) -> List[List[str]]:
+    """
+    Table data as rows of cell text, header row first, all of the same length.
+
+    data is a list of rows; a 2-D NumPy array (anything with tolist()); a
+    DataFrame (anything with columns and to_numpy(), the column names becoming
+    the header row); or columns as {"header": [values, ...]}. Short rows and
+    columns are padded with empty cells, and None and NaN become empty cells.
+    """
+    if isinstance(data, dict):
+        headers = list(data)
+        columns = [_as_list(data[header]) for header in headers]
+        rows = [headers] + [list(row) for row in zip_longest(*columns, fillvalue="")]
+    elif hasattr(data, "columns") and hasattr(data, "to_numpy"):
+        rows = [list(data.columns)] + data.to_numpy().tolist()
+    elif hasattr(data, "tolist"):
+        rows = data.tolist()
+    else:
+        rows = data or []
+    rows = [[_cell_text(value) for value in _as_list(row)] for row in rows]
+
+    width = max((len(row) for row in rows), default=0)
+    if width == 0:
+        return []
+    for row in rows:
+        if len(row) < width:
+            row.extend([""] * (width - len(row)))
+    return rows
+
+
+class BulkTable:
+    """
+    Rows of cell text laid out in a table of the given width (EMU), with the
+    columns splitting it evenly as python-pptx's add_table() does. font_size
+    (points, MIN_FONT_SIZE to MAX_FONT_SIZE) sets the size of all cell text;
+    without it PowerPoint's default is assumed for the row heights. Raises
+    ValueError for any other font_size.
+    """
+
+    def __init__(self, rows: List[List[str]], width: int, font_size: Optional[float] = None, bold_header: bool = True):
+        self.rows = rows
+        self.width = width
+        cols = len(rows[0])
+        colwidth = width // cols
+        self.col_widths = [colwidth] * (cols - 1) + [width - colwidth * (cols - 1)]
+
+        if font_size is not None and (
+            isinstance(font_size, bool) or not isinstance(font_size, numbers.Real)
+            or not MIN_FONT_SIZE <= font_size <= MAX_FONT_SIZE
+        ):
+            raise ValueError(f"font_size must be a number of points from {MIN_FONT_SIZE} to {MAX_FONT_SIZE}")
+        size = f' sz="{int(font_size * 100)}"' if font_size is not None else ""
+        self._rPr = f"<a:rPr{size}/>" if size else ""
+        self._header_rPr = f'<a:rPr{size} b="1"/>' if bold_header else self._rPr
+        self.text_heights = self._estimate_heights(font_size or DEFAULT_FONT_SIZE)
+
+    def _estimate_heights(self, font_size: float) -> List[int]:
+        """Height each row needs for its text, in EMU"""
+        char_width = font_size * EMU_PER_PT * CHAR_WIDTH
+        line_height = font_size * EMU_PER_PT * LINE_PITCH
+        chars_per_line = [max(1, int((width - 2 * CELL_MARGIN_X) / char_width)) for width in self.col_widths]
+        heights = []
+        for row in self.rows:
+            lines = 1
+            for text, per_line in zip(row, chars_per_line):
+                if len(text) <= per_line and "\n" not in text and "\v" not in text:
+                    continue
+                cell_lines = sum(-(-len(line) // per_line) or 1 for line in _LINE_BREAKS.split(text))
+                lines = max(lines, cell_lines)
+            heights.append(int(lines * line_height) + 2 * CELL_MARGIN_Y)
+        return heights
+
+    def pages(self, capacity: Optional[int] = None) -> List[List[int]]:
+        """
+        Row indexes per slide: the header row (0), then as many body rows as fit
+        in capacity EMU, and at least one. Without capacity all rows go on one.
+        """
+        if capacity is None:
+            return [list(range(len(self.rows)))]
+        pages = []
+        page, used = [0], self.text_heights[0]
+        for idx in range(1, len(self.rows)):
+            height = self.text_heights[idx]
+            if len(page) > 1 and used + height > capacity:
+                pages.append(page)
+                page, used = [0], self.text_heights[0]
+            page.append(idx)
+            used += height
+        pages.append(page)
+        return pages
+
+    def row_heights(self, page: List[int], height: int, capacity: Optional[int] = None) -> List[int]:
+        """
+        Heights of a page's rows for a table at least height EMU tall: split
+        evenly as python-pptx does, each row raised to what its text needs. Rows
+        are sized to their text alone if that would overrun capacity.
+        """
+        even = height // len(page)
+        split = [even] * (len(page) - 1) + [height - even * (len(page) - 1)]
+        heights = [max(share, self.text_heights[idx]) for share, idx in zip(split, page)]
+        if capacity is not None and sum(heights) > capacity:
+            heights = [self.text_heights[idx] for idx in page]
+        return heights
+
+    def _cell_xml(self, text: str, rPr: str) -> str:
+        paragraphs = []
+        for paragraph in text.split("\n"):
+            runs = []
+            for idx, piece in enumerate(paragraph.split("\v")):
+                if idx:
+                    runs.append("<a:br/>")
+                if piece:
+                    runs.append(f"<a:r>{rPr}<a:t>{escape(_CTRL_CHARS.sub(_escape_ctrl_char, piece))}</a:t></a:r>")
+            paragraphs.append(f"<a:p>{''.join(runs)}</a:p>" if runs else "<a:p/>")
+        return f"<a:tc><a:txBody><a:bodyPr/><a:lstStyle/>{''.join(paragraphs)}</a:txBody><a:tcPr/></a:tc>"
+
+    def graphic_frame(self, page: List[int], left: int, top: int, heights: List[int]):
+        """A p:graphicFrame holding the page's rows at the given heights; ids are assigned by insert_shapes()"""
+        xml = [f"<a:tbl {nsdecls('a')}><a:tblGrid>"]
+        xml.extend(f'<a:gridCol w="{width}"/>' for width in self.col_widths)
+        xml.append("</a:tblGrid>")
+        for idx, height in zip(page, heights):
+            rPr = self._header_rPr if idx == 0 else self._rPr
+            xml.append(f'<a:tr h="{height}">')
+            xml.extend(self._cell_xml(text, rPr) for text in self.rows[idx])
+            xml.append("</a:tr>")
+        xml.append("</a:tbl>")
+        built = parse_xml("".join(xml))
+
+        # Frame and table properties come from python-pptx, so the table is
+        # indistinguishable from one made by add_table()
+        frame = CT_GraphicalObjectFrame.new_table_graphicFrame(0, "Table 0", 1, 1, left, top, self.width, sum(heights))
+        tbl = frame.graphic.graphicData.tbl
+        grid = tbl.tblGrid
+        for element in list(grid) + tbl.tr_lst:
+            element.getparent().remove(element)
+        built_grid = built[0]
+        grid.extend(list(built_grid))
+        tbl.extend(list(built)[1:])
+        return frame
+
+
+def _escape_ctrl_char(match) -> str:
+    return "_x%04X_" % ord(match.group(0))
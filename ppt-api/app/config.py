@@ -0,0 +1,79 @@
+"""
+Runtime configuration read from environment variables.
+"""
+import os
+import tempfile
+
+# Session id used when a request does not carry one, so single-user clients
+# (the MCP server, the orchestrator) keep working unchanged
+DEFAULT_SESSION_ID = os.environ.get("PPT_DEFAULT_SESSION_ID", "default")
+
+# Approximate memory budget for decks held in memory across all sessions.
+# Least recently used idle decks beyond this budget are spilled to disk.
+SESSION_MEMORY_BUDGET_MB = int(os.environ.get("PPT_SESSION_MEMORY_BUDGET_MB", "512"))
+
+# Directory where spilled decks are written
+SESSION_SPILL_DIR = os.environ.get(
+    "PPT_SESSION_SPILL_DIR",
+    os.path.join(tempfile.gettempdir(), "ppt-api-sessions")
+)
+
+# Upper bound on the packaged size of unedited parsed decks kept for reuse
+# when the same bytes are uploaded again via /set/slideBase64
+PARSE_CACHE_MB = int(os.environ.get("PPT_PARSE_CACHE_MB", "128"))
+
+# Uploads and exports larger than this are spooled to a temp file instead of memory
+SPOOL_MAX_MEMORY_MB = int(os.environ.get("PPT_SPOOL_MAX_MEMORY_MB", "8"))
+
+# Default compression for exported packages: stored, fast, default or max.
+# Can be overridden per request with the compression query parameter.
+EXPORT_COMPRESSION = os.environ.get("PPT_EXPORT_COMPRESSION", "default")
+
+# Number of deck revisions kept in each session's history for diff and revert.
+# Revisions share the XML of slides they did not change, so each one costs
+# roughly the size of the slides it touched.
+HISTORY_MAX_REVISIONS = int(os.environ.get("PPT_HISTORY_MAX_REVISIONS", "100"))
+
+# Directory for each session's write-ahead operation log and checkpoints, used
+# to rebuild decks after a restart. Set to an empty string to disable.
+JOURNAL_DIR = os.environ.get(
+    "PPT_JOURNAL_DIR",
+    os.path.join(tempfile.gettempdir(), "ppt-api-journal")
+)
+
+# Logged operations after which a session's deck is checkpointed and its log compacted
+CHECKPOINT_EVERY_OPS = int(os.environ.get("PPT_CHECKPOINT_EVERY_OPS", "50"))
+
+# Where session state lives so several worker processes on one host can serve
+# the same sessions: memory (one worker only), disk or sqlite
+STATE_BACKEND = os.environ.get("PPT_STATE_BACKEND", "memory")
+
+# Directory for the disk backend's files or the sqlite backend's database
+STATE_BACKEND_PATH = os.environ.get(
+    "PPT_STATE_BACKEND_PATH",
+    os.path.join(tempfile.gettempdir(), "ppt-api-shared")
+)
+
+# How long a worker's lease on a session lasts if it is never released (e.g.
+# the worker died), and how long another worker waits for it before a 503
+SESSION_LEASE_TTL_S = float(os.environ.get("PPT_SESSION_LEASE_TTL_S", "30"))
+SESSION_LEASE_WAIT_S = float(os.environ.get("PPT_SESSION_LEASE_WAIT_S", "10"))
+
+# Directory of additional theme definitions (<key>.json or <key>.toml), on top
+# of the built-in ones. Themes imported through the API are saved here.
+THEMES_DIR = os.environ.get(
+    "PPT_THEMES_DIR",
+    os.path.join(tempfile.gettempdir(), "ppt-api-themes")
+)
+
+# Seconds between checks for changed theme definition files; 0 disables reloading
+THEME_RELOAD_INTERVAL_S = float(os.environ.get("PPT_THEME_RELOAD_INTERVAL_S", "2"))
+
+# Worker processes that render large outline-to-deck requests in parallel
+# (shared by all sessions of this server process); 0 or 1 renders them in the
+# request thread. With several server workers, divide the cores between them.
+GENERATION_WORKERS = int(os.environ.get("PPT_GENERATION_WORKERS", str(os.cpu_count() or 1)))
+
+# Outlines with up to this many slides are rendered in the request thread;
+# larger ones are split into chunks of at least this many slides per worker task
+GENERATION_CHUNK_SLIDES = int(os.environ.get("PPT_GENERATION_CHUNK_SLIDES", "8"))
@@ -1,14 +1,22 @@
 """
-Main application file - wires routers together and maintains global state.
+Main application file - wires routers together and owns the session store.
 """
+import functools
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from pptx import Presentation
-from typing import Dict
 
-from .themes.theme import Theme, THEMES
+from .config import (
+    SESSION_MEMORY_BUDGET_MB, SESSION_SPILL_DIR, PARSE_CACHE_MB, JOURNAL_DIR, CHECKPOINT_EVERY_OPS,
+    STATE_BACKEND, STATE_BACKEND_PATH, SESSION_LEASE_TTL_S, SESSION_LEASE_WAIT_S, THEME_RELOAD_INTERVAL_S
+)
+from .state.store import SessionStore
+from .state.parse_cache import ParseCache
+from .state.shared import create_backend
+from .themes.registry import THEMES
 from .api.v1.routes import router as v1_router
 from .api.v2.routes import router as v2_router, backward_compat_router
+from .api.v2.batch import replay_operation
 
 # Create FastAPI app
 app = FastAPI()
@@ -22,10 +30,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global state - shared across all routers
-prs = Presentation()
-slide_map: Dict[str, object] = {}
-current_theme: Theme = THEMES["default"]
+# Per-session presentation state - each session has its own prs, slide_map and current_theme.
+# Routes resolve the caller's session through app.state.dependencies.get_session.
+# With a shared state backend, several worker processes can serve the same sessions;
+# every edit is then published to the backend, which makes the journal redundant.
+state_backend = create_backend(STATE_BACKEND, STATE_BACKEND_PATH)
+app.state.sessions = SessionStore(
+    memory_budget_bytes=SESSION_MEMORY_BUDGET_MB * 1024 * 1024,
+    spill_dir=SESSION_SPILL_DIR,
+    journal_dir=JOURNAL_DIR if state_backend is None else None,
+    checkpoint_every=CHECKPOINT_EVERY_OPS,
+    backend=state_backend,
+    lease_ttl=SESSION_LEASE_TTL_S,
+    lease_wait=SESSION_LEASE_WAIT_S
+)
+# Sessions with a journal but no deck in memory or on the spill disk (i.e. after a
+# restart) are rebuilt by replaying their logged operations through the routes
+app.state.sessions.replay = functools.partial(replay_operation, v1_router.routes + v2_router.routes)
+
+# Parsed decks keyed by upload hash, shared by all sessions
+app.state.parse_cache = ParseCache(max_bytes=PARSE_CACHE_MB * 1024 * 1024)
+
+# Pick up added or edited theme definition files without a restart
+THEMES.watch(THEME_RELOAD_INTERVAL_S)
 
 # Wire routers together
 app.include_router(v1_router)
@@ -0,0 +1 @@
+# .pptx (OPC) package serialization helpers
@@ -0,0 +1,206 @@
+"""
+Delta ingestion: the client sends per-part hashes of its .pptx package and then
+only the parts that differ from what the server already holds.
+
+Protocol:
+1. POST a manifest {partname: sha256 of the part's uncompressed bytes}.
+   The server answers with the partnames it needs.
+2. POST the same manifest plus the needed parts (base64). The server patches
+   its in-memory package in place when only leaf parts (slides, notes, charts,
+   media) changed, and otherwise rebuilds the package from the merged parts.
+
+The first sync of a session has no baseline, so every part is needed.
+"""
+import base64
+import hashlib
+import io
+import uuid
+import zipfile
+from typing import Dict, List, Optional
+
+from pptx import Presentation
+from pptx.opc.oxml import parse_xml
+from pptx.opc.package import Part, XmlPart
+from pptx.parts.chart import ChartPart
+from pptx.parts.coreprops import CorePropertiesPart
+from pptx.parts.slide import NotesSlidePart, SlidePart
+
+from .opc import PART, normalize_partname, package_entries, package_entry_map
+
+# XML part classes whose proxies can be rebuilt after swapping their element.
+# Presentation, master and layout parts are referenced from too many places.
+_PATCHABLE_XML_PARTS = (SlidePart, NotesSlidePart, ChartPart, CorePropertiesPart)
+
+# lazyproperty caches derived from a part's content, dropped after patching it
+_DERIVED_CACHES = ("slide", "notes_slide", "chart", "chart_workbook", "sha1")
+
+
+class DeltaError(Exception):
+    """Raised when a delta cannot be applied; needed lists parts the client must send"""
+
+    def __init__(self, message: str, needed: Optional[List[str]] = None):
+        super().__init__(message)
+        self.needed = needed or []
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _fingerprint(entry):
+    """
+    Cheap identity of a member's current server-side content. Binary blobs are
+    never mutated in place, so the blob object itself is enough; XML is hashed.
+    """
+    if not entry.is_xml:
+        return entry.part._blob
+    return _digest(entry.blob())
+
+
+class DeltaBaseline:
+    """
+    The client's part hashes as of the last sync, plus fingerprints of the
+    server's copy of each part at that moment so server-side edits made since
+    invalidate exactly the parts they touched.
+    """
+
+    def __init__(self, client_hashes: Dict[str, str], fingerprints: Dict[str, object], revision: int):
+        self.client_hashes = client_hashes
+        self.fingerprints = fingerprints
+        self.revision = revision
+
+    @classmethod
+    def capture(cls, prs, client_hashes: Dict[str, str], revision: int) -> "DeltaBaseline":
+        fingerprints = {entry.partname: _fingerprint(entry) for entry in package_entries(prs)}
+        return cls(dict(client_hashes), fingerprints, revision)
+
+    def unchanged_parts(self, prs, revision: int) -> Dict[str, str]:
+        """{partname: client hash} for parts the server still holds exactly as the client sent them"""
+        if revision == self.revision:
+            return dict(self.client_hashes)
+        unchanged = {}
+        current = package_entry_map(prs)
+        for partname, client_hash in self.client_hashes.items():
+            entry = current.get(partname)
+            if entry is None:
+                continue
+            fingerprint = _fingerprint(entry)
+            baseline = self.fingerprints.get(partname)
+            if fingerprint is baseline or fingerprint == baseline:
+                unchanged[partname] = client_hash
+        return unchanged
+
+
+def normalize_manifest(manifest: Dict[str, str]) -> Dict[str, str]:
+    return {normalize_partname(name): digest.lower() for name, digest in manifest.items()}
+
+
+def needed_parts(session, manifest: Dict[str, str]) -> List[str]:
+    """Partnames in manifest the server cannot reconstruct from its own copy"""
+    baseline = session.delta_baseline
+    known = baseline.unchanged_parts(session.prs, session.revision) if baseline is not None else {}
+    return [name for name, digest in manifest.items() if known.get(name) != digest]
+
+
+def _decode_uploads(manifest: Dict[str, str], parts: Dict[str, str]) -> Dict[str, bytes]:
+    uploads = {}
+    for name, data in parts.items():
+        partname = normalize_partname(name)
+        if partname not in manifest:
+            raise DeltaError(f"Uploaded part {partname} is not in the manifest")
+        blob = base64.b64decode(data)
+        if _digest(blob) != manifest[partname]:
+            raise DeltaError(f"Hash mismatch for uploaded part {partname}")
+        uploads[partname] = blob
+    return uploads
+
+
+def _patch_in_place(session, manifest: Dict[str, str], uploads: Dict[str, bytes]) -> bool:
+    """
+    Swap changed leaf parts into the live package. Returns False (without
+    touching anything) when the change needs a full rebuild instead.
+    """
+    current = package_entry_map(session.prs)
+    if set(current) != set(manifest):
+        return False
+
+    # Parse everything first so a bad part leaves the deck untouched
+    patches = []
+    for partname, blob in uploads.items():
+        entry = current[partname]
+        if entry.kind != PART:
+            return False
+        part = entry.part
+        if isinstance(part, XmlPart):
+            if type(part) is not XmlPart and not isinstance(part, _PATCHABLE_XML_PARTS):
+                return False
+            patches.append((part, parse_xml(blob)))
+        elif isinstance(part, Part):
+            patches.append((part, blob))
+        else:
+            return False
+
+    patched = set()
+    for part, content in patches:
+        if isinstance(part, XmlPart):
+            part._element = content
+        else:
+            part._blob = content
+        for name in _DERIVED_CACHES:
+            part.__dict__.pop(name, None)
+        patched.add(part)
+
+    # Re-point slide ids at fresh proxies for the replaced slide elements
+    for slide_id, slide in list(session.slide_map.items()):
+        if slide.part in patched:
+            session.slide_map[slide_id] = slide.part.slide
+    return True
+
+
+def _rebuild(session, manifest: Dict[str, str], uploads: Dict[str, bytes]) -> None:
+    """Assemble a full package from uploaded parts plus the server's unchanged parts, then reload"""
+    current = package_entry_map(session.prs)
+    buffer = io.BytesIO()
+    # Stored, not deflated: this package is only parsed here, and harvesting
+    # stored members afterwards shares the blobs instead of copying them
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zf:
+        for partname in manifest:
+            blob = uploads[partname] if partname in uploads else current[partname].blob()
+            zf.writestr(partname[1:], blob)
+    buffer.seek(0)
+    prs = Presentation(buffer)
+
+    # Keep slide ids stable for slides whose part survived
+    ids_by_partname = {str(slide.part.partname): slide_id for slide_id, slide in session.slide_map.items()}
+    slide_ids = [ids_by_partname.get(str(slide.part.partname)) or str(uuid.uuid4()) for slide in prs.slides]
+    session.load(prs, slide_ids=slide_ids, package_size=buffer.getbuffer().nbytes, label="delta_apply")
+    session.entry_cache.harvest(buffer, prs)
+
+
+def apply_delta(session, manifest: Dict[str, str], parts: Dict[str, str]) -> Dict[str, object]:
+    """
+    Bring the session's deck in line with manifest using the uploaded parts.
+    Must be called holding the session's write lock.
+    """
+    manifest = normalize_manifest(manifest)
+    uploads = _decode_uploads(manifest, parts)
+
+    missing = [name for name in needed_parts(session, manifest) if name not in uploads]
+    if missing:
+        raise DeltaError("Parts missing from the upload", needed=missing)
+
+    if uploads and _patch_in_place(session, manifest, uploads):
+        mode = "patched"
+        session.bump_revision(label="delta_apply")
+    elif uploads or set(package_entry_map(session.prs)) != set(manifest):
+        # Reloading the rebuilt package records its revision
+        _rebuild(session, manifest, uploads)
+        mode = "rebuilt"
+    else:
+        mode = "unchanged"
+    session.delta_baseline = DeltaBaseline.capture(session.prs, manifest, session.revision)
+    return {
+        "mode": mode,
+        "parts_received": len(uploads),
+        "bytes_received": sum(len(blob) for blob in uploads.values())
+    }
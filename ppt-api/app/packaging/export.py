@@ -0,0 +1,60 @@
+"""
+Serialized snapshots of a deck, cached per session revision.
+"""
+import base64
+import hashlib
+from typing import Optional
+from urllib.parse import quote
+
+
+def etag_for(data: bytes) -> str:
+    """Strong ETag derived from the package bytes, so it stays valid across restarts"""
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header against etag"""
+    if not if_none_match:
+        return False
+    for value in if_none_match.split(","):
+        value = value.strip()
+        # Weak comparison: a W/ prefix does not matter for GET
+        if value.startswith("W/"):
+            value = value[2:]
+        if value == "*" or value == etag:
+            return True
+    return False
+
+
+def content_disposition(filename: str, default: str = "presentation.pptx") -> str:
+    """
+    Content-Disposition header downloading as filename. The quoted filename is
+    an ASCII fallback; names it cannot carry as-is are also sent in the RFC 5987
+    filename*=UTF-8'' form. Control characters (CR/LF would end the header) and
+    path separators are dropped.
+    """
+    name = "".join(ch for ch in filename if ch.isprintable() and ch not in "/\\").strip() or default
+    fallback = "".join(ch if " " <= ch <= "~" and ch != '"' else "_" for ch in name)
+    header = f'attachment; filename="{fallback}"'
+    if fallback != name:
+        header += "; filename*=UTF-8''" + quote(name, safe="")
+    return header
+
+
+class SerializedDeck:
+    """The package bytes of a deck at one revision and compression mode; base64 is derived on first use"""
+
+    __slots__ = ("revision", "compression", "data", "etag", "_base64")
+
+    def __init__(self, revision: int, compression: str, data: bytes):
+        self.revision = revision
+        self.compression = compression
+        self.data = data
+        self.etag = etag_for(data)
+        self._base64: Optional[str] = None
+
+    @property
+    def base64(self) -> str:
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode("utf-8")
+        return self._base64
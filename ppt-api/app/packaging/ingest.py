@@ -0,0 +1,48 @@
+"""
+Loading uploaded packages into a session, shared by the base64 and binary upload routes.
+"""
+from typing import BinaryIO
+
+from pptx import Presentation
+
+from ..state.parse_cache import ParseCache, copy_deck
+from .writer import EntryCache
+
+
+def ingest_package(session, parse_cache: ParseCache, digest: str, package: BinaryIO, package_size: int) -> bool:
+    """
+    Replace the session's deck with the uploaded package, avoiding a parse when
+    possible. The package is parsed before the session's write lock is taken,
+    so readers of the current deck are not blocked meanwhile. Returns True if
+    parsing was skipped: either the deck already is these exact bytes
+    (unedited), or a parsed copy came from the parse cache.
+    """
+    if session.is_pristine(digest):
+        return True
+
+    entry_cache = EntryCache()
+    prs = parse_cache.take(digest)
+    parse_skipped = prs is not None
+    if prs is None:
+        prs = Presentation(package)
+        # Keep the client's compressed media so exports do not deflate it again
+        entry_cache.harvest(package, prs)
+        # Cache an unedited copy, so these bytes skip the parse next time even once this deck is edited
+        if package_size <= parse_cache.max_bytes:
+            parse_cache.put(digest, copy_deck(prs), package_size)
+
+    with session.lock.write():
+        # Another request may have loaded these bytes while we were parsing
+        if session.is_pristine(digest):
+            return True
+
+        # The outgoing deck is still identical to its upload, so others may reuse it
+        if session.is_pristine():
+            parse_cache.put(session.source_digest, session.prs, session.package_size)
+
+        # Replace the session's deck and populate slide_map with existing slides
+        session.load(prs, package_size=package_size, source_digest=digest)
+        session.entry_cache = entry_cache
+        # An upload cannot be replayed from the operation log, so it is on disk before returning
+        session.checkpoint(durable=True)
+        return parse_skipped
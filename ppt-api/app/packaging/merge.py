@@ -0,0 +1,250 @@
+"""
+Moving slides between packages as parts.
+
+Slides rendered in another process cannot be handed over as python-pptx
+objects, so they travel as serialized parts: export_slides() turns slides of
+one presentation into plain data (slide XML, its relationships and the parts
+they point at), and SlideImporter adds that data to another presentation.
+
+The target gets fresh partnames, relationship ids and slide ids; slide layouts
+are matched by their position under the slide masters, which is why the source
+presentation is built from package_skeleton() of the target. Images, video
+and audio already in the target, or imported earlier, are reused instead of
+being added again. Other binary parts (embedded chart workbooks, OLE objects)
+belong to the one object using them and are always imported as new parts.
+"""
+import hashlib
+import io
+import re
+import zipfile
+from copy import deepcopy
+from typing import Dict, List, Optional, Tuple
+
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import CT_Relationships, serialize_part_xml
+from pptx.opc.package import PartFactory, XmlPart
+from pptx.opc.packuri import PackURI
+from pptx.opc.serialized import _ContentTypesItem
+from pptx.oxml.ns import qn
+from pptx.parts.slide import SlideLayoutPart, SlidePart
+
+_R_NAMESPACE = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_TRAILING_NUMBER = re.compile(r"\d*(\.\w+)$")
+# Content types of read-only parts that any number of slides can share
+_SHAREABLE_CONTENT_TYPES = ("image/", "video/", "audio/")
+
+
+class MergeError(Exception):
+    """Raised when exported slides cannot be added to a presentation"""
+
+
+# --- source side ---
+
+def package_skeleton(prs) -> bytes:
+    """
+    The presentation's package without its slides: masters, layouts, themes
+    and presentation settings, as .pptx bytes. Slides built on the skeleton
+    can be imported back into prs.
+    """
+    package = prs.part.package
+    presentation_part = prs.part
+
+    # Every part reachable without going through a slide relationship
+    parts = []
+    seen = set()
+    pending = [rel.target_part for rel in package._rels if not rel.is_external]
+    while pending:
+        part = pending.pop()
+        if part in seen:
+            continue
+        seen.add(part)
+        parts.append(part)
+        for rel in part.rels:
+            if rel.is_external or (part is presentation_part and rel.reltype == RT.SLIDE):
+                continue
+            pending.append(rel.target_part)
+
+    presentation = deepcopy(presentation_part._element)
+    sldIdLst = presentation.find(qn("p:sldIdLst"))
+    if sldIdLst is not None:
+        presentation.remove(sldIdLst)
+    presentation_rels = CT_Relationships.new()
+    for rel in presentation_part.rels:
+        if rel.reltype != RT.SLIDE:
+            presentation_rels.add_rel(rel.rId, rel.reltype, rel.target_ref, rel.is_external)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("[Content_Types].xml", serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+        zf.writestr("_rels/.rels", package._rels.xml)
+        for part in parts:
+            if part is presentation_part:
+                zf.writestr(part.partname.membername, serialize_part_xml(presentation))
+                zf.writestr(part.partname.rels_uri.membername, presentation_rels.xml)
+                continue
+            zf.writestr(part.partname.membername, part.blob)
+            if part._rels:
+                zf.writestr(part.partname.rels_uri.membername, part.rels.xml)
+    return buffer.getvalue()
+
+
+def export_slides(prs, slides) -> dict:
+    """
+    Plain data for slides of prs, picklable for sending between processes:
+    {"slides": [{"layout", "xml", "rels"}], "parts": {partname: {...}}}.
+    Parts shared by several slides are exported once.
+    """
+    layouts = {
+        layout.part: (master_idx, layout_idx)
+        for master_idx, master in enumerate(prs.slide_masters)
+        for layout_idx, layout in enumerate(master.slide_layouts)
+    }
+    parts: Dict[str, dict] = {}
+
+    def export_rels(part) -> List[Tuple[str, str, tuple]]:
+        rels = []
+        for rel in part.rels:
+            if rel.is_external:
+                rels.append((rel.rId, rel.reltype, ("external", rel.target_ref)))
+                continue
+            target = rel.target_part
+            if isinstance(target, SlideLayoutPart):
+                rels.append((rel.rId, rel.reltype, ("layout",) + layouts[target]))
+                continue
+            if isinstance(target, SlidePart):
+                raise MergeError(f"{part.partname} links to another slide, which cannot be exported")
+            partname = str(target.partname)
+            if partname not in parts:
+                parts[partname] = {
+                    "content_type": target.content_type,
+                    "blob": target.blob,
+                    "is_xml": isinstance(target, XmlPart),
+                    "rels": None
+                }
+                parts[partname]["rels"] = export_rels(target)
+            rels.append((rel.rId, rel.reltype, ("part", partname)))
+        return rels
+
+    exported = []
+    for slide in slides:
+        slide_part = slide.part
+        layout = layouts.get(slide_part.slide_layout.part)
+        if layout is None:
+            raise MergeError(f"{slide_part.partname} uses a layout outside the slide masters")
+        exported.append({
+            "layout": layout,
+            "xml": slide_part.blob,
+            "rels": export_rels(slide_part)
+        })
+    return {"slides": exported, "parts": parts}
+
+
+# --- target side ---
+
+def _rewrite_rids(element, mapping: Dict[str, str]) -> None:
+    """Point r:id / r:embed / r:link (and any other r: attribute) at renumbered relationships"""
+    if all(old == new for old, new in mapping.items()):
+        return
+    for node in element.iter():
+        for name, value in node.attrib.items():
+            if name.startswith(_R_NAMESPACE) and value in mapping:
+                node.set(name, mapping[value])
+
+
+def _shareable(content_type: str) -> bool:
+    return content_type.startswith(_SHAREABLE_CONTENT_TYPES)
+
+
+class SlideImporter:
+    """Adds exported slides to the end of a presentation"""
+
+    def __init__(self, prs):
+        self.prs = prs
+        self.package = prs.part.package
+        self._partnames = set()
+        self._next_number: Dict[str, int] = {}
+        self._binary: Optional[Dict[Tuple[str, str], object]] = None
+        for part in self.package.iter_parts():
+            self._partnames.add(str(part.partname))
+        self._layouts = [
+            [layout.part for layout in master.slide_layouts]
+            for master in prs.slide_masters
+        ]
+
+    def _new_partname(self, partname: str) -> PackURI:
+        """First free partname shaped like partname, e.g. /ppt/media/image7.png"""
+        tmpl = _TRAILING_NUMBER.sub(lambda m: "%d" + m.group(1), partname, count=1)
+        n = self._next_number.get(tmpl, 1)
+        while tmpl % n in self._partnames:
+            n += 1
+        self._next_number[tmpl] = n + 1
+        name = tmpl % n
+        self._partnames.add(name)
+        return PackURI(name)
+
+    def _binary_parts(self) -> Dict[Tuple[str, str], object]:
+        """(content type, sha1) -> shareable part already in the package, built on first use"""
+        if self._binary is None:
+            self._binary = {}
+            for part in self.package.iter_parts():
+                if _shareable(part.content_type) and not isinstance(part, XmlPart):
+                    self._binary.setdefault((part.content_type, hashlib.sha1(part.blob).hexdigest()), part)
+        return self._binary
+
+    def _relate(self, source, rels, exported_parts: dict, imported: dict) -> Dict[str, str]:
+        mapping = {}
+        for rId, reltype, target in rels:
+            kind = target[0]
+            if kind == "external":
+                mapping[rId] = source.relate_to(target[1], reltype, is_external=True)
+            elif kind == "layout":
+                try:
+                    layout_part = self._layouts[target[1]][target[2]]
+                except IndexError:
+                    raise MergeError(f"Slide layout {target[1]}/{target[2]} does not exist in this presentation")
+                mapping[rId] = source.relate_to(layout_part, reltype)
+            else:
+                mapping[rId] = source.relate_to(self._import_part(target[1], exported_parts, imported), reltype)
+        return mapping
+
+    def _import_part(self, partname: str, exported_parts: dict, imported: dict):
+        part = imported.get(partname)
+        if part is not None:
+            return part
+        data = exported_parts[partname]
+        if not data["is_xml"] and _shareable(data["content_type"]):
+            key = (data["content_type"], hashlib.sha1(data["blob"]).hexdigest())
+            part = self._binary_parts().get(key)
+            if part is None:
+                part = PartFactory(self._new_partname(partname), data["content_type"], self.package, data["blob"])
+                self._binary[key] = part
+        else:
+            part = PartFactory(self._new_partname(partname), data["content_type"], self.package, data["blob"])
+        imported[partname] = part
+        if data["rels"]:
+            mapping = self._relate(part, data["rels"], exported_parts, imported)
+            if isinstance(part, XmlPart):
+                _rewrite_rids(part._element, mapping)
+        return part
+
+    def add(self, exported: dict) -> list:
+        """Append the slides of one export_slides() result, returning the new Slides in order"""
+        presentation_rels = self.prs.part.rels
+        sldIdLst = self.prs.slides._sldIdLst
+        # Allocated here rather than through relate_to()/add_sldId(), which rescan
+        # every slide per call and would make importing a large deck quadratic
+        next_id = max([255] + [int(value) for value in sldIdLst.xpath("./p:sldId/@id")]) + 1
+        imported = {}
+        slides = []
+        for data in exported["slides"]:
+            slide_part = SlidePart.load(
+                self._new_partname("/ppt/slides/slide1.xml"), CT.PML_SLIDE, self.package, data["xml"]
+            )
+            mapping = self._relate(slide_part, data["rels"], exported["parts"], imported)
+            _rewrite_rids(slide_part._element, mapping)
+            # A new part has no relationship to reuse yet
+            rId = presentation_rels._add_relationship(RT.SLIDE, slide_part)
+            sldIdLst._add_sldId(id=next_id, rId=rId)
+            next_id += 1
+            slides.append(slide_part.slide)
+        return slides
@@ -0,0 +1,72 @@
+"""
+Enumerates the zip members python-pptx would write for a presentation.
+
+Mirrors pptx.opc.serialized.PackageWriter so callers can look at (and
+serialize) individual members without saving the whole package.
+"""
+from typing import Dict, List
+
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from pptx.opc.package import XmlPart
+from pptx.opc.serialized import _ContentTypesItem
+
+CONTENT_TYPES = "content_types"
+PACKAGE_RELS = "package_rels"
+PART = "part"
+PART_RELS = "part_rels"
+
+
+def normalize_partname(name: str) -> str:
+    """Accept both zip member names ('ppt/slides/slide1.xml') and partnames ('/ppt/slides/slide1.xml')"""
+    return name if name.startswith("/") else "/" + name
+
+
+class PackageEntry:
+    """One member of the serialized package"""
+
+    __slots__ = ("partname", "kind", "part", "_package", "_parts")
+
+    def __init__(self, partname: str, kind: str, part=None, package=None, parts=None):
+        self.partname = partname
+        self.kind = kind
+        self.part = part
+        self._package = package
+        self._parts = parts
+
+    @property
+    def membername(self) -> str:
+        return self.partname[1:]
+
+    @property
+    def is_xml(self) -> bool:
+        return self.kind != PART or isinstance(self.part, XmlPart)
+
+    def blob(self) -> bytes:
+        """Serialized bytes of this member, exactly as prs.save() would write them"""
+        if self.kind == CONTENT_TYPES:
+            return serialize_part_xml(_ContentTypesItem.xml_for(self._parts))
+        if self.kind == PACKAGE_RELS:
+            return self._package._rels.xml
+        if self.kind == PART_RELS:
+            return self.part.rels.xml
+        return self.part.blob
+
+
+def package_entries(prs) -> List[PackageEntry]:
+    """All members of prs's package, in the order prs.save() writes them"""
+    package = prs.part.package
+    parts = tuple(package.iter_parts())
+    entries = [
+        PackageEntry(str(CONTENT_TYPES_URI), CONTENT_TYPES, parts=parts),
+        PackageEntry(str(PACKAGE_URI.rels_uri), PACKAGE_RELS, package=package),
+    ]
+    for part in parts:
+        entries.append(PackageEntry(str(part.partname), PART, part=part))
+        if part._rels:
+            entries.append(PackageEntry(str(part.partname.rels_uri), PART_RELS, part=part))
+    return entries
+
+
+def package_entry_map(prs) -> Dict[str, PackageEntry]:
+    return {entry.partname: entry for entry in package_entries(prs)}
@@ -0,0 +1,36 @@
+"""
+Helpers for moving packages as raw bytes without holding whole copies in memory.
+"""
+import tempfile
+from typing import BinaryIO, Iterator, Optional
+
+from ..config import SPOOL_MAX_MEMORY_MB
+
+PPTX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+CHUNK_SIZE = 64 * 1024
+
+
+def spooled_file() -> tempfile.SpooledTemporaryFile:
+    """Temp file that stays in memory up to SPOOL_MAX_MEMORY_MB, then moves to disk"""
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY_MB * 1024 * 1024)
+
+
+def save_to_spool(session, compression: Optional[str] = None) -> tempfile.SpooledTemporaryFile:
+    """Serialize a session's deck into a spooled temp file positioned at the start"""
+    spool = spooled_file()
+    session.write_package(spool, compression)
+    spool.seek(0)
+    return spool
+
+
+def iter_file(f: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield f in chunks and close it when exhausted"""
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
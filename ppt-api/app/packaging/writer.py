@@ -0,0 +1,219 @@
+"""
+Incremental package writer.
+
+prs.save() re-serializes and re-deflates every part on every save. This writer
+keeps the compressed bytes of each zip member between saves and copies them
+straight into the output when the part has not changed:
+
+- binary parts (images, media, embedded files) are recognised by blob identity,
+  python-pptx never mutates a blob in place, so they are not even re-hashed;
+- XML parts are re-serialized (cheap) and hashed, and only re-deflated when the
+  hash differs from the last save.
+
+Compressed entries can also be harvested from the uploaded .pptx, so the first
+export after an upload copies the client's compressed media as-is.
+
+The compression mode trades CPU for bytes: "stored" for localhost round trips,
+"max" for archival saves. Already-compressed media (PNG, JPEG, video, nested
+Office packages) is always stored, since deflating it again wastes CPU.
+"""
+import hashlib
+import struct
+import time
+import zipfile
+import zlib
+from typing import BinaryIO, Dict, List, Optional
+
+from ..config import EXPORT_COMPRESSION
+from .opc import package_entries
+
+# Compression mode -> zlib level (None means stored)
+COMPRESSION_LEVELS = {
+    "stored": None,
+    "fast": 1,
+    "default": zlib.Z_DEFAULT_COMPRESSION,
+    "max": 9
+}
+
+# Formats that are compressed already and gain nothing from deflate
+_PRECOMPRESSED_EXTENSIONS = {
+    "png", "jpg", "jpeg", "jpe", "gif", "wdp", "jxr",
+    "mp4", "m4v", "mov", "mp3", "m4a", "wma", "wmv", "avi",
+    "xlsx", "xlsm", "docx", "pptx", "zip"
+}
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+
+_LOCAL_SIG = b"PK\x03\x04"
+_CENTRAL_SIG = b"PK\x01\x02"
+_END_SIG = b"PK\x05\x06"
+
+_UTF8_FLAG = 0x800
+_VERSION = 20
+
+# Without ZIP64 records, sizes, offsets and the member count must fit these limits
+_ZIP32_LIMIT = 0xFFFFFFFF
+_ZIP32_MAX_MEMBERS = 0xFFFF
+
+
+def resolve_compression(compression: Optional[str]) -> str:
+    """Validate a compression mode, falling back to the server default"""
+    compression = compression or EXPORT_COMPRESSION
+    if compression not in COMPRESSION_LEVELS:
+        raise ValueError(f"Invalid compression '{compression}'. Valid modes: {list(COMPRESSION_LEVELS)}")
+    return compression
+
+
+def is_precompressed(partname: str) -> bool:
+    return partname.rsplit(".", 1)[-1].lower() in _PRECOMPRESSED_EXTENSIONS
+
+
+class CompressedEntry:
+    """
+    The compressed form of one zip member, plus what it was compressed from.
+    mode is the compression mode used, or None when the bytes are reusable in
+    any mode (harvested from an upload, or precompressed media stored as-is).
+    """
+
+    __slots__ = ("fingerprint", "mode", "compress_type", "crc", "file_size", "data")
+
+    def __init__(self, fingerprint, mode: Optional[str], compress_type: int, crc: int, file_size: int, data: bytes):
+        self.fingerprint = fingerprint
+        self.mode = mode
+        self.compress_type = compress_type
+        self.crc = crc
+        self.file_size = file_size
+        self.data = data
+
+
+def _compress(partname: str, blob: bytes, fingerprint, mode: str) -> CompressedEntry:
+    crc = zlib.crc32(blob)
+    level = COMPRESSION_LEVELS[mode]
+    if is_precompressed(partname):
+        return CompressedEntry(fingerprint, None, zipfile.ZIP_STORED, crc, len(blob), blob)
+    if level is None:
+        return CompressedEntry(fingerprint, mode, zipfile.ZIP_STORED, crc, len(blob), blob)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    data = compressor.compress(blob) + compressor.flush()
+    return CompressedEntry(fingerprint, mode, zipfile.ZIP_DEFLATED, crc, len(blob), data)
+
+
+def _read_raw_member(fp: BinaryIO, info: zipfile.ZipInfo) -> bytes:
+    """Compressed bytes of a member, read without decompressing"""
+    fp.seek(info.header_offset)
+    header = fp.read(_LOCAL_HEADER.size)
+    fields = _LOCAL_HEADER.unpack(header)
+    if fields[0] != _LOCAL_SIG:
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    name_length, extra_length = fields[9], fields[10]
+    fp.seek(info.header_offset + _LOCAL_HEADER.size + name_length + extra_length)
+    return fp.read(info.compress_size)
+
+
+class EntryCache:
+    """Per-deck cache of compressed zip members, keyed by partname"""
+
+    def __init__(self):
+        self._entries: Dict[str, CompressedEntry] = {}
+
+    def clear(self) -> None:
+        self._entries = {}
+
+    def harvest(self, package: BinaryIO, prs) -> None:
+        """
+        Take the compressed bytes of binary parts straight from the uploaded
+        package, so they are never deflated again while untouched.
+        """
+        package.seek(0)
+        with zipfile.ZipFile(package) as zf:
+            infos = {info.filename: info for info in zf.infolist()}
+            for entry in package_entries(prs):
+                if entry.is_xml:
+                    continue
+                info = infos.get(entry.membername)
+                if info is None or info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                    continue
+                blob = entry.part._blob
+                if info.file_size != len(blob):
+                    continue
+                if info.compress_type == zipfile.ZIP_STORED:
+                    # Stored data is the blob itself; share it instead of copying
+                    data = blob
+                else:
+                    data = _read_raw_member(zf.fp, info)
+                # Copying these bytes costs nothing, so they serve every compression mode
+                self._entries[entry.partname] = CompressedEntry(
+                    blob, None, info.compress_type, info.CRC, info.file_size, data
+                )
+
+    def entry_for(self, package_entry, mode: str) -> CompressedEntry:
+        """Compressed form of a package member, reusing the cached one if unchanged"""
+        partname = package_entry.partname
+        cached = self._entries.get(partname)
+        if cached is not None and cached.mode is not None and cached.mode != mode:
+            cached = None
+        if not package_entry.is_xml:
+            blob = package_entry.part._blob
+            if cached is not None and cached.fingerprint is blob:
+                return cached
+            entry = _compress(partname, blob, blob, mode)
+        else:
+            blob = package_entry.blob()
+            fingerprint = hashlib.sha1(blob).digest()
+            if cached is not None and cached.fingerprint == fingerprint:
+                return cached
+            entry = _compress(partname, blob, fingerprint, mode)
+        self._entries[package_entry.partname] = entry
+        return entry
+
+    def retain(self, partnames) -> None:
+        """Drop cached members for parts that are no longer in the package"""
+        keep = set(partnames)
+        self._entries = {name: entry for name, entry in self._entries.items() if name in keep}
+
+
+def _dos_datetime(timestamp: Optional[float] = None):
+    t = time.localtime(timestamp)
+    dos_date = (t.tm_year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday
+    dos_time = t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+    return dos_time, dos_date
+
+
+def write_package(prs, out: BinaryIO, cache: EntryCache, compression: Optional[str] = None) -> None:
+    """Write prs as a .pptx to out, copying unchanged members from cache"""
+    mode = resolve_compression(compression)
+    members = []
+    for package_entry in package_entries(prs):
+        members.append((package_entry.membername, cache.entry_for(package_entry, mode)))
+    cache.retain("/" + name for name, _ in members)
+
+    total = sum(_LOCAL_HEADER.size + len(name.encode("utf-8")) + len(entry.data) for name, entry in members)
+    if total >= _ZIP32_LIMIT or len(members) > _ZIP32_MAX_MEMBERS:
+        # Too large for plain zip records; let python-pptx write a ZIP64 package
+        prs.save(out)
+        return
+
+    dos_time, dos_date = _dos_datetime()
+    central: List[bytes] = []
+    offset = 0
+    for name, entry in members:
+        encoded = name.encode("utf-8")
+        flags = 0 if encoded.isascii() else _UTF8_FLAG
+        header = _LOCAL_HEADER.pack(
+            _LOCAL_SIG, _VERSION, flags, entry.compress_type, dos_time, dos_date,
+            entry.crc, len(entry.data), entry.file_size, len(encoded), 0
+        )
+        out.write(header)
+        out.write(encoded)
+        out.write(entry.data)
+        central.append(_CENTRAL_HEADER.pack(
+            _CENTRAL_SIG, _VERSION, _VERSION, flags, entry.compress_type, dos_time, dos_date,
+            entry.crc, len(entry.data), entry.file_size, len(encoded), 0, 0, 0, 0, 0, offset
+        ) + encoded)
+        offset += len(header) + len(encoded) + len(entry.data)
+
+    central_dir = b"".join(central)
+    out.write(central_dir)
+    out.write(_END_RECORD.pack(_END_SIG, 0, 0, len(members), len(members), len(central_dir), offset, 0))
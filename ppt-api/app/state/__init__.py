@@ -0,0 +1 @@
+# Session and presentation state management
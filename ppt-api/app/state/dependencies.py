@@ -0,0 +1,78 @@
+"""
+FastAPI dependencies resolving the caller's session from the store.
+"""
+from typing import Callable, Optional
+
+from fastapi import Depends, Header, HTTPException, Query, Request, Response
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+from ..config import DEFAULT_SESSION_ID
+from .session import PresentationSession
+from .shared import LeaseLost, LeaseUnavailable
+from .store import SessionStore
+
+# Response header naming the worker that served the request. With several
+# workers, routing a session's requests back to it avoids reloading the deck.
+AFFINITY_HEADER = "X-PPT-Worker"
+
+
+def get_session_id(
+    x_session_id: Optional[str] = Header(None),
+    session_id: Optional[str] = Query(None)
+) -> str:
+    """Session id from the X-Session-Id header, the session_id query param, or the default session"""
+    return x_session_id or session_id or DEFAULT_SESSION_ID
+
+
+def get_session(request: Request, response: Response, session_id: str = Depends(get_session_id)):
+    """
+    Resolve and pin the caller's session for the duration of the request.
+    The session cannot be spilled to disk while a request is using it.
+    Answers 503 if another worker holds the session for too long.
+    """
+    store: SessionStore = request.app.state.sessions
+    try:
+        session: PresentationSession = store.acquire(session_id)
+    except LeaseUnavailable as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "1", AFFINITY_HEADER: e.owner or ""}
+        )
+    if store.backend is not None:
+        response.headers[AFFINITY_HEADER] = store.worker_id
+    # For SessionRoute, which publishes the session's edits before responding
+    request.state.ppt_session = session
+    try:
+        yield session
+    finally:
+        store.release(session)
+
+
+class SessionRoute(APIRoute):
+    """
+    Route publishing the session's edits to the shared backend before the
+    response is sent. The session dependency is torn down only after the
+    client has its response, too late to report edits lost with the lease.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def publishing_handler(request: Request) -> Response:
+            response = await handler(request)
+            store: SessionStore = request.app.state.sessions
+            session: Optional[PresentationSession] = getattr(request.state, "ppt_session", None)
+            if session is not None and store.backend is not None:
+                try:
+                    await run_in_threadpool(store.publish, session)
+                except LeaseLost as e:
+                    raise HTTPException(
+                        status_code=503,
+                        detail=str(e),
+                        headers={"Retry-After": "1"}
+                    )
+            return response
+
+        return publishing_handler
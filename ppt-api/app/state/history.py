@@ -0,0 +1,281 @@
+"""
+Copy-on-write revision history of a session's slides.
+
+Each recorded revision is just the deck's slide order as (slide id, XML digest)
+pairs. Slide XML is stored once per distinct content in a shared, reference
+counted store, so a revision only costs the slides it actually changed and
+untouched slides (and media, which is never copied) are shared between all
+revisions. Mutations that name the slide they edited only re-serialize that
+slide.
+"""
+import bisect
+import hashlib
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from lxml import etree
+from pptx.oxml import parse_xml
+from pptx.oxml.shapes.shared import BaseShapeElement
+
+from .slide_index import SlideIndex
+
+
+class HistoryError(Exception):
+    """Raised when a revert cannot be applied"""
+
+
+class Revision:
+    """One recorded state of the deck: slide order plus the XML digest of each slide"""
+
+    __slots__ = ("number", "label", "timestamp", "slides")
+
+    def __init__(self, number: int, label: Optional[str], slides: Tuple[Tuple[str, str], ...]):
+        self.number = number
+        self.label = label
+        self.timestamp = time.time()
+        self.slides = slides
+
+    def digests(self) -> Dict[str, str]:
+        return dict(self.slides)
+
+    def summary(self) -> dict:
+        return {
+            "revision": self.number,
+            "label": self.label,
+            "timestamp": self.timestamp,
+            "slide_count": len(self.slides)
+        }
+
+
+def stable_order(ranks: List[int]) -> set:
+    """
+    Indexes of the longest increasing run of ranks. Items outside it are the
+    fewest that must have moved to turn the old order into the new one.
+    """
+    tails: List[int] = []
+    tail_idx: List[int] = []
+    parents: List[int] = [-1] * len(ranks)
+    for idx, rank in enumerate(ranks):
+        pos = bisect.bisect_left(tails, rank)
+        if pos == len(tails):
+            tails.append(rank)
+            tail_idx.append(idx)
+        else:
+            tails[pos] = rank
+            tail_idx[pos] = idx
+        parents[idx] = tail_idx[pos - 1] if pos > 0 else -1
+    keep = set()
+    idx = tail_idx[-1] if tail_idx else -1
+    while idx != -1:
+        keep.add(idx)
+        idx = parents[idx]
+    return keep
+
+
+def _serialize(slide) -> bytes:
+    return etree.tostring(slide.part._element)
+
+
+class RevisionHistory:
+    """
+    Bounded list of revisions over a content-addressed store of slide XML.
+    nbytes is the size of the XML held for all revisions.
+    """
+
+    def __init__(self, max_revisions: int):
+        self.max_revisions = max(max_revisions, 1)
+        self._revisions: List[Revision] = []
+        self._blobs: Dict[str, bytes] = {}
+        self._refcounts: Dict[str, int] = {}
+        # digest -> what derived() built from that XML, dropped along with it
+        self._derived: Dict[str, Any] = {}
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._revisions)
+
+    def _store(self, xml: bytes) -> str:
+        digest = hashlib.sha1(xml).hexdigest()
+        if digest not in self._blobs:
+            self._blobs[digest] = xml
+            self._refcounts[digest] = 0
+            self.nbytes += len(xml)
+        return digest
+
+    def record(self, number: int, slide_map: SlideIndex, slide_id: Optional[str] = None, label: Optional[str] = None) -> bool:
+        """
+        Record the deck as revision number. When slide_id is given only that
+        slide (plus any slide the history has not seen) is re-serialized; the
+        others are assumed unchanged since the last record. Returns False when
+        nothing changed, in which case no revision is added.
+        """
+        latest = self._revisions[-1].digests() if self._revisions else {}
+        slides = []
+        for sid, slide in slide_map.items():
+            digest = latest.get(sid)
+            if digest is None or slide_id is None or sid == slide_id:
+                digest = self._store(_serialize(slide))
+            slides.append((sid, digest))
+        slides = tuple(slides)
+
+        if self._revisions and self._revisions[-1].slides == slides:
+            self._collect()
+            return False
+
+        for _, digest in slides:
+            self._refcounts[digest] += 1
+        self._revisions.append(Revision(number, label, slides))
+        while len(self._revisions) > self.max_revisions:
+            for _, digest in self._revisions.pop(0).slides:
+                self._refcounts[digest] -= 1
+        self._collect()
+        return True
+
+    def truncate(self, number: int) -> None:
+        """Forget the revisions recorded after revision number"""
+        while self._revisions and self._revisions[-1].number > number:
+            for _, digest in self._revisions.pop().slides:
+                self._refcounts[digest] -= 1
+        self._collect()
+
+    def _collect(self) -> None:
+        """Drop stored XML no remaining revision refers to"""
+        for digest in [digest for digest, count in self._refcounts.items() if count <= 0]:
+            del self._refcounts[digest]
+            xml = self._blobs.pop(digest)
+            self.nbytes -= len(xml)
+            if self._derived.pop(digest, None) is not None:
+                self.nbytes -= len(xml)
+
+    # --- lookups ---
+
+    def revisions(self) -> List[dict]:
+        return [revision.summary() for revision in self._revisions]
+
+    def get(self, number: int) -> Optional[Revision]:
+        """The deck as of revision number: the latest recorded revision at or before it"""
+        found = None
+        for revision in self._revisions:
+            if revision.number > number:
+                break
+            found = revision
+        return found
+
+    def latest(self) -> Optional[Revision]:
+        return self._revisions[-1] if self._revisions else None
+
+    def slide_xml(self, revision: Revision, slide_id: str) -> Optional[bytes]:
+        digest = revision.digests().get(slide_id)
+        return None if digest is None else self._blobs[digest]
+
+    def derived(self, digest: str, build: Callable[[bytes], Any]) -> Any:
+        """
+        build(xml) for the slide XML stored under digest, built once and kept
+        until that XML is dropped. Each is counted in nbytes at the size of its
+        XML, a rough estimate of what is derived from it.
+        """
+        value = self._derived.get(digest)
+        if value is None:
+            # Readers may race to build the same value; only the stored one is counted
+            built = build(self._blobs[digest])
+            value = self._derived.setdefault(digest, built)
+            if value is built:
+                self.nbytes += len(self._blobs[digest])
+        return value
+
+    def diff(self, old: Revision, new: Revision) -> dict:
+        """Slide-level changes from old to new, by comparing digests only"""
+        old_digests = old.digests()
+        new_digests = new.digests()
+        old_order = [sid for sid, _ in old.slides if sid in new_digests]
+        new_order = [sid for sid, _ in new.slides if sid in old_digests]
+        old_numbers = {sid: idx + 1 for idx, (sid, _) in enumerate(old.slides)}
+        new_numbers = {sid: idx + 1 for idx, (sid, _) in enumerate(new.slides)}
+        # Fewest surviving slides whose move explains the new order
+        old_rank = {sid: idx for idx, sid in enumerate(old_order)}
+        stable = stable_order([old_rank[sid] for sid in new_order])
+        moved = [sid for idx, sid in enumerate(new_order) if idx not in stable]
+
+        return {
+            "from_revision": old.number,
+            "to_revision": new.number,
+            "added": [{"slide_id": sid, "slide_number": new_numbers[sid]} for sid, _ in new.slides if sid not in old_digests],
+            "removed": [{"slide_id": sid, "slide_number": old_numbers[sid]} for sid, _ in old.slides if sid not in new_digests],
+            "changed": [
+                {"slide_id": sid, "slide_number": new_numbers[sid]}
+                for sid, digest in new.slides
+                if sid in old_digests and old_digests[sid] != digest
+            ],
+            "moved": [
+                {"slide_id": sid, "from_slide_number": old_numbers[sid], "to_slide_number": new_numbers[sid]}
+                for sid in moved
+            ]
+        }
+
+
+def _shape_elements(sld) -> List[BaseShapeElement]:
+    return list(sld.cSld.spTree.iter_shape_elms())
+
+
+def _replace_slide_element(session, slide_id: str, sld) -> None:
+    """Swap a slide part's XML and re-point slide_map at a fresh Slide proxy"""
+    part = session.slide_map[slide_id].part
+    part._element = sld
+    part.__dict__.pop("slide", None)
+    session.slide_map[slide_id] = part.slide
+
+
+def revert_slide(session, history: RevisionHistory, slide_id: str, number: int) -> Revision:
+    """Put one slide's XML back to how it was at revision number"""
+    revision = history.get(number)
+    if revision is None:
+        raise HistoryError(f"Revision {number} is not in the history")
+    if slide_id not in session.slide_map:
+        raise HistoryError("slide not found")
+    xml = history.slide_xml(revision, slide_id)
+    if xml is None:
+        raise HistoryError(f"Slide did not exist at revision {number}")
+    _replace_slide_element(session, slide_id, parse_xml(xml))
+    return revision
+
+
+def revert_shape(session, history: RevisionHistory, slide_id: str, shape_id: int, number: int) -> str:
+    """
+    Put one shape (matched by its cNvPr id) back to how it was at revision
+    number: restored if it was deleted since, removed if it did not exist yet.
+    Returns what was done: "restored", "reinserted" or "removed".
+    """
+    revision = history.get(number)
+    if revision is None:
+        raise HistoryError(f"Revision {number} is not in the history")
+    if slide_id not in session.slide_map:
+        raise HistoryError("slide not found")
+    xml = history.slide_xml(revision, slide_id)
+    if xml is None:
+        raise HistoryError(f"Slide did not exist at revision {number}")
+
+    old_shapes = _shape_elements(parse_xml(xml))
+    old = next((el for el in old_shapes if el.shape_id == shape_id), None)
+    sld = session.slide_map[slide_id].part._element
+    current_shapes = _shape_elements(sld)
+    current = next((el for el in current_shapes if el.shape_id == shape_id), None)
+
+    if old is None and current is None:
+        raise HistoryError(f"Shape {shape_id} exists neither now nor at revision {number}")
+    if old is None:
+        current.getparent().remove(current)
+        return "removed"
+    if current is not None:
+        current.addprevious(old)
+        current.getparent().remove(current)
+        return "restored"
+
+    # Re-insert at its old z-order position among the shapes that are still there
+    position = old_shapes.index(old)
+    if position < len(current_shapes):
+        current_shapes[position].addprevious(old)
+    elif current_shapes:
+        current_shapes[-1].addnext(old)
+    else:
+        sld.cSld.spTree.grpSpPr.addnext(old)
+    return "reinserted"
@@ -0,0 +1,168 @@
+"""
+Write-ahead operation log and checkpoints for crash recovery.
+
+Every mutating route call on a session is appended to the session's log as one
+JSON line: the route's name, its arguments and the slide ids it generated.
+Each line is fsynced before the call returns. Every few operations the deck is
+checkpointed: the package is serialized while the request still holds the
+write lock, which the incremental writer makes cheap, and written to disk on a
+background thread. Once a checkpoint is durable the log is compacted to the
+operations after it.
+
+Changes that cannot be logged as arguments (uploads, deltas) are recorded by
+a durable checkpoint instead: it takes a seq of its own and is on disk before
+the request returns, so operations logged after it are never replayed onto
+the deck from before the change.
+
+After a restart a session is rebuilt from its last checkpoint plus the logged
+operations after it, replayed straight through the route functions.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# One writer thread for all sessions: checkpoints are disk-bound and must not
+# compete with request threads for more than one core
+_checkpoint_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ppt-checkpoint")
+
+
+def fsync_write(path: str, data: bytes) -> None:
+    """Durably replace path with data: readers see either the old or the new file"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SessionJournal:
+    """Operation log plus latest checkpoint of one session, stored under directory"""
+
+    def __init__(self, directory: str, session_id: str, checkpoint_every: int):
+        os.makedirs(directory, exist_ok=True)
+        # Session ids come from clients, so never use them as file names directly
+        base = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        self.directory = directory
+        self.session_id = session_id
+        self.checkpoint_every = max(checkpoint_every, 1)
+        self.log_path = os.path.join(directory, f"{base}.wal")
+        self.meta_path = os.path.join(directory, f"{base}.checkpoint.json")
+        self._base = base
+        self._lock = threading.Lock()
+        self._seq = None
+        self.ops_since_checkpoint = 0
+
+    # --- reading ---
+
+    def _read_meta(self) -> Optional[dict]:
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_entries(self) -> List[dict]:
+        if not os.path.exists(self.log_path):
+            return []
+        entries = []
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A torn final line from a crash mid-append; everything before it is intact
+                    break
+        return entries
+
+    def has_state(self) -> bool:
+        return os.path.exists(self.meta_path) or os.path.exists(self.log_path)
+
+    def recovery_plan(self) -> Tuple[Optional[dict], Optional[str], List[dict]]:
+        """(checkpoint meta, checkpoint package path, log entries to replay after it)"""
+        with self._lock:
+            meta = self._read_meta()
+            entries = self._read_entries()
+        checkpoint_seq = meta["seq"] if meta else 0
+        package_path = os.path.join(self.directory, meta["package"]) if meta else None
+        pending = [entry for entry in entries if entry["seq"] > checkpoint_seq]
+        self._seq = max([checkpoint_seq] + [entry["seq"] for entry in entries])
+        self.ops_since_checkpoint = len(pending)
+        return meta, package_path, pending
+
+    def _current_seq(self) -> int:
+        if self._seq is None:
+            meta = self._read_meta()
+            entries = self._read_entries()
+            self._seq = max([meta["seq"] if meta else 0] + [entry["seq"] for entry in entries])
+        return self._seq
+
+    # --- writing ---
+
+    def append(self, endpoint: str, arguments: dict, slide_ids: List[str]) -> bool:
+        """
+        Log one operation. Returns True when enough operations have piled up
+        that the caller should checkpoint.
+        """
+        with self._lock:
+            self._seq = self._current_seq() + 1
+            entry = {"seq": self._seq, "endpoint": endpoint, "kwargs": arguments, "ids": slide_ids}
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.ops_since_checkpoint += 1
+            return self.ops_since_checkpoint >= self.checkpoint_every
+
+    def checkpoint(self, package: bytes, meta: dict, durable: bool = False) -> None:
+        """
+        Persist a checkpoint of the deck as of the last logged operation.
+        package and meta must have been captured under the session's write
+        lock; the disk writes happen on the checkpoint thread.
+
+        A durable checkpoint records a change that is not in the log: it gets
+        a seq of its own, so the operations logged after it follow it, and is
+        written before returning. Errors writing it are raised.
+        """
+        with self._lock:
+            seq = self._current_seq()
+            if durable:
+                self._seq = seq = seq + 1
+            self.ops_since_checkpoint = 0
+        if durable:
+            self._write_checkpoint(seq, package, dict(meta))
+        else:
+            _checkpoint_executor.submit(self._write_checkpoint_logged, seq, package, dict(meta))
+
+    def _write_checkpoint_logged(self, seq: int, package: bytes, meta: dict) -> None:
+        try:
+            self._write_checkpoint(seq, package, meta)
+        except Exception:
+            logger.exception("Checkpoint of session %s failed", self.session_id)
+
+    def _write_checkpoint(self, seq: int, package: bytes, meta: dict) -> None:
+        # The package file is named by seq and the meta file switched last, so a
+        # crash at any point leaves a consistent checkpoint + log pair behind
+        package_name = f"{self._base}.{seq}.pptx"
+        fsync_write(os.path.join(self.directory, package_name), package)
+        with self._lock:
+            previous = self._read_meta()
+            if previous is not None and previous["seq"] > seq:
+                os.remove(os.path.join(self.directory, package_name))
+                return
+            meta.update({"seq": seq, "package": package_name})
+            fsync_write(self.meta_path, json.dumps(meta).encode("utf-8"))
+
+            # Compact the log down to the operations after the checkpoint
+            remaining = [entry for entry in self._read_entries() if entry["seq"] > seq]
+            fsync_write(self.log_path, "".join(json.dumps(entry) + "\n" for entry in remaining).encode("utf-8"))
+
+        if previous is not None and previous["package"] != package_name:
+            old_path = os.path.join(self.directory, previous["package"])
+            if os.path.exists(old_path):
+                os.remove(old_path)
@@ -0,0 +1,143 @@
+"""
+Per-presentation reader/writer locking.
+
+Read-only routes (listing slides, inspecting shapes, exports) share the lock and
+run in parallel; mutating routes take it exclusively. Each session has its own
+lock, so edits to one deck never block another.
+"""
+import functools
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """
+    Writer-preferring reader/writer lock.
+
+    Both modes are reentrant for the owning thread, and a thread holding the
+    write lock may also take the read lock. Upgrading a held read lock to a
+    write lock is not supported and raises RuntimeError instead of deadlocking.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = {}  # thread id -> read depth
+        self._writer = None  # thread id of the writer
+        self._write_depth = 0
+        self._waiting_writers = 0
+
+    @property
+    def write_depth(self) -> int:
+        """How many times the calling thread holds the write lock, 0 if it is not the writer"""
+        with self._cond:
+            return self._write_depth if self._writer == threading.get_ident() else 0
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if me in self._readers:
+                self._readers[me] += 1
+                return
+            # Queue behind waiting writers so a stream of reads cannot starve edits
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers[me] = 1
+
+    def release_read(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth -= 1
+                return
+            self._readers[me] -= 1
+            if self._readers[me] == 0:
+                del self._readers[me]
+                if not self._readers:
+                    self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("cannot upgrade a read lock to a write lock")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def read_locked(func):
+    """Run a route holding its session's lock in shared (read) mode"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with kwargs["session"].lock.read():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _succeeded(result) -> bool:
+    """False for the {"error": ...} and {"status": "error", ...} responses routes report failures with"""
+    return not (isinstance(result, dict) and ("error" in result or result.get("status") == "error"))
+
+
+def write_locked(func):
+    """
+    Run a route holding its session's lock in exclusive (write) mode,
+    bumping the session's revision once the route has succeeded (neither
+    raised nor returned an error response), unless the route bumped it itself.
+    Routes scoped to a single slide (a slide_id argument) only invalidate and
+    snapshot that slide.
+    Successful calls are logged to the session's journal, except those nested in
+    another locked route (a batch), which the outer call's entry already covers.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = kwargs["session"]
+        with session.lock.write():
+            outermost = session.lock.write_depth == 1
+            if outermost:
+                session.begin_operation()
+            revision = session.revision
+            result = func(*args, **kwargs)
+            if not _succeeded(result):
+                return result
+            if outermost:
+                session.record_operation(func.__name__, kwargs)
+            # Routes that replace the deck (reset) have already recorded its revision
+            if session.revision == revision:
+                session.bump_revision(kwargs.get("slide_id"), label=func.__name__)
+            return result
+    return wrapper
@@ -0,0 +1,74 @@
+"""
+Content-addressed cache of parsed presentations, keyed by a hash of the uploaded bytes.
+"""
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def content_digest(data: bytes) -> str:
+    """Hash used to key uploaded packages"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def copy_deck(prs):
+    """
+    Deep copy of a parsed deck. The package keeps a reference to the stream it
+    was read from, which is only used while loading; the copy gets none, so
+    upload spools are neither copied nor kept open.
+    """
+    package = prs.part.package
+    return copy.deepcopy(prs, {id(package._pkg_file): None})
+
+
+class ParseCache:
+    """
+    LRU cache of unedited Presentation objects, bounded by total package bytes.
+
+    A parsed deck is mutable, so the cache keeps an unedited copy of each and
+    take() hands out a deep copy of it, which is several times cheaper than
+    parsing the package again. The entry stays, so uploading the same bytes
+    after the first deck was edited still skips the parse.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # digest -> (prs, package_size)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def take(self, digest: str):
+        """A parsed deck for digest that the caller owns, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            self._entries.move_to_end(digest)
+        # The cached deck is never edited, so copying it outside the lock is safe
+        return copy_deck(entry[0])
+
+    def put(self, digest: str, prs, package_size: int) -> None:
+        """
+        Hand an unedited parsed deck over to the cache, evicting the oldest
+        entries. The caller must not use prs afterwards.
+        """
+        if package_size > self.max_bytes:
+            return
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+                return
+            self._entries[digest] = (prs, package_size)
+            self._size += package_size
+            while self._size > self.max_bytes:
+                _, (_, size) = self._entries.popitem(last=False)
+                self._size -= size
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            return digest in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,447 @@
+"""
+A single editing session: one presentation, its slide id map and active theme.
+"""
+import io
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Callable, List, Optional
+
+from pptx import Presentation
+from pydantic import BaseModel
+
+from ..config import HISTORY_MAX_REVISIONS
+from ..themes.registry import THEMES
+from ..themes.theme import Theme
+from ..packaging.export import SerializedDeck
+from ..packaging.writer import EntryCache, resolve_compression, write_package
+from .history import RevisionHistory
+from .journal import SessionJournal
+from .locks import ReadWriteLock
+from .slide_index import SlideIndex
+
+# Rough ratio between the in-memory python-pptx object graph and the packaged
+# .pptx size. XML parts inflate heavily once parsed into lxml trees.
+IN_MEMORY_EXPANSION = 6
+
+# Packaged size of the blank default template, used before a deck is measured
+BLANK_PACKAGE_SIZE = 32 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def theme_key(theme: Theme) -> str:
+    """Return the THEMES key for a theme instance, falling back to 'default'"""
+    return theme.key if theme.key in THEMES else "default"
+
+
+class DeckSnapshot:
+    """A serialized copy of a session's deck, taken so a failed transaction can be rolled back"""
+
+    def __init__(self, package: io.BytesIO, slide_ids: List[str], theme: Theme, revision: int):
+        self.package = package
+        self.slide_ids = slide_ids
+        self.theme = theme
+        self.revision = revision
+
+
+class SlideContinuation:
+    """
+    Creates the slides a component continues on: each call adds a slide right
+    after the previous one, starting after slide_id. slide_ids lists them.
+    """
+
+    def __init__(self, session: "PresentationSession", slide_id: str):
+        self.session = session
+        self.slide_ids: List[str] = []
+        self._after = slide_id
+
+    def __call__(self):
+        slide_id, slide = self.session.add_slide_after(self._after)
+        self.slide_ids.append(slide_id)
+        self._after = slide_id
+        return slide
+
+
+class PresentationSession:
+    """Holds the deck, slide_map and current_theme for one session id"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.prs = None
+        # slide id <-> slide number <-> sldId position, kept in deck order
+        self.slide_map = SlideIndex()
+        self._theme: Theme = THEMES["default"]
+        self.package_size = 0
+        # Bumped by every mutating route; lets callers tell whether the deck changed
+        self.revision = 0
+        # Copy-on-write slide snapshots, one per revision that changed the deck
+        self.history = RevisionHistory(HISTORY_MAX_REVISIONS)
+        # sha256 of the uploaded bytes the deck was parsed from, see is_pristine()
+        self.source_digest: Optional[str] = None
+        self._source_revision = -1
+        # Client part hashes from the last delta sync (app.packaging.delta.DeltaBaseline)
+        self.delta_baseline = None
+        # Last serialized package, reused until the revision changes
+        self._export: Optional[SerializedDeck] = None
+        # Compressed zip members from the last save, copied as-is while unchanged
+        self.entry_cache = EntryCache()
+        self._export_lock = threading.Lock()
+        # Number of in-flight requests using this session; pinned sessions are never spilled
+        self.pins = 0
+        # Guards the deck itself: shared for read-only routes, exclusive for edits
+        self.lock = ReadWriteLock()
+        self._load_lock = threading.Lock()
+        # Write-ahead log of mutating operations, set by the store when journaling is on
+        self.journal: Optional[SessionJournal] = None
+        self._replaying = False
+        # Slide ids handed out by the current operation, logged so replay reuses them
+        self._issued_ids: List[str] = []
+        self._replay_ids: List[str] = []
+        # Shared-backend generation the deck was last loaded from or published as
+        # (see app.state.shared), and the revision that was published
+        self.generation = 0
+        self.published_revision = -1
+        # Requests of this worker holding the session's shared lease
+        self.lease_holders = 0
+        self.lease_guard = threading.Lock()
+        # Set when the lease expired while held and another worker took the session over
+        self.lease_lost = False
+
+    @property
+    def current_theme(self) -> Theme:
+        """
+        The session's theme. Registry themes are resolved by key on every use,
+        so a reloaded definition applies from the next request on.
+        """
+        theme = self._theme
+        return THEMES.get(theme.key, theme) if theme.key is not None else theme
+
+    @current_theme.setter
+    def current_theme(self, theme: Theme) -> None:
+        self._theme = theme
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.prs is not None
+
+    @property
+    def estimated_size(self) -> int:
+        """Approximate resident memory used by this session's deck"""
+        if not self.is_loaded:
+            return 0
+        return max(self.package_size, BLANK_PACKAGE_SIZE) * IN_MEMORY_EXPANSION + self.history.nbytes
+
+    def bump_revision(self, slide_id: Optional[str] = None, label: Optional[str] = None) -> None:
+        """
+        Record that the deck was modified and snapshot it into the history.
+        Pass slide_id when only that slide changed, so the other slides are
+        neither re-serialized nor lose their cached shape roles. label names
+        the operation in the history.
+        """
+        self.revision += 1
+        self.slide_map.invalidate_roles(slide_id)
+        self.history.record(self.revision, self.slide_map, slide_id, label)
+
+    def new_slide_id(self) -> str:
+        """A fresh slide id; during replay, the id the logged operation originally got"""
+        slide_id = self._replay_ids.pop(0) if self._replay_ids else str(uuid.uuid4())
+        self._issued_ids.append(slide_id)
+        return slide_id
+
+    def add_slide_after(self, slide_id: str):
+        """
+        Add a slide with the same layout right after slide_id, styled with the
+        current theme. Returns (new slide id, slide).
+        """
+        slide = self.prs.slides.add_slide(self.slide_map[slide_id].slide_layout)
+        new_id = self.new_slide_id()
+        self.slide_map.append(new_id, slide)
+        position = self.slide_map.position_of(slide_id) + 1
+        xml_slides = self.prs.slides._sldIdLst
+        sld_id = xml_slides[-1]
+        xml_slides.remove(sld_id)
+        xml_slides.insert(position, sld_id)
+        self.slide_map.move(new_id, position)
+        self.current_theme.apply_to_slide(slide)
+        return new_id, slide
+
+    def continuation(self, slide_id: str) -> "SlideContinuation":
+        """A new_slide callback for components rendered on slide_id, see render_component()"""
+        return SlideContinuation(self, slide_id)
+
+    def begin_operation(self) -> None:
+        """Start tracking the slide ids issued by a mutating route"""
+        self._issued_ids = []
+
+    def record_operation(self, endpoint: str, arguments: dict) -> None:
+        """
+        Append a successful mutating route call to the journal, checkpointing
+        when enough operations have been logged. Call while holding the write lock.
+        """
+        if self.journal is None or self._replaying:
+            return
+        logged = {}
+        for name, value in arguments.items():
+            if name == "session":
+                continue
+            logged[name] = value.model_dump() if isinstance(value, BaseModel) else value
+        try:
+            due = self.journal.append(endpoint, logged, self._issued_ids)
+        except (TypeError, ValueError):
+            # Arguments that cannot be logged are covered by a durable checkpoint of the result
+            self.checkpoint(durable=True)
+            return
+        if due:
+            self.checkpoint()
+
+    def checkpoint(self, durable: bool = False) -> None:
+        """
+        Checkpoint the deck into the journal. The package is captured here, under
+        the caller's write lock; writing it to disk happens in the background,
+        or before returning when durable (see SessionJournal.checkpoint), as
+        needed for changes the log cannot replay, like uploads.
+        """
+        if self.journal is None or self._replaying:
+            return
+        buffer = io.BytesIO()
+        self.write_package(buffer)
+        self.journal.checkpoint(buffer.getvalue(), self._meta(), durable=durable)
+
+    def _meta(self) -> dict:
+        """What a package file alone does not capture: slide ids, theme and source digest"""
+        return {
+            "session_id": self.session_id,
+            "theme": theme_key(self.current_theme),
+            "source_digest": self.source_digest if self.is_pristine() else None,
+            "slides": [[slide_id, slide.slide_id] for slide_id, slide in self.slide_map.items()]
+        }
+
+    def write_package(self, out, compression: Optional[str] = None) -> None:
+        """
+        Save the deck to a file-like object, reusing compressed members that have
+        not changed since the previous save. Call while holding at least the read lock.
+        """
+        with self._export_lock:
+            write_package(self.prs, out, self.entry_cache, compression)
+
+    def export(self, compression: Optional[str] = None) -> SerializedDeck:
+        """
+        The deck serialized at the current revision, cached until the next edit.
+        Call while holding at least the read lock.
+        """
+        compression = resolve_compression(compression)
+        # Concurrent readers wait for one serialization instead of each doing their own
+        with self._export_lock:
+            cached = self._export
+            if cached is not None and cached.revision == self.revision and cached.compression == compression:
+                return cached
+            buffer = io.BytesIO()
+            write_package(self.prs, buffer, self.entry_cache, compression)
+            cached = SerializedDeck(self.revision, compression, buffer.getvalue())
+            self._export = cached
+            self.package_size = len(cached.data)
+            return cached
+
+    def cached_export(self, compression: Optional[str] = None) -> Optional[SerializedDeck]:
+        """The cached serialization if it is still current, without serializing"""
+        cached = self._export
+        if cached is not None and cached.revision == self.revision and cached.compression == resolve_compression(compression):
+            return cached
+        return None
+
+    def is_pristine(self, digest: Optional[str] = None) -> bool:
+        """
+        True if the deck has not been edited since it was parsed from uploaded bytes,
+        and (when digest is given) those bytes hashed to digest.
+        """
+        if self.source_digest is None or self._source_revision != self.revision:
+            return False
+        return digest is None or digest == self.source_digest
+
+    def load(
+        self,
+        prs,
+        slide_ids: Optional[List[str]] = None,
+        package_size: Optional[int] = None,
+        source_digest: Optional[str] = None,
+        label: str = "load"
+    ) -> None:
+        """
+        Replace the session's deck with prs and rebuild slide_map in deck order.
+        New ids are generated for each slide unless slide_ids is given.
+        source_digest is the hash of the uploaded bytes prs was parsed from, if any.
+        label names the change in the revision history.
+        """
+        slide_map = SlideIndex()
+        for idx, slide in enumerate(prs.slides):
+            slide_id = slide_ids[idx] if slide_ids is not None else self.new_slide_id()
+            slide_map.append(slide_id, slide)
+        self.prs = prs
+        self.slide_map = slide_map
+        self.package_size = package_size or BLANK_PACKAGE_SIZE
+        self.bump_revision(label=label)
+        self.source_digest = source_digest
+        self._source_revision = self.revision
+        self.delta_baseline = None
+        self.entry_cache.clear()
+
+    def snapshot(self) -> DeckSnapshot:
+        """
+        Capture the deck, its slide ids and theme. Unchanged members are copied
+        from the entry cache, so this is cheap for a deck that was saved before.
+        Call while holding the write lock.
+        """
+        buffer = io.BytesIO()
+        self.write_package(buffer)
+        return DeckSnapshot(buffer, self.slide_map.keys(), self.current_theme, self.revision)
+
+    def restore(self, snapshot: DeckSnapshot) -> None:
+        """
+        Put the deck back the way it was when snapshot was taken, dropping the
+        revisions recorded since from the history. The revision number still
+        moves forward, so nothing cached for the dropped revisions is reused.
+        Call while holding the write lock.
+        """
+        self.history.truncate(snapshot.revision)
+        snapshot.package.seek(0)
+        prs = Presentation(snapshot.package)
+        self.load(prs, slide_ids=snapshot.slide_ids, package_size=snapshot.package.getbuffer().nbytes, label="rollback")
+        self.entry_cache.harvest(snapshot.package, prs)
+        self.current_theme = snapshot.theme
+
+    def reset(self) -> None:
+        """Start over with a blank presentation"""
+        self.load(Presentation(), label="reset")
+
+    def _load_package_file(self, path: str, meta: dict) -> None:
+        """Load the deck from a package file written by spill() or checkpoint()"""
+        with open(path, "rb") as f:
+            self._load_package(f, meta, os.path.getsize(path))
+
+    def _load_package(self, package, meta: dict, package_size: int) -> None:
+        prs = Presentation(package)
+
+        # Restore the original slide ids by the slide's sldId, which is stable across save/load
+        slide_map = SlideIndex()
+        for slide_id, sld_id in meta["slides"]:
+            slide = prs.slides.get(sld_id)
+            if slide is not None:
+                slide_map.append(slide_id, slide)
+        self.prs = prs
+        self.slide_map = slide_map
+        self.entry_cache.clear()
+        self.entry_cache.harvest(package, prs)
+        self.current_theme = THEMES.get(meta.get("theme"), THEMES["default"])
+        self.package_size = package_size
+        self.source_digest = meta.get("source_digest")
+        self._source_revision = self.revision
+
+    def adopt(self, generation: int, package: bytes, meta: dict) -> None:
+        """Replace the deck with a newer package another worker published to the shared backend"""
+        with self._load_lock, self.lock.write():
+            self._load_package(io.BytesIO(package), meta, len(package))
+            self.delta_baseline = None
+            self.bump_revision(label="sync")
+            self._source_revision = self.revision
+            self.generation = generation
+            self.published_revision = self.revision
+
+    def shared_state(self):
+        """(revision, package bytes, meta) to publish to the shared backend"""
+        with self.lock.read():
+            buffer = io.BytesIO()
+            self.write_package(buffer)
+            return self.revision, buffer.getvalue(), self._meta()
+
+    def mark_published(self, generation: int, revision: int) -> None:
+        self.generation = generation
+        self.published_revision = revision
+
+    def recover(self, replay: Callable[["PresentationSession", dict], None]) -> None:
+        """
+        Rebuild the deck from the journal: load the last checkpoint, then run
+        each logged operation after it through replay(session, entry).
+        """
+        meta, package_path, entries = self.journal.recovery_plan()
+        if meta is not None and os.path.exists(package_path):
+            self._load_package_file(package_path, meta)
+        else:
+            if meta is not None:
+                logger.warning("Checkpoint package of session %s is missing, replaying onto a blank deck", self.session_id)
+            self.reset()
+
+        self._replaying = True
+        try:
+            for entry in entries:
+                self._replay_ids = list(entry.get("ids") or [])
+                try:
+                    replay(self, entry)
+                except Exception:
+                    logger.warning("Could not replay %s (seq %s) for session %s",
+                                   entry.get("endpoint"), entry.get("seq"), self.session_id, exc_info=True)
+        finally:
+            self._replaying = False
+            self._replay_ids = []
+
+    def ensure_loaded(self, spill_path: str, replay: Optional[Callable] = None) -> None:
+        """
+        Rehydrate the deck from its spill file, else recover it from the journal
+        (when replay is given), or start blank if there is neither
+        """
+        # Always take the lock: a concurrent spill() may be about to drop the deck
+        with self._load_lock:
+            if self.is_loaded:
+                return
+            meta_path = spill_path + ".json"
+            if os.path.exists(spill_path) and os.path.exists(meta_path):
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                self._load_package_file(spill_path, meta)
+                os.remove(spill_path)
+                os.remove(meta_path)
+            elif replay is not None and self.journal is not None and self.journal.has_state():
+                self.recover(replay)
+            else:
+                self.reset()
+
+    def spill(self, spill_path: str) -> bool:
+        """
+        Write the deck to disk and drop it from memory.
+        Returns False if the session was pinned by a request in the meantime.
+        """
+        with self._load_lock:
+            if not self.is_loaded or self.pins > 0:
+                return False
+
+            with open(spill_path, "wb") as f:
+                self.write_package(f)
+            meta = self._meta()
+            with open(spill_path + ".json", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+
+            self.package_size = os.path.getsize(spill_path)
+            self._unload()
+            return True
+
+    def evict(self) -> bool:
+        """
+        Drop the deck from memory without writing it anywhere, for sessions whose
+        latest state is published to a shared backend. It is fetched again on
+        the next request. Returns False if the session was pinned meanwhile.
+        """
+        with self._load_lock:
+            if not self.is_loaded or self.pins > 0:
+                return False
+            self._unload()
+            self.generation = 0
+            return True
+
+    def _unload(self) -> None:
+        self.prs = None
+        self.slide_map = SlideIndex()
+        self.delta_baseline = None
+        self._export = None
+        self.entry_cache.clear()
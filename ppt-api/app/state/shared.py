@@ -0,0 +1,277 @@
+"""
+Shared deck state for running several worker processes on one host.
+
+A backend holds the latest published package of every session plus a lease
+per session. A worker takes a session's lease while it has requests in flight
+for it, reloads the deck if another worker published a newer generation, and
+publishes its own edits before answering. Held leases are renewed in the
+background so a slow request keeps its session. Requests for one session are
+therefore serialized across workers while different sessions run on all
+cores. Responses carry the serving worker's id as an affinity hint, so a
+sticky proxy keeps a session on the worker that already has its deck parsed.
+
+Two backends are provided, neither needing an external service: a directory
+of files guarded by flock, and a single SQLite database in WAL mode.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from .journal import fsync_write
+
+
+class LeaseUnavailable(Exception):
+    """Raised when another worker kept a session's lease for longer than we would wait"""
+
+    def __init__(self, session_id: str, owner: Optional[str]):
+        super().__init__(f"Session {session_id} is in use by worker {owner}")
+        self.session_id = session_id
+        self.owner = owner
+
+
+class LeaseLost(Exception):
+    """Raised when a session's lease expired and another worker took the session over"""
+
+    def __init__(self, session_id: str):
+        super().__init__(f"Lease on session {session_id} was lost; its latest edits were not published")
+        self.session_id = session_id
+
+
+class StateBackend(ABC):
+    """Leases and published packages, keyed by session id"""
+
+    @abstractmethod
+    def try_lease(self, session_id: str, owner: str, ttl: float) -> Optional[str]:
+        """
+        Take or renew the lease for owner. Returns None when granted, otherwise
+        the worker currently holding it. Expired leases are taken over.
+        """
+        pass
+
+    @abstractmethod
+    def release_lease(self, session_id: str, owner: str) -> None:
+        pass
+
+    @abstractmethod
+    def generation(self, session_id: str) -> int:
+        """Generation of the latest published package, 0 if there is none"""
+        pass
+
+    @abstractmethod
+    def fetch(self, session_id: str) -> Optional[Tuple[int, bytes, dict]]:
+        """(generation, package bytes, meta) of the latest published package"""
+        pass
+
+    @abstractmethod
+    def publish(self, session_id: str, owner: str, package: bytes, meta: dict) -> Optional[int]:
+        """
+        Store a new package for the session if owner still holds the lease.
+        Returns the new generation, or None if the lease was lost.
+        """
+        pass
+
+    def acquire_lease(self, session_id: str, owner: str, ttl: float, wait: float) -> None:
+        """Take the lease, waiting up to wait seconds for its holder to give it up"""
+        deadline = time.monotonic() + wait
+        delay = 0.005
+        while True:
+            holder = self.try_lease(session_id, owner, ttl)
+            if holder is None:
+                return
+            if time.monotonic() >= deadline:
+                raise LeaseUnavailable(session_id, holder)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+
+class DiskBackend(StateBackend):
+    """
+    One lease file and one published package per session in directory.
+    Read-modify-write of a session's files happens under an exclusive flock.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _base(self, session_id: str) -> str:
+        # Session ids come from clients, so never use them as file names directly
+        return os.path.join(self.directory, hashlib.sha1(session_id.encode("utf-8")).hexdigest())
+
+    @contextmanager
+    def _locked(self, session_id: str):
+        with open(self._base(session_id) + ".lock", "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _read_lease(self, session_id: str) -> Optional[dict]:
+        try:
+            return self._read_json(self._base(session_id) + ".lease")
+        except ValueError:
+            # Leases are replaced atomically, so this is debris (e.g. from before
+            # a crash); an unreadable lease is no one's and counts as expired
+            return None
+
+    def try_lease(self, session_id: str, owner: str, ttl: float) -> Optional[str]:
+        with self._locked(session_id):
+            lease = self._read_lease(session_id)
+            if lease is not None and lease["owner"] != owner and lease["expires"] > time.time():
+                return lease["owner"]
+            lease = {"owner": owner, "expires": time.time() + ttl}
+            fsync_write(self._base(session_id) + ".lease", json.dumps(lease).encode("utf-8"))
+            return None
+
+    def release_lease(self, session_id: str, owner: str) -> None:
+        with self._locked(session_id):
+            lease = self._read_lease(session_id)
+            if lease is not None and lease["owner"] == owner:
+                os.remove(self._base(session_id) + ".lease")
+
+    def generation(self, session_id: str) -> int:
+        meta = self._read_json(self._base(session_id) + ".json")
+        return meta["generation"] if meta else 0
+
+    def fetch(self, session_id: str) -> Optional[Tuple[int, bytes, dict]]:
+        base = self._base(session_id)
+        with self._locked(session_id):
+            meta = self._read_json(base + ".json")
+            if meta is None:
+                return None
+            with open(os.path.join(self.directory, meta["package"]), "rb") as f:
+                package = f.read()
+        return meta["generation"], package, meta["meta"]
+
+    def publish(self, session_id: str, owner: str, package: bytes, meta: dict) -> Optional[int]:
+        base = self._base(session_id)
+        with self._locked(session_id):
+            lease = self._read_lease(session_id)
+            if lease is None or lease["owner"] != owner:
+                return None
+            previous = self._read_json(base + ".json")
+            generation = (previous["generation"] if previous else 0) + 1
+            # Package first, then switch the pointer, so readers never see a torn package
+            package_name = f"{os.path.basename(base)}.{generation}.pptx"
+            fsync_write(os.path.join(self.directory, package_name), package)
+            record = {"generation": generation, "package": package_name, "meta": meta}
+            fsync_write(base + ".json", json.dumps(record).encode("utf-8"))
+            if previous is not None:
+                old_path = os.path.join(self.directory, previous["package"])
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+        return generation
+
+
+class SQLiteBackend(StateBackend):
+    """Leases and packages in one SQLite database, shared by processes through WAL mode"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        with self._transaction() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "session_id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS decks ("
+                "session_id TEXT PRIMARY KEY, generation INTEGER NOT NULL, package BLOB NOT NULL, meta TEXT NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        # IMMEDIATE takes the write lock up front, so check-then-set is atomic across processes
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def try_lease(self, session_id: str, owner: str, ttl: float) -> Optional[str]:
+        with self._transaction() as db:
+            row = db.execute("SELECT owner, expires FROM leases WHERE session_id = ?", (session_id,)).fetchone()
+            if row is not None and row[0] != owner and row[1] > time.time():
+                return row[0]
+            db.execute(
+                "INSERT OR REPLACE INTO leases (session_id, owner, expires) VALUES (?, ?, ?)",
+                (session_id, owner, time.time() + ttl)
+            )
+            return None
+
+    def release_lease(self, session_id: str, owner: str) -> None:
+        with self._transaction() as db:
+            db.execute("DELETE FROM leases WHERE session_id = ? AND owner = ?", (session_id, owner))
+
+    def generation(self, session_id: str) -> int:
+        row = self._connection().execute(
+            "SELECT generation FROM decks WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def fetch(self, session_id: str) -> Optional[Tuple[int, bytes, dict]]:
+        row = self._connection().execute(
+            "SELECT generation, package, meta FROM decks WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], bytes(row[1]), json.loads(row[2])
+
+    def publish(self, session_id: str, owner: str, package: bytes, meta: dict) -> Optional[int]:
+        with self._transaction() as db:
+            row = db.execute("SELECT owner FROM leases WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None or row[0] != owner:
+                return None
+            row = db.execute("SELECT generation FROM decks WHERE session_id = ?", (session_id,)).fetchone()
+            generation = (row[0] if row else 0) + 1
+            db.execute(
+                "INSERT OR REPLACE INTO decks (session_id, generation, package, meta) VALUES (?, ?, ?, ?)",
+                (session_id, generation, sqlite3.Binary(package), json.dumps(meta))
+            )
+            return generation
+
+
+def create_backend(kind: str, path: str) -> Optional[StateBackend]:
+    """
+    Backend for the PPT_STATE_BACKEND setting: "memory" (no sharing, a single
+    worker), "disk" (files under path) or "sqlite" (path/state.db).
+    """
+    if kind == "memory":
+        return None
+    if kind == "disk":
+        return DiskBackend(path)
+    if kind == "sqlite":
+        return SQLiteBackend(os.path.join(path, "state.db"))
+    raise ValueError(f"Unknown state backend '{kind}'. Valid backends: memory, disk, sqlite")
@@ -0,0 +1,141 @@
+"""
+Bidirectional slide index: slide id <-> 1-based slide number <-> sldId position.
+"""
+from typing import Dict, Iterator, List, Optional
+
+from ..utils.shape_roles import SlideRoles
+
+
+class SlideIndex:
+    """
+    Ordered map of slide id -> Slide kept in deck (sldIdLst) order.
+
+    Behaves like the plain dict slide_map used to (membership, item access,
+    keys/items/values, pop), and additionally answers "which id is slide N"
+    and "what number is this id" in O(1). Creating, deleting and moving slides
+    must go through append/pop/move so the index never drifts from the deck.
+
+    It also caches each slide's shape roles (title, subtitle, footnote, body),
+    built on first use and dropped when the slide is replaced or edited.
+    """
+
+    def __init__(self):
+        self._ids: List[str] = []
+        self._slides: Dict[str, object] = {}
+        self._positions: Dict[str, int] = {}
+        self._roles: Dict[str, SlideRoles] = {}
+
+    # --- dict-like access, compatible with the old slide_map ---
+
+    def __contains__(self, slide_id) -> bool:
+        return slide_id in self._slides
+
+    def __getitem__(self, slide_id: str):
+        return self._slides[slide_id]
+
+    def __setitem__(self, slide_id: str, slide) -> None:
+        """Replace the Slide for an existing id, or append a new slide at the end"""
+        if slide_id in self._slides:
+            self._slides[slide_id] = slide
+            self._roles.pop(slide_id, None)
+        else:
+            self.append(slide_id, slide)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._ids))
+
+    def get(self, slide_id: str, default=None):
+        return self._slides.get(slide_id, default)
+
+    def keys(self) -> List[str]:
+        return list(self._ids)
+
+    def values(self) -> list:
+        return [self._slides[slide_id] for slide_id in self._ids]
+
+    def items(self) -> list:
+        return [(slide_id, self._slides[slide_id]) for slide_id in self._ids]
+
+    def clear(self) -> None:
+        self._ids = []
+        self._slides = {}
+        self._positions = {}
+        self._roles = {}
+
+    # --- index maintenance ---
+
+    def append(self, slide_id: str, slide) -> None:
+        """Register a slide that was added at the end of the deck"""
+        self._positions[slide_id] = len(self._ids)
+        self._ids.append(slide_id)
+        self._slides[slide_id] = slide
+
+    def pop(self, slide_id: str, *default):
+        """Unregister a slide; positions of the slides after it shift down by one"""
+        if slide_id not in self._slides:
+            if default:
+                return default[0]
+            raise KeyError(slide_id)
+        position = self._positions.pop(slide_id)
+        del self._ids[position]
+        for idx in range(position, len(self._ids)):
+            self._positions[self._ids[idx]] = idx
+        self._roles.pop(slide_id, None)
+        return self._slides.pop(slide_id)
+
+    def move(self, slide_id: str, new_position: int) -> None:
+        """Move a slide to a 0-based position, shifting the slides in between"""
+        old_position = self._positions[slide_id]
+        del self._ids[old_position]
+        self._ids.insert(new_position, slide_id)
+        for idx in range(min(old_position, new_position), max(old_position, new_position) + 1):
+            self._positions[self._ids[idx]] = idx
+
+    # --- lookups ---
+
+    def position_of(self, slide_id: str) -> Optional[int]:
+        """0-based position of the slide in the deck (its sldId index)"""
+        return self._positions.get(slide_id)
+
+    def number_of(self, slide_id: str) -> Optional[int]:
+        """1-based slide number"""
+        position = self._positions.get(slide_id)
+        return None if position is None else position + 1
+
+    def id_at(self, slide_number: int) -> Optional[str]:
+        """Slide id for a 1-based slide number, or None if out of range"""
+        if not isinstance(slide_number, int) or slide_number < 1 or slide_number > len(self._ids):
+            return None
+        return self._ids[slide_number - 1]
+
+    def slide_at(self, slide_number: int):
+        """Slide for a 1-based slide number, or None if out of range"""
+        slide_id = self.id_at(slide_number)
+        return None if slide_id is None else self._slides[slide_id]
+
+    # --- shape roles ---
+
+    def roles(self, slide_id: str) -> Optional[SlideRoles]:
+        """Shape roles of a slide, classified on first use and then reused"""
+        slide = self._slides.get(slide_id)
+        if slide is None:
+            return None
+        roles = self._roles.get(slide_id)
+        if roles is None:
+            roles = self._roles[slide_id] = SlideRoles.build(slide)
+        return roles
+
+    def roles_at(self, slide_number: int) -> Optional[SlideRoles]:
+        """Shape roles for a 1-based slide number, or None if out of range"""
+        slide_id = self.id_at(slide_number)
+        return None if slide_id is None else self.roles(slide_id)
+
+    def invalidate_roles(self, slide_id: Optional[str] = None) -> None:
+        """Forget cached roles for one slide, or for every slide when slide_id is None"""
+        if slide_id is None:
+            self._roles = {}
+        else:
+            self._roles.pop(slide_id, None)
@@ -0,0 +1,235 @@
+"""
+Session-keyed presentation store with a memory budget and LRU spill to disk.
+"""
+import hashlib
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from .journal import SessionJournal
+from .session import PresentationSession
+from .shared import LeaseLost, LeaseUnavailable, StateBackend
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    Maps session ids to PresentationSession objects.
+
+    Every known session keeps a small shell in memory; only the deck itself is
+    spilled. When the estimated size of resident decks exceeds the budget, the
+    least recently used idle sessions are written to spill_dir and reloaded on
+    their next request.
+
+    With a journal_dir, every session's mutating operations are journaled there
+    and a session that is neither resident nor spilled is recovered from its
+    journal through replay(session, entry), e.g. after a restart.
+
+    With a shared backend (app.state.shared), a session's lease is held while
+    this worker has requests in flight for it: the deck is refreshed from the
+    backend when the lease is taken and published back by publish() before
+    each response. A background thread renews held leases every third of
+    their TTL. Idle decks over the budget are then evicted instead of spilled.
+    """
+
+    def __init__(self, memory_budget_bytes: int, spill_dir: str,
+                 journal_dir: Optional[str] = None, checkpoint_every: int = 50,
+                 backend: Optional[StateBackend] = None, lease_ttl: float = 30.0, lease_wait: float = 10.0):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_dir = spill_dir
+        os.makedirs(spill_dir, exist_ok=True)
+        self.journal_dir = journal_dir or None
+        self.checkpoint_every = checkpoint_every
+        self.replay: Optional[Callable] = None
+        self.backend = backend
+        self.lease_ttl = lease_ttl
+        self.lease_wait = lease_wait
+        # Identifies this process in leases and in affinity hints
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # Ordered from least to most recently used
+        self._sessions: "OrderedDict[str, PresentationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        if backend is not None:
+            threading.Thread(target=self._keep_leases, name="lease-keeper", daemon=True).start()
+
+    def _spill_path(self, session_id: str) -> str:
+        # Session ids come from clients, so never use them as file names directly
+        digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{digest}.pptx")
+
+    def acquire(self, session_id: str) -> PresentationSession:
+        """Get (creating or rehydrating if needed) a session and pin it until release()"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = PresentationSession(session_id)
+                if self.journal_dir is not None:
+                    session.journal = SessionJournal(self.journal_dir, session_id, self.checkpoint_every)
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            session.pins += 1
+
+        leased = False
+        try:
+            if self.backend is not None:
+                self._enter_lease(session)
+                leased = True
+            session.ensure_loaded(self._spill_path(session_id), self.replay)
+        except Exception:
+            self._unpin(session, leased)
+            raise
+
+        self.enforce_budget()
+        return session
+
+    def release(self, session: PresentationSession) -> None:
+        """Unpin a session acquired with acquire()"""
+        self._unpin(session, self.backend is not None)
+
+    def _unpin(self, session: PresentationSession, leased: bool) -> None:
+        # Publish before unpinning, so the deck cannot be evicted mid-publish
+        if leased:
+            self._exit_lease(session)
+        with self._lock:
+            session.pins -= 1
+        # The request may have loaded a larger deck
+        self.enforce_budget()
+
+    def _enter_lease(self, session: PresentationSession) -> None:
+        """Take the session's shared lease for one request, syncing the deck on first entry"""
+        with session.lease_guard:
+            if session.lease_lost:
+                # Another worker owns the session until our remaining requests drain
+                raise LeaseUnavailable(session.session_id, None)
+            if session.lease_holders == 0:
+                self.backend.acquire_lease(session.session_id, self.worker_id, self.lease_ttl, self.lease_wait)
+                try:
+                    if self.backend.generation(session.session_id) > session.generation:
+                        fetched = self.backend.fetch(session.session_id)
+                        if fetched is not None:
+                            session.adopt(*fetched)
+                except Exception:
+                    self.backend.release_lease(session.session_id, self.worker_id)
+                    raise
+            session.lease_holders += 1
+
+    def _exit_lease(self, session: PresentationSession) -> None:
+        """Leave the lease for one request; the last one out publishes any edits left over"""
+        with session.lease_guard:
+            session.lease_holders -= 1
+            if session.lease_holders > 0:
+                return
+            try:
+                if not session.lease_lost and session.is_loaded and session.revision != session.published_revision:
+                    self._publish_state(session, session.shared_state())
+            except LeaseLost:
+                logger.warning("Lease on session %s expired mid-request; its edits were not published",
+                               session.session_id)
+            except Exception:
+                logger.exception("Publishing session %s failed", session.session_id)
+            finally:
+                session.lease_lost = False
+                self.backend.release_lease(session.session_id, self.worker_id)
+
+    def publish(self, session: PresentationSession) -> None:
+        """
+        Publish the session's edits, if any, while the request still holds the
+        lease. Raises LeaseLost if the lease was lost, in which case the edits
+        are dropped and the deck is fetched again on the next request.
+        """
+        if session.lease_lost:
+            raise LeaseLost(session.session_id)
+        if not session.is_loaded or session.revision == session.published_revision:
+            return
+        # Serialize before taking the guard: waiting here for another request's
+        # write must not hold up renewing the lease
+        state = session.shared_state()
+        with session.lease_guard:
+            if state[0] > session.published_revision:
+                self._publish_state(session, state)
+
+    def _publish_state(self, session: PresentationSession, state) -> None:
+        """Renew the lease and publish (revision, package, meta); the caller holds lease_guard"""
+        revision, package, meta = state
+        generation = None
+        if self._renew_lease(session):
+            generation = self.backend.publish(session.session_id, self.worker_id, package, meta)
+        if generation is None:
+            self._lose_lease(session)
+            raise LeaseLost(session.session_id)
+        session.mark_published(generation, revision)
+
+    @staticmethod
+    def _lose_lease(session: PresentationSession) -> None:
+        session.lease_lost = True
+        # Refetch the published deck next time instead of building on the lost edits
+        session.generation = 0
+        session.published_revision = -1
+
+    def _renew_lease(self, session: PresentationSession) -> bool:
+        """
+        Extend the lease of a session with requests in flight; the caller holds
+        lease_guard. False if the lease is lost: it expired and another worker
+        holds it now or has published since our deck was loaded.
+        """
+        if session.lease_lost:
+            return False
+        if (self.backend.try_lease(session.session_id, self.worker_id, self.lease_ttl) is not None
+                or self.backend.generation(session.session_id) > session.generation):
+            self._lose_lease(session)
+        return not session.lease_lost
+
+    def _keep_leases(self) -> None:
+        """Renew the leases of sessions with requests in flight until the process exits"""
+        while True:
+            time.sleep(self.lease_ttl / 3)
+            with self._lock:
+                held = [s for s in self._sessions.values() if s.lease_holders > 0]
+            for session in held:
+                # Entering and leaving requests hold the guard briefly and take or
+                # release the lease themselves, so skip sessions that are busy
+                if not session.lease_guard.acquire(blocking=False):
+                    continue
+                try:
+                    if session.lease_holders > 0 and not session.lease_lost and not self._renew_lease(session):
+                        logger.warning("Lease on session %s was taken over by another worker",
+                                       session.session_id)
+                except Exception:
+                    logger.exception("Renewing the lease on session %s failed", session.session_id)
+                finally:
+                    session.lease_guard.release()
+
+    def session_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions.keys())
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(s.estimated_size for s in self._sessions.values())
+
+    def enforce_budget(self) -> None:
+        """Spill least recently used idle decks until resident decks fit the budget"""
+        with self._lock:
+            resident = sum(s.estimated_size for s in self._sessions.values())
+            if resident <= self.memory_budget_bytes:
+                return
+            victims = []
+            for session in self._sessions.values():
+                if resident <= self.memory_budget_bytes:
+                    break
+                if session.is_loaded and session.pins == 0:
+                    victims.append(session)
+                    resident -= session.estimated_size
+
+        # Spill outside the store lock so other sessions are not blocked on disk I/O
+        for session in victims:
+            if self.backend is not None:
+                # Already published: the backend holds the latest copy
+                session.evict()
+            else:
+                session.spill(self._spill_path(session.session_id))
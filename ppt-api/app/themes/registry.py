@@ -0,0 +1,360 @@
+"""
+Theme registry loaded from definition files, with hot reload.
+
+Each theme is one JSON (or TOML, on Python 3.11+) file named <key>.json in
+the built-in definitions directory or in PPT_THEMES_DIR, the latter taking
+precedence. A definition looks like:
+
+{
+    "name": "Pitchbook",
+    "font_family": "Arial",
+    "primary_color": "#0B2341",
+    "background_color": "#FFFFFF",
+    "styles": {"title": {"font_size": 40}, "body": {"font_size": 16}},
+    "components": {"callout_box": {"top": 6.2}}
+}
+
+styles override the defaults Theme derives from font_family and the colors;
+components are default content for add_component. Definitions can also be
+extracted from the slide master of a .pptx file.
+
+Themes are compiled once and shared by every session. A reload builds a new
+Theme for each changed definition and swaps in a new key -> Theme dict, so
+lookups stay plain dict reads and a loaded Theme is never modified. Sessions
+resolve their theme by key (see PresentationSession.current_theme), so they
+pick up the new version. The last few versions a reload replaced are kept,
+so text styled with an old definition is still recognised (versions()).
+
+Themes are listed in declaration order: the built-ins in BUILTIN_THEME_ORDER,
+then other themes in the order they first appeared.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections.abc import Mapping
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
+
+from ..config import THEMES_DIR
+from .theme import Style, Theme
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: TOML definitions are skipped
+    tomllib = None
+
+logger = logging.getLogger(__name__)
+
+BUILTIN_THEMES_DIR = os.path.join(os.path.dirname(__file__), "definitions")
+BUILTIN_THEME_ORDER = ("default", "dark", "modern", "pitchbook", "strategy_template")
+# Replaced versions of a theme kept for recognising text styled with them
+SUPERSEDED_VERSIONS = 4
+
+DEFINITION_EXTENSIONS = (".json", ".toml")
+STYLE_FIELDS = {"font_size", "font_family", "bold", "italic", "color"}
+_COLOR = re.compile(r"^#[0-9A-Fa-f]{6}$")
+_KEY = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class ThemeDefinitionError(ValueError):
+    """Raised when a theme definition is malformed"""
+
+
+def _check_color(value, where: str) -> None:
+    if not isinstance(value, str) or not _COLOR.match(value):
+        raise ThemeDefinitionError(f"{where} must be a color like '#1F497D', got {value!r}")
+
+
+def theme_from_definition(key: str, data: dict) -> Theme:
+    """Build and compile the Theme described by a definition dict"""
+    if not isinstance(data, dict):
+        raise ThemeDefinitionError("A theme definition must be an object")
+    if not isinstance(data.get("name"), str):
+        raise ThemeDefinitionError("A theme definition needs a 'name'")
+    for field in ("primary_color", "background_color"):
+        if field in data:
+            _check_color(data[field], field)
+
+    theme = Theme(
+        name=data["name"],
+        font_family=data.get("font_family", "Calibri"),
+        primary_color=data.get("primary_color", "#1F497D"),
+        background_color=data.get("background_color", "#FFFFFF")
+    )
+
+    styles = data.get("styles") or {}
+    if not isinstance(styles, dict):
+        raise ThemeDefinitionError("styles must be an object of style name -> fields")
+    for style_name, fields in styles.items():
+        if not isinstance(fields, dict):
+            raise ThemeDefinitionError(f"Style '{style_name}' must be an object")
+        unknown = set(fields) - STYLE_FIELDS
+        if unknown:
+            raise ThemeDefinitionError(f"Style '{style_name}' has unknown fields {sorted(unknown)}. Valid fields: {sorted(STYLE_FIELDS)}")
+        if "color" in fields:
+            _check_color(fields["color"], f"styles.{style_name}.color")
+        style = theme.styles.get(style_name) or Style(font_family=theme.font_family)
+        for field, value in fields.items():
+            setattr(style, field, value)
+        theme.styles[style_name] = style
+
+    components = data.get("components") or {}
+    if not isinstance(components, dict) or any(not isinstance(value, dict) for value in components.values()):
+        raise ThemeDefinitionError("components must be an object of component type -> default content")
+
+    try:
+        for style in theme.styles.values():
+            style.compiled()
+        theme.compiled_background()
+    except (TypeError, ValueError) as e:
+        raise ThemeDefinitionError(f"Theme '{key}' does not compile: {e}")
+
+    theme.key = key
+    theme.definition = data
+    theme.component_defaults = components
+    return theme
+
+
+def definition_from_theme(theme: Theme) -> dict:
+    """A definition that rebuilds theme as it is now, including styles changed since it was loaded"""
+    return {
+        "name": theme.name,
+        "font_family": theme.font_family,
+        "primary_color": theme.primary_color,
+        "background_color": theme.background_color,
+        "styles": {
+            name: {field: getattr(style, field) for field in sorted(STYLE_FIELDS) if getattr(style, field) is not None}
+            for name, style in theme.styles.items()
+        },
+        "components": theme.component_defaults
+    }
+
+
+def _scheme_color(scheme, name: str) -> Optional[str]:
+    """'#RRGGBB' of a color in an a:clrScheme, resolving system colors to their last value"""
+    slot = scheme.find(qn(f"a:{name}"))
+    if slot is None:
+        return None
+    srgb = slot.find(qn("a:srgbClr"))
+    if srgb is not None:
+        return f"#{srgb.get('val').upper()}"
+    sys_clr = slot.find(qn("a:sysClr"))
+    if sys_clr is not None and sys_clr.get("lastClr"):
+        return f"#{sys_clr.get('lastClr').upper()}"
+    return None
+
+
+def _master_font_size(master, style: str) -> Optional[float]:
+    defRPr = master.find(f"{qn('p:txStyles')}/{qn(style)}/{qn('a:lvl1pPr')}/{qn('a:defRPr')}")
+    if defRPr is None or defRPr.get("sz") is None:
+        return None
+    return int(defRPr.get("sz")) / 100
+
+
+def definition_from_pptx(package: BinaryIO, name: str) -> dict:
+    """
+    Theme definition extracted from a .pptx file's slide master: theme fonts
+    and colors, and the master's title and body text sizes
+    """
+    prs = Presentation(package)
+    master_part = prs.slide_master.part
+    theme_xml = parse_xml(master_part.part_related_by(RT.THEME).blob)
+    scheme = theme_xml.find(f".//{qn('a:clrScheme')}")
+    font_scheme = theme_xml.find(f".//{qn('a:fontScheme')}")
+    if scheme is None or font_scheme is None:
+        raise ThemeDefinitionError("The presentation's master has no color or font scheme")
+
+    def font(kind: str) -> Optional[str]:
+        latin = font_scheme.find(f"{qn(kind)}/{qn('a:latin')}")
+        return latin.get("typeface") if latin is not None and latin.get("typeface") else None
+
+    major = font("a:majorFont") or "Calibri"
+    minor = font("a:minorFont") or major
+    text_color = _scheme_color(scheme, "dk1") or "#000000"
+    primary = _scheme_color(scheme, "dk2") or _scheme_color(scheme, "accent1") or text_color
+    background = _scheme_color(scheme, "lt1") or "#FFFFFF"
+
+    styles = {
+        "title": {"font_family": major},
+        "subtitle": {"font_family": minor},
+        "heading": {"font_family": major},
+        "body": {"color": text_color},
+        "bullet": {"color": text_color}
+    }
+    master = master_part._element
+    title_size = _master_font_size(master, "p:titleStyle")
+    body_size = _master_font_size(master, "p:bodyStyle")
+    if title_size:
+        styles["title"]["font_size"] = title_size
+    if body_size:
+        styles["body"]["font_size"] = body_size
+        styles["bullet"]["font_size"] = body_size
+
+    return {
+        "name": name,
+        "font_family": minor,
+        "primary_color": primary,
+        "background_color": background,
+        "styles": styles
+    }
+
+
+def _read_definition(path: str) -> dict:
+    if path.endswith(".toml"):
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ThemeRegistry(Mapping):
+    """
+    Read-only mapping of theme key -> Theme over definition directories, later
+    directories overriding earlier ones. Call reload() (or watch()) to pick up
+    changed files.
+    """
+
+    def __init__(self, directories: List[str], order: Iterable[str] = ()):
+        self.directories = directories
+        self._themes: Dict[str, Theme] = {}
+        # key -> replaced versions, newest first
+        self._superseded: Dict[str, List[Theme]] = {}
+        # key -> listing position, growing as new keys appear
+        self._order: Dict[str, int] = {key: idx for idx, key in enumerate(order)}
+        self._fingerprint: Optional[Tuple] = None
+        self._reload_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self.reload()
+
+    # --- Mapping ---
+
+    def __getitem__(self, key: str) -> Theme:
+        return self._themes[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._themes)
+
+    def __len__(self) -> int:
+        return len(self._themes)
+
+    def versions(self) -> List[Theme]:
+        """The current themes followed by the versions reloads replaced, newest first"""
+        superseded = self._superseded
+        return list(self._themes.values()) + [theme for versions in superseded.values() for theme in versions]
+
+    # --- loading ---
+
+    def _definition_files(self) -> Dict[str, str]:
+        """key -> path of the definition file that wins for it"""
+        files = {}
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                key, ext = os.path.splitext(filename)
+                if ext not in DEFINITION_EXTENSIONS or (ext == ".toml" and tomllib is None):
+                    continue
+                files[key] = os.path.join(directory, filename)
+        return files
+
+    @staticmethod
+    def _stat(path: str) -> Tuple:
+        try:
+            stat = os.stat(path)
+            return path, stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return path, None, None
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Re-read the definition files if any changed (or force). Definitions
+        that fail to load keep their previous version. Returns True if the
+        files were re-read.
+        """
+        with self._reload_lock:
+            files = self._definition_files()
+            fingerprint = tuple(sorted(self._stat(path) for path in files.values()))
+            if not force and fingerprint == self._fingerprint:
+                return False
+
+            current = self._themes
+            themes = {}
+            for key, path in files.items():
+                previous = current.get(key)
+                try:
+                    data = _read_definition(path)
+                    if previous is not None and previous.definition == data:
+                        themes[key] = previous
+                        continue
+                    theme = theme_from_definition(key, data)
+                except (OSError, ValueError) as e:
+                    logger.warning("Could not load theme %s from %s: %s", key, path, e)
+                    if previous is not None:
+                        themes[key] = previous
+                    continue
+                themes[key] = theme
+
+            if "default" not in themes:
+                logger.warning("No 'default' theme definition found, keeping the previous one")
+                themes["default"] = current.get("default") or theme_from_definition("default", {"name": "Default"})
+
+            superseded = dict(self._superseded)
+            for key, previous in current.items():
+                if themes.get(key, previous) is not previous:
+                    superseded[key] = [previous, *superseded.get(key, [])][:SUPERSEDED_VERSIONS]
+
+            for key in themes:
+                self._order.setdefault(key, len(self._order))
+            # Both swaps are single assignments: readers see the old or the new registry
+            self._themes = {key: themes[key] for key in sorted(themes, key=self._order.__getitem__)}
+            self._superseded = superseded
+            self._fingerprint = fingerprint
+            return True
+
+    def register(self, key: str, definition: dict) -> Theme:
+        """
+        Validate a definition, save it to the last (writable) definitions
+        directory and load it, replacing any theme with the same key
+        """
+        if not _KEY.match(key):
+            raise ThemeDefinitionError("Theme keys may only contain letters, digits, '-' and '_'")
+        theme_from_definition(key, definition)
+        directory = self.directories[-1]
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{key}.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(definition, f, indent=4)
+        os.replace(tmp_path, path)
+        # A .toml of the same key would otherwise shadow the new file
+        if os.path.exists(os.path.join(directory, f"{key}.toml")):
+            os.remove(os.path.join(directory, f"{key}.toml"))
+        self.reload(force=True)
+        return self._themes[key]
+
+    def watch(self, interval: float) -> None:
+        """Poll the definition directories every interval seconds on a daemon thread"""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception:
+                    logger.exception("Theme reload failed")
+
+        self._watcher = threading.Thread(target=poll, name="theme-reload", daemon=True)
+        self._watcher.start()
+
+
+# Built-in themes plus any definitions in PPT_THEMES_DIR
+THEMES = ThemeRegistry([BUILTIN_THEMES_DIR, THEMES_DIR], order=BUILTIN_THEME_ORDER)
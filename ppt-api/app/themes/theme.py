@@ -1,7 +1,22 @@
+from copy import deepcopy
 from typing import Dict, Optional
 from pptx.util import Pt
-from pptx.text.text import _Paragraph
+from pptx.text.text import Font, _Paragraph
 from pptx.dml.color import RGBColor
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from pptx.oxml.xmlchemy import OxmlElement
+
+_PPR = qn("a:pPr")
+_DEFRPR = qn("a:defRPr")
+_EXTLST = qn("a:extLst")
+# What a compiled style sets on a:defRPr: a paragraph whose properties hold
+# nothing else can have them swapped out wholesale for a clone
+_STYLE_ATTRIBUTES = {"sz", "b", "i"}
+_STYLE_CHILDREN = {
+    qn(tag) for tag in ("a:noFill", "a:solidFill", "a:gradFill", "a:blipFill", "a:pattFill", "a:grpFill", "a:latin")
+}
+
 
 class Style:
     def __init__(
@@ -17,23 +32,65 @@ class Style:
         self.bold = bold
         self.italic = italic
         self.color = color
+        # (attribute values, a:defRPr) - see compiled()
+        self._compiled = None
+
+    def key(self) -> tuple:
+        """The attribute values that determine what this style looks like"""
+        return (self.font_size, self.font_family, self.bold, self.italic, self.color)
+
+    def compiled(self):
+        """
+        The paragraph default run properties (a:defRPr) this style sets, built
+        once and rebuilt only when an attribute of the style has been changed
+        """
+        key = self.key()
+        if self._compiled is None or self._compiled[0] != key:
+            defRPr = OxmlElement("a:p").get_or_add_pPr().get_or_add_defRPr()
+            font = Font(defRPr)
+            font.size = Pt(self.font_size)
+            font.name = self.font_family
+            font.bold = self.bold
+            font.italic = self.italic
+            font.color.rgb = RGBColor.from_string(self.color.lstrip('#'))
+            self._compiled = (key, defRPr)
+        return self._compiled[1]
 
     def apply_to_text_frame(self, text_frame) -> None:
         """Apply this style to a text frame"""
-        for paragraph in text_frame.paragraphs:
-            self.apply_to_paragraph(paragraph)
+        self.apply_to_txBody(text_frame._txBody)
+
+    def apply_to_txBody(self, txBody) -> None:
+        """Apply this style to every paragraph of a txBody element"""
+        template = self.compiled()
+        for p in txBody.p_lst:
+            self._apply_to_p(p, template)
 
     def apply_to_paragraph(self, paragraph: _Paragraph) -> None:
         """Apply this style to a paragraph"""
-        font = paragraph.font
-        font.size = Pt(self.font_size)
-        font.name = self.font_family
-        font.bold = self.bold
-        font.italic = self.italic
-        
-        # Convert hex color to RGB
-        rgb = tuple(int(self.color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-        font.color.rgb = RGBColor(*rgb)
+        self._apply_to_p(paragraph._p, self.compiled())
+
+    @staticmethod
+    def _apply_to_p(p, template) -> None:
+        pPr = p[0] if len(p) and p[0].tag == _PPR else p.get_or_add_pPr()
+        defRPr = pPr.find(_DEFRPR)
+        if defRPr is None:
+            extLst = pPr.find(_EXTLST)
+            if extLst is None:
+                pPr.append(deepcopy(template))
+            else:
+                extLst.addprevious(deepcopy(template))
+            return
+        if _STYLE_ATTRIBUTES.issuperset(defRPr.attrib) and all(child.tag in _STYLE_CHILDREN for child in defRPr):
+            defRPr.addprevious(deepcopy(template))
+            pPr.remove(defRPr)
+            return
+        # Keep whatever else the paragraph sets, overriding only what the style sets
+        defRPr.attrib.update(template.attrib)
+        defRPr._remove_eg_fillProperties()
+        defRPr._insert_solidFill(deepcopy(template.solidFill))
+        defRPr._remove_latin()
+        defRPr._insert_latin(deepcopy(template.latin))
 
 class Theme:
     def __init__(
@@ -79,65 +136,44 @@ class Theme:
             )
         }
 
+        # (background color, p:bg) - see compiled_background()
+        self._background = None
+        # Set for themes loaded into the registry (app.themes.registry)
+        self.key: Optional[str] = None
+        self.definition: Optional[dict] = None
+        # Component type -> default content for add_component
+        self.component_defaults: Dict[str, dict] = {}
+
     def get_style(self, style_name: str) -> Optional[Style]:
         """Get a style by name"""
         return self.styles.get(style_name)
 
+    def style_fingerprint(self) -> tuple:
+        """Identifies what this theme's styles look like, for caching things built from them"""
+        return tuple((name, style.key()) for name, style in self.styles.items())
+
+    def compiled_background(self):
+        """The solid p:bg element for background_color, built once per color"""
+        if self._background is None or self._background[0] != self.background_color:
+            rgb = RGBColor.from_string(self.background_color.lstrip('#'))
+            bg = parse_xml(
+                f'<p:bg {nsdecls("a", "p")}><p:bgPr>'
+                f'<a:solidFill><a:srgbClr val="{rgb}"/></a:solidFill><a:effectLst/>'
+                f'</p:bgPr></p:bg>'
+            )
+            self._background = (self.background_color, bg)
+        return self._background[1]
+
+    def apply_background(self, slide) -> None:
+        """Give slide this theme's background"""
+        cSld = slide._element.cSld
+        cSld._remove_bg()
+        cSld._insert_bg(deepcopy(self.compiled_background()))
+
     def apply_to_slide(self, slide) -> None:
         """Apply theme to a slide"""
-        # Set background color
-        background = slide.background
-        fill = background.fill
-        fill.solid()
-        rgb = tuple(int(self.background_color.lstrip('#')[i:i+2], 16) for i in (0, 2, 4))
-        fill.fore_color.rgb = RGBColor(*rgb)
+        self.apply_background(slide)
 
         # Apply title style if title exists
         if hasattr(slide.shapes, "title") and slide.shapes.title:
             self.styles["title"].apply_to_text_frame(slide.shapes.title.text_frame)
-
-# Create some predefined themes
-THEMES = {
-    "default": Theme(
-        name="Default",
-        primary_color="#1F497D",
-        background_color="#FFFFFF"
-    ),
-    "dark": Theme(
-        name="Dark",
-        primary_color="#FFFFFF",
-        background_color="#2F2F2F"
-    ),
-    "modern": Theme(
-        name="Modern",
-        font_family="Segoe UI",
-        primary_color="#0078D4",
-        background_color="#F5F5F5"
-    ),
-    # 🟦 Theme from CFI Investment Banking Pitchbook
-    "pitchbook": Theme(
-        name="Pitchbook",
-        font_family="Arial",
-        primary_color="#0B2341",       # Deep navy blue (common in finance decks)
-        background_color="#FFFFFF"
-    ),
-    # 🟩 Theme from Placeholder Strategy Deck (PDF-based)
-    "strategy_template": Theme(
-        name="Strategy Template",
-        font_family="Calibri",
-        primary_color="#2F5597",       # Microsoft blue tone
-        background_color="#FFFFFF"
-    )
-} 
-
-THEMES["pitchbook"].styles["title"].font_size = 40
-THEMES["pitchbook"].styles["subtitle"].font_size = 28
-THEMES["pitchbook"].styles["heading"].font_size = 24
-THEMES["pitchbook"].styles["body"].font_size = 16
-THEMES["pitchbook"].styles["bullet"].font_size = 16
-
-THEMES["strategy_template"].styles["title"].font_size = 36
-THEMES["strategy_template"].styles["subtitle"].font_size = 24
-THEMES["strategy_template"].styles["heading"].font_size = 22
-THEMES["strategy_template"].styles["body"].font_size = 16
-THEMES["strategy_template"].styles["bullet"].font_size = 16
@@ -0,0 +1,132 @@
+"""
+Bulk component rendering across many slides.
+These are helper functions used by the component APIs but not exposed as APIs themselves.
+"""
+from typing import Dict, List
+
+from ..components.registry import COMPONENTS, render_component
+from ..state.slide_index import SlideIndex
+
+# Ways an item can say which slide it goes on; exactly one is required
+SLIDE_REFS = ("slide_id", "slide_number", "new_slide")
+
+# Layout of slides created for "new_slide" items
+NEW_SLIDE_LAYOUT = 6  # blank
+
+
+def validate_component_items(items, slide_map: SlideIndex):
+    """
+    Check and normalize bulk component items. Returns (items, None), or
+    (None, error) when any item is malformed, so a bad request changes nothing.
+
+    Item format:
+    {
+        "slide_id": "...",                # or "slide_number": 3, or "new_slide": "<label>"
+        "component_type": "timeline",
+        "content": {...}                  # same as /api/v1/slide/{slide_id}/component
+    }
+
+    Items with the same "new_slide" label go on the same new blank slide.
+    """
+    if not isinstance(items, list) or len(items) == 0:
+        return None, "items must be a non-empty array"
+
+    normalized = []
+    for idx, item in enumerate(items):
+        if not isinstance(item, dict):
+            return None, f"Item {idx} must be an object"
+
+        refs = [ref for ref in SLIDE_REFS if item.get(ref) is not None]
+        if len(refs) != 1:
+            return None, f"Item {idx} needs exactly one of {list(SLIDE_REFS)}"
+        ref = refs[0]
+        value = item[ref]
+        if ref == "slide_id" and value not in slide_map:
+            return None, f"Item {idx}: slide '{value}' not found"
+        if ref == "slide_number" and (not isinstance(value, int) or isinstance(value, bool)):
+            return None, f"Item {idx}: slide_number must be an integer, got {value!r}"
+        if ref == "slide_number" and slide_map.id_at(value) is None:
+            return None, f"Item {idx}: invalid slide number. Valid range is 1-{len(slide_map)}"
+        if ref == "new_slide" and not isinstance(value, str):
+            return None, f"Item {idx}: new_slide must be a string label"
+
+        component_type = item.get("component_type")
+        if component_type not in COMPONENTS:
+            return None, f"Item {idx}: invalid component type '{component_type}'. Valid types: {list(COMPONENTS)}"
+
+        content = item.get("content", {})
+        if not isinstance(content, dict):
+            return None, f"Item {idx}: content must be an object"
+
+        normalized.append({"ref": ref, "slide": value, "component_type": component_type, "content": content})
+    return normalized, None
+
+
+def render_component_items(session, items: list) -> Dict:
+    """
+    Render validated items onto the deck in one pass.
+
+    New slides are created first, in order of their labels' first appearance.
+    Items are then grouped by slide, in the order the slides first appear in
+    the request, and each slide's components are rendered in request order so
+    their stacking matches sequential add_component calls. An item whose
+    component fails to render reports its error; the others still render.
+    Long tables continue on slides inserted after their slide, listed in the
+    item's continuation_slide_ids.
+    Must be called holding the session's write lock.
+
+    This is a utility function, not an API endpoint.
+    """
+    slide_map = session.slide_map
+    theme = session.current_theme
+
+    new_slides = {}
+    for item in items:
+        if item["ref"] == "new_slide" and item["slide"] not in new_slides:
+            slide = session.prs.slides.add_slide(session.prs.slide_layouts[NEW_SLIDE_LAYOUT])
+            slide_id = session.new_slide_id()
+            slide_map.append(slide_id, slide)
+            theme.apply_to_slide(slide)
+            new_slides[item["slide"]] = slide_id
+
+    groups: Dict[str, List[int]] = {}
+    for idx, item in enumerate(items):
+        if item["ref"] == "slide_id":
+            slide_id = item["slide"]
+        elif item["ref"] == "slide_number":
+            slide_id = slide_map.id_at(item["slide"])
+        else:
+            slide_id = new_slides[item["slide"]]
+        groups.setdefault(slide_id, []).append(idx)
+
+    results: List[Dict] = [None] * len(items)
+    for slide_id, indexes in groups.items():
+        slide = slide_map[slide_id]
+        # Shared by the slide's items, so a second long table continues after the first one's slides
+        continuation = session.continuation(slide_id)
+        for idx in indexes:
+            item = items[idx]
+            result = {"slide_id": slide_id, "component_type": item["component_type"]}
+            created = len(continuation.slide_ids)
+            try:
+                render_component(slide, item["component_type"], item["content"], theme, new_slide=continuation)
+                result["status"] = "ok"
+            except Exception as e:
+                result.update({"status": "error", "error": str(e)})
+            if len(continuation.slide_ids) > created:
+                result["continuation_slide_ids"] = continuation.slide_ids[created:]
+            results[idx] = result
+
+    # Numbered once everything is rendered, as continuation slides shift the slides after them
+    for result in results:
+        result["slide_number"] = slide_map.number_of(result["slide_id"])
+
+    rendered = sum(1 for result in results if result["status"] == "ok")
+    return {
+        "status": "ok" if rendered == len(results) else "partial",
+        "rendered": rendered,
+        "failed": len(results) - rendered,
+        "slides_touched": len(groups),
+        "new_slides": new_slides,
+        "results": results
+    }
@@ -0,0 +1,176 @@
+"""
+Structural diff between two deck revisions.
+These are helper functions used by the history APIs but not exposed as APIs themselves.
+
+Slides are compared by the digest of their XML, so unchanged slides cost
+nothing. On changed slides every top-level shape element is hashed and shapes
+are matched across revisions by their cNvPr id; only shapes whose hash differs
+are inspected for geometry, text and styling changes. Shape tables are cached
+by slide digest in the session's RevisionHistory, so diffing on every chat turn
+re-parses only new slide XML, and a table is dropped with the XML it came from.
+"""
+import copy
+import hashlib
+from typing import Dict, Optional, Tuple
+
+from lxml import etree
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
+from pptx.util import Emu
+
+from ..state.history import RevisionHistory, Revision, stable_order
+
+_XFRM_XPATH = "./p:spPr/a:xfrm | ./p:xfrm | ./p:grpSpPr/a:xfrm"
+_GEOMETRY_FIELDS = ("left", "top", "width", "height")
+
+
+class ShapeInfo:
+    """What the diff needs to know about one shape element"""
+
+    __slots__ = ("shape_id", "name", "index", "digest", "style_digest", "geometry", "text")
+
+    def __init__(self, shape_id: int, name: str, index: int, digest: str, style_digest: str,
+                 geometry: Optional[Tuple[int, int, int, int]], text: str):
+        self.shape_id = shape_id
+        self.name = name
+        self.index = index
+        self.digest = digest
+        self.style_digest = style_digest
+        self.geometry = geometry
+        self.text = text
+
+    def position(self) -> Optional[dict]:
+        if self.geometry is None:
+            return None
+        return {field: Emu(value).inches for field, value in zip(_GEOMETRY_FIELDS, self.geometry)}
+
+    def summary(self) -> dict:
+        return {"shape_id": self.shape_id, "name": self.name, "position": self.position(), "text": self.text}
+
+
+def _geometry(element) -> Optional[Tuple[int, int, int, int]]:
+    xfrms = element.xpath(_XFRM_XPATH)
+    if not xfrms:
+        return None
+    off = xfrms[0].find(qn("a:off"))
+    ext = xfrms[0].find(qn("a:ext"))
+    if off is None or ext is None:
+        return None
+    return (int(off.get("x")), int(off.get("y")), int(ext.get("cx")), int(ext.get("cy")))
+
+
+def _text(element) -> str:
+    return "\n".join("".join(p.xpath(".//a:t/text()")) for p in element.xpath(".//a:p"))
+
+
+def _style_digest(element) -> str:
+    """Hash of everything except geometry and text, so formatting changes stand out"""
+    stripped = copy.deepcopy(element)
+    for xfrm in stripped.xpath(_XFRM_XPATH):
+        xfrm.getparent().remove(xfrm)
+    for t in stripped.iter(qn("a:t")):
+        t.text = ""
+    return hashlib.sha1(etree.tostring(stripped)).hexdigest()
+
+
+def shape_table(xml: bytes) -> Dict[int, ShapeInfo]:
+    """shape id -> ShapeInfo for the top-level shapes of one slide's XML"""
+    sld = parse_xml(xml)
+    table = {}
+    for index, element in enumerate(sld.cSld.spTree.iter_shape_elms()):
+        table[element.shape_id] = ShapeInfo(
+            shape_id=element.shape_id,
+            name=element.shape_name,
+            index=index,
+            digest=hashlib.sha1(etree.tostring(element)).hexdigest(),
+            style_digest=_style_digest(element),
+            geometry=_geometry(element),
+            text=_text(element)
+        )
+    return table
+
+
+def _deltas(field_names, before, after) -> dict:
+    return {
+        name: round(Emu(b - a).inches, 4)
+        for name, a, b in zip(field_names, before, after)
+        if a != b
+    }
+
+
+def diff_shapes(old_table: Dict[int, ShapeInfo], new_table: Dict[int, ShapeInfo]) -> dict:
+    """Added, removed and modified shapes between two shape tables of the same slide"""
+    added = [info.summary() for shape_id, info in new_table.items() if shape_id not in old_table]
+    removed = [info.summary() for shape_id, info in old_table.items() if shape_id not in new_table]
+
+    # Shapes whose stacking order changed, beyond what additions/removals explain
+    common = [shape_id for shape_id in new_table if shape_id in old_table]
+    old_rank = {shape_id: rank for rank, shape_id in enumerate(sorted(common, key=lambda sid: old_table[sid].index))}
+    stable = stable_order([old_rank[shape_id] for shape_id in common])
+    reordered = {shape_id for idx, shape_id in enumerate(common) if idx not in stable}
+
+    modified = []
+    for shape_id in common:
+        old = old_table[shape_id]
+        new = new_table[shape_id]
+        if old.digest == new.digest and shape_id not in reordered:
+            continue
+
+        change = {"shape_id": shape_id, "name": new.name, "changes": []}
+        if old.geometry != new.geometry:
+            if old.geometry is None or new.geometry is None:
+                change["changes"].append("moved")
+            else:
+                if old.geometry[:2] != new.geometry[:2]:
+                    change["changes"].append("moved")
+                if old.geometry[2:] != new.geometry[2:]:
+                    change["changes"].append("resized")
+                change["geometry_delta"] = _deltas(_GEOMETRY_FIELDS, old.geometry, new.geometry)
+            change["geometry"] = {"before": old.position(), "after": new.position()}
+        if old.text != new.text:
+            change["changes"].append("text_changed")
+            change["text"] = {"before": old.text, "after": new.text}
+        if old.style_digest != new.style_digest:
+            change["changes"].append("restyled")
+        if old.name != new.name:
+            change["changes"].append("renamed")
+            change["previous_name"] = old.name
+        if shape_id in reordered:
+            change["changes"].append("reordered")
+        modified.append(change)
+
+    return {"added": added, "removed": removed, "modified": modified}
+
+
+def structural_diff(history: RevisionHistory, old: Revision, new: Revision) -> dict:
+    """
+    Shape-level changes between two revisions: slides added, removed or moved,
+    and for every changed slide its added, removed and modified shapes.
+    """
+    slide_diff = history.diff(old, new)
+    old_digests = old.digests()
+    new_digests = new.digests()
+
+    slides = []
+    counts = {"added": 0, "removed": 0, "modified": 0}
+    for entry in slide_diff["changed"]:
+        slide_id = entry["slide_id"]
+        shapes = diff_shapes(
+            history.derived(old_digests[slide_id], shape_table),
+            history.derived(new_digests[slide_id], shape_table)
+        )
+        for key in counts:
+            counts[key] += len(shapes[key])
+        slides.append({"slide_id": slide_id, "slide_number": entry["slide_number"], **shapes})
+
+    return {
+        "from_revision": old.number,
+        "to_revision": new.number,
+        "slides_added": slide_diff["added"],
+        "slides_removed": slide_diff["removed"],
+        "slides_moved": slide_diff["moved"],
+        "slides_changed": slides,
+        "shapes_added": counts["added"],
+        "shapes_removed": counts["removed"],
+        "shapes_modified": counts["modified"]
+    }
@@ -0,0 +1,281 @@
+"""
+Deck generation from a structured outline.
+These are helper functions used by the generation API but not exposed as APIs themselves.
+
+Small outlines are rendered straight into the session's deck. Larger ones are
+split into chunks rendered in worker processes: each worker opens the deck's
+skeleton (its masters and layouts without slides, see app.packaging.merge),
+builds its chunk's slides with the current theme and the component library,
+and sends them back as parts, which are then appended to the deck in outline
+order. Building slides is pure CPU work, so this scales with cores.
+"""
+import io
+import json
+import logging
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from pptx import Presentation
+from pptx.util import Inches
+
+from ..components.registry import COMPONENTS, render_component
+from ..config import GENERATION_CHUNK_SLIDES, GENERATION_WORKERS
+from ..packaging.merge import MergeError, SlideImporter, export_slides, package_skeleton
+from ..themes.registry import definition_from_theme, theme_from_definition
+from ..themes.theme import Theme
+from .text_formatting import apply_markdown_to_text_frame, configure_textbox_frame
+
+logger = logging.getLogger(__name__)
+
+# Slide type -> default layout index (in the default template: title slide,
+# title and content, title only, blank)
+SLIDE_TYPES = {
+    "title": 0,
+    "section": 6,
+    "bullets": 1,
+    "table": 5,
+    "components": 6
+}
+
+
+class GenerationError(Exception):
+    """Raised when a slide of the outline fails to render"""
+
+
+def validate_outline(slides, layout_count: int):
+    """
+    Check and normalize outline slides. Returns (slides, None), or (None, error)
+    when any slide is malformed, so a bad request changes nothing.
+
+    Slide format:
+    {"type": "title", "title": "Q3 Review", "subtitle": "Board meeting"}
+    {"type": "section", "title": "Results"}
+    {"type": "bullets", "title": "Highlights", "points": ["Revenue up 12%", "..."]}
+    {"type": "table", "title": "By region", "data": [["Region", "Revenue"], ["EMEA", "4.1"]]}
+        (or "data": {"Region": ["EMEA"], "Revenue": ["4.1"]}; long tables continue on further slides)
+    {"type": "components", "components": [{"component_type": "timeline", "content": {...}}]}
+
+    Every slide can also take "layout" (index into the deck's slide layouts)
+    and "components", rendered after the slide's own content.
+    """
+    if not isinstance(slides, list) or len(slides) == 0:
+        return None, "slides must be a non-empty array"
+
+    normalized = []
+    for idx, slide in enumerate(slides):
+        if not isinstance(slide, dict):
+            return None, f"Slide {idx} must be an object"
+        slide_type = slide.get("type")
+        if slide_type not in SLIDE_TYPES:
+            return None, f"Slide {idx}: invalid type '{slide_type}'. Valid types: {list(SLIDE_TYPES)}"
+
+        layout = slide.get("layout", SLIDE_TYPES[slide_type])
+        if not isinstance(layout, int) or not 0 <= layout < layout_count:
+            return None, f"Slide {idx}: invalid layout. Valid range is 0-{layout_count - 1}"
+
+        for field in ("title", "subtitle"):
+            if field in slide and not isinstance(slide[field], str):
+                return None, f"Slide {idx}: {field} must be a string"
+        if slide_type == "bullets":
+            points = slide.get("points")
+            if not isinstance(points, list) or not all(isinstance(point, str) for point in points):
+                return None, f"Slide {idx}: points must be an array of strings"
+        if slide_type == "table":
+            data = slide.get("data")
+            rows = isinstance(data, list) and all(isinstance(row, list) for row in data)
+            columns = isinstance(data, dict) and all(isinstance(column, list) for column in data.values())
+            if not data or not (rows or columns):
+                return None, f"Slide {idx}: data must be a non-empty array of rows, or an object of column -> values"
+
+        components = slide.get("components") or []
+        if not isinstance(components, list):
+            return None, f"Slide {idx}: components must be an array"
+        for component in components:
+            if not isinstance(component, dict) or component.get("component_type") not in COMPONENTS:
+                return None, f"Slide {idx}: each component needs a component_type, one of {list(COMPONENTS)}"
+            if not isinstance(component.get("content", {}), dict):
+                return None, f"Slide {idx}: component content must be an object"
+
+        normalized.append({**slide, "layout": layout, "components": components})
+    return normalized, None
+
+
+def _fill_text(slide, placeholder, text: str, style_name: str, theme: Theme, fallback_box) -> None:
+    """Put text in a placeholder, or in a text box at fallback_box (inches) if the layout has none"""
+    if placeholder is None:
+        placeholder = slide.shapes.add_textbox(*(Inches(value) for value in fallback_box))
+    configure_textbox_frame(placeholder.text_frame)
+    apply_markdown_to_text_frame(placeholder.text_frame, text)
+    style = theme.get_style(style_name)
+    if style:
+        style.apply_to_text_frame(placeholder.text_frame)
+
+
+def _subtitle_placeholder(slide):
+    for shape in slide.placeholders:
+        if shape.placeholder_format.idx == 1:
+            return shape
+    return None
+
+
+def build_slide(prs, spec: Dict[str, Any], theme: Theme) -> list:
+    """
+    Append one validated outline slide to prs. Returns it, followed by any
+    slides its long tables continue on.
+    """
+    slide = prs.slides.add_slide(prs.slide_layouts[spec["layout"]])
+    theme.apply_to_slide(slide)
+    slide_type = spec["type"]
+
+    def new_slide():
+        # Slides are built one after another, so the end of the deck is right after this one
+        continuation = prs.slides.add_slide(slide.slide_layout)
+        theme.apply_to_slide(continuation)
+        return continuation
+
+    continuations = []
+    if slide_type == "title":
+        _fill_text(slide, slide.shapes.title, spec.get("title", ""), "title", theme, (1, 2.5, 8, 1.5))
+        if spec.get("subtitle"):
+            _fill_text(slide, _subtitle_placeholder(slide), spec["subtitle"], "subtitle", theme, (1, 4, 8, 1))
+    elif slide_type == "section":
+        render_component(slide, "section_divider", {"title": spec.get("title", "Section")}, theme)
+    elif slide_type == "bullets":
+        render_component(slide, "bullet_with_title", {"title": spec.get("title", ""), "points": spec["points"]}, theme)
+    elif slide_type == "table":
+        if spec.get("title"):
+            _fill_text(slide, slide.shapes.title, spec["title"], "title", theme, (1, 0.5, 8, 1))
+        continuations += render_component(slide, "comparison_table", {"data": spec["data"]}, theme, new_slide=new_slide)
+
+    for component in spec["components"]:
+        continuations += render_component(
+            slide, component["component_type"], component.get("content", {}), theme, new_slide=new_slide
+        )
+    return [slide] + continuations
+
+
+def _build_slides(prs, specs: List[Dict[str, Any]], theme: Theme, first_index: int) -> list:
+    slides = []
+    for offset, spec in enumerate(specs):
+        try:
+            slides.extend(build_slide(prs, spec, theme))
+        except Exception as e:
+            raise GenerationError(f"Slide {first_index + offset} failed to render: {e}")
+    return slides
+
+
+# --- worker processes ---
+
+_worker_themes: Dict[str, Theme] = {}
+
+
+def render_outline_chunk(skeleton: bytes, theme_definition: dict, specs: List[Dict[str, Any]], first_index: int) -> dict:
+    """Worker process entry point: build specs on the skeleton deck and export the slides as parts"""
+    cache_key = json.dumps(theme_definition, sort_keys=True)
+    theme = _worker_themes.get(cache_key)
+    if theme is None:
+        theme = _worker_themes[cache_key] = theme_from_definition("outline", theme_definition)
+    prs = Presentation(io.BytesIO(skeleton))
+    return export_slides(prs, _build_slides(prs, specs, theme, first_index))
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned rather than forked: the server has threads (and their locks) a fork would copy mid-use
+            _pool = ProcessPoolExecutor(max_workers=GENERATION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def _remove_slides(prs, slides) -> None:
+    """Take slides appended by a failed generation back out of the deck"""
+    sldIdLst = prs.slides._sldIdLst
+    by_rId = {sldId.rId: sldId for sldId in sldIdLst}
+    for slide in slides:
+        for rel in list(prs.part.rels):
+            if not rel.is_external and rel.target_part is slide.part:
+                sldIdLst.remove(by_rId[rel.rId])
+                prs.part.drop_rel(rel.rId)
+                break
+
+
+def generate_slides(session, specs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Append validated outline slides to the session's deck, in parallel for
+    large outlines. Either every slide is added or, if one fails to render,
+    none is. slide_ids includes the continuation slides of long tables, so it
+    can be longer than the outline. Must be called holding the session's
+    write lock.
+
+    This is a utility function, not an API endpoint.
+    """
+    prs = session.prs
+    theme = session.current_theme
+    chunk_size = max(GENERATION_CHUNK_SLIDES, 1)
+    workers = 0
+
+    if GENERATION_WORKERS > 1 and len(specs) > chunk_size:
+        # At least two chunks per worker, so one slow chunk does not hold up the rest
+        chunk_size = max(chunk_size, math.ceil(len(specs) / (GENERATION_WORKERS * 2)))
+        skeleton = package_skeleton(prs)
+        definition = definition_from_theme(theme)
+        pool = _get_pool()
+        try:
+            futures = [
+                pool.submit(render_outline_chunk, skeleton, definition, specs[start:start + chunk_size], start)
+                for start in range(0, len(specs), chunk_size)
+            ]
+            exported = [future.result() for future in futures]
+        except BrokenProcessPool:
+            logger.exception("Deck generation worker died, rendering in the request thread")
+            _discard_pool(pool)
+        else:
+            workers = min(GENERATION_WORKERS, len(futures))
+            start_count = len(prs.slides._sldIdLst)
+            importer = SlideImporter(prs)
+            slides = []
+            try:
+                for chunk in exported:
+                    slides.extend(importer.add(chunk))
+            except MergeError:
+                added = list(prs.slides)[start_count:]
+                _remove_slides(prs, added)
+                raise
+
+    if workers == 0:
+        chunk_size = len(specs)
+        start_count = len(prs.slides._sldIdLst)
+        try:
+            slides = _build_slides(prs, specs, theme, 0)
+        except GenerationError:
+            added = list(prs.slides)[start_count:]
+            _remove_slides(prs, added)
+            raise
+
+    slide_ids = []
+    for slide in slides:
+        slide_id = session.new_slide_id()
+        session.slide_map.append(slide_id, slide)
+        slide_ids.append(slide_id)
+    return {
+        "slide_ids": slide_ids,
+        "workers": workers,
+        "chunks": math.ceil(len(specs) / chunk_size)
+    }
@@ -0,0 +1,179 @@
+"""
+Deck-wide geometry analysis for detecting misaligned shapes.
+These are helper functions used by the geometry APIs but not exposed as APIs themselves.
+
+For every requested role the geometry of that shape on each slide is gathered
+into an (n_slides, n_fields) EMU array. Each field's values are sorted and
+split into clusters wherever neighbours are more than the tolerance apart, so
+near-identical boxes always group together; the most common combination of
+field clusters is taken as the house position and its median is the
+canonical geometry. Slides deviating from it by more than the tolerance on any
+field are reported as outliers, together with the slide that best matches the
+canonical box so it can be used as a reference for the align_* helpers.
+"""
+import numpy as np
+from pptx.util import Emu, Inches
+
+from ..state.slide_index import SlideIndex
+from .shape_alignment import ALIGN_FIELDS, NAME_SELECTOR_PREFIX, ROLE_SELECTORS, resolve_role
+
+DEFAULT_TOLERANCE_INCHES = 0.05
+
+
+def collect_geometry(slide_map: SlideIndex, role: str, fields: list, slide_numbers: list):
+    """
+    Gather one role's geometry across slides.
+    Returns (slide_numbers, shapes, geometry) where geometry is an int64 array
+    of shape (len(shapes), len(fields)) in EMU. Slides without the role, or whose
+    shape has no resolvable position, are left out.
+    """
+    numbers = []
+    shapes = []
+    rows = []
+    for slide_num in slide_numbers:
+        roles = slide_map.roles_at(slide_num)
+        if roles is None:
+            continue
+        shape = resolve_role(roles, role)
+        if shape is None:
+            continue
+        row = [getattr(shape, field) for field in fields]
+        if any(value is None for value in row):
+            continue
+        numbers.append(slide_num)
+        shapes.append(shape)
+        rows.append(row)
+
+    geometry = np.array(rows, dtype=np.int64).reshape(len(rows), len(fields))
+    return numbers, shapes, geometry
+
+
+def cluster_labels(values: np.ndarray, tolerance: int) -> np.ndarray:
+    """
+    Cluster index of each value of a 1-D array: sorted values stay in one
+    cluster until the gap to the next one is larger than tolerance
+    """
+    order = np.argsort(values, kind="stable")
+    sorted_labels = np.concatenate(([0], np.cumsum(np.diff(values[order]) > tolerance)))
+    labels = np.empty_like(sorted_labels)
+    labels[order] = sorted_labels
+    return labels
+
+
+def canonical_geometry(geometry: np.ndarray, tolerance: int):
+    """
+    Canonical box of a (n, n_fields) EMU array: the median of the most common
+    box, boxes being the same when each field falls in the same gap-separated
+    cluster, or the per-field median when no two boxes agree.
+    Returns (canonical, cluster_size).
+    """
+    labels = np.column_stack([cluster_labels(geometry[:, col], tolerance) for col in range(geometry.shape[1])])
+    _, inverse, counts = np.unique(labels, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    best = counts.argmax()
+    if counts[best] > 1:
+        members = geometry[inverse == best]
+    else:
+        members = geometry
+    canonical = np.rint(np.median(members, axis=0)).astype(np.int64)
+    return canonical, int(counts[best])
+
+
+def _position(fields: list, values) -> dict:
+    return {field: Emu(int(value)).inches for field, value in zip(fields, values)}
+
+
+def analyze_role(slide_map: SlideIndex, role: str, fields: list, slide_numbers: list, tolerance: int):
+    """Outlier report for one role, plus the fix: (report, {field: EMU}, [outlier shapes])"""
+    numbers, shapes, geometry = collect_geometry(slide_map, role, fields, slide_numbers)
+    if len(numbers) == 0:
+        return {"role": role, "count": 0, "error": f"No '{role}' shape found on the analyzed slides"}, {}, []
+
+    canonical, cluster_size = canonical_geometry(geometry, tolerance)
+    deviation = geometry - canonical
+    distance = np.abs(deviation)
+    is_outlier = (distance > tolerance).any(axis=1)
+    reference = int(distance.sum(axis=1).argmin())
+
+    outliers = []
+    to_fix = []
+    for idx in np.flatnonzero(is_outlier):
+        outliers.append({
+            "slide_number": numbers[idx],
+            "position": _position(fields, geometry[idx]),
+            "deviation": _position(fields, deviation[idx])
+        })
+        to_fix.append(shapes[idx])
+
+    report = {
+        "role": role,
+        "count": len(numbers),
+        "consistent": len(numbers) - len(outliers),
+        "cluster_size": cluster_size,
+        "canonical_position": _position(fields, canonical),
+        "reference_slide_number": numbers[reference] if not is_outlier[reference] else None,
+        "outliers": outliers
+    }
+    return report, {field: Emu(int(value)) for field, value in zip(fields, canonical)}, to_fix
+
+
+def analyze_deck_geometry(slide_map: SlideIndex, request: dict, apply: bool = False):
+    """
+    Find shapes that are off the deck's canonical position for their role, and
+    optionally move them onto it.
+
+    Expected request format:
+    {
+        "roles": ["title", "footnote"],   # optional, defaults to every role selector
+        "fields": ["left", "top"],        # optional, defaults to all four
+        "tolerance": 0.05,                # optional, inches
+        "slide_numbers": [1, 2, 3]        # optional, defaults to every slide
+    }
+
+    This is a utility function, not an API endpoint.
+    """
+    roles = request.get("roles") or list(ROLE_SELECTORS)
+    fields = request.get("fields") or list(ALIGN_FIELDS)
+    tolerance_inches = request.get("tolerance", DEFAULT_TOLERANCE_INCHES)
+    slide_numbers = request.get("slide_numbers") or list(range(1, len(slide_map) + 1))
+
+    if not isinstance(roles, list) or any(not isinstance(role, str) for role in roles):
+        return {"error": "roles must be an array of role selectors"}
+    for role in roles:
+        if role not in ROLE_SELECTORS and not role.startswith(NAME_SELECTOR_PREFIX):
+            return {"error": f"Invalid role '{role}'. Valid roles: {list(ROLE_SELECTORS)} or '{NAME_SELECTOR_PREFIX}<shape name>'"}
+    if not isinstance(fields, list) or any(field not in ALIGN_FIELDS for field in fields):
+        return {"error": f"Invalid fields {fields}. Valid fields: {list(ALIGN_FIELDS)}"}
+    if not isinstance(tolerance_inches, (int, float)) or tolerance_inches < 0:
+        return {"error": "tolerance must be a non-negative number of inches"}
+    if not isinstance(slide_numbers, list):
+        return {"error": "slide_numbers must be an array"}
+
+    fields = list(dict.fromkeys(fields))
+    tolerance = int(Inches(tolerance_inches))
+
+    reports = []
+    fixes = []
+    for role in dict.fromkeys(roles):
+        report, canonical, to_fix = analyze_role(slide_map, role, fields, slide_numbers, tolerance)
+        reports.append(report)
+        if to_fix:
+            fixes.append((canonical, to_fix))
+
+    fixed = 0
+    if apply:
+        # All analysis is done before any shape moves, so roles never see each other's fixes
+        for position, to_fix in fixes:
+            for shape in to_fix:
+                for field, value in position.items():
+                    setattr(shape, field, value)
+                fixed += 1
+
+    return {
+        "slides_analyzed": len(slide_numbers),
+        "tolerance": tolerance_inches,
+        "fields": fields,
+        "applied": apply,
+        "shapes_fixed": fixed,
+        "roles": reports
+    }
@@ -3,268 +3,206 @@ Utility functions for shape alignment operations.
 These are helper functions used by the alignment APIs but not exposed as APIs themselves.
 """
 from pptx.util import Inches
-from pptx.enum.shapes import MSO_SHAPE_TYPE
-from pptx.enum.shapes import PP_PLACEHOLDER
-from typing import Dict, Any
+from ..state.slide_index import SlideIndex
 
 
-def _find_subtitle(shapes):
-    """
-    Find a subtitle shape using BOTH:
-    - Official python-pptx placeholder type (PP_PLACEHOLDER.SUBTITLE)
-    - User-defined working logic: placeholder_format.type == 2
-    """
-    for shape in shapes:
-        if shape.shape_type == MSO_SHAPE_TYPE.PLACEHOLDER:
-            if hasattr(shape, "placeholder_format"):
-                ph_type = shape.placeholder_format.type
+# Geometry fields an alignment job can copy
+ALIGN_FIELDS = ("left", "top", "width", "height")
 
-                # Official subtitle placeholder
-                if ph_type == PP_PLACEHOLDER.SUBTITLE:
-                    return shape
+# Role selectors; any shape can also be selected by name with "name:<shape name>"
+ROLE_SELECTORS = ("title", "subtitle", "footnote", "body", "picture", "table", "chart")
+NAME_SELECTOR_PREFIX = "name:"
 
-                # User custom logic (your working system)
-                # type == 2 means Subtitle/Body for your template
-                if ph_type == 2:
-                    return shape
-    return None
+# Error for a reference slide missing the role, for the legacy three roles
+_MISSING_REFERENCE_ERRORS = {
+    "title": "Reference slide {num} does not have a title shape",
+    "subtitle": "Reference slide {num} does not contain a subtitle placeholder",
+    "footnote": "Reference slide {num} does not have a footnote (text box in bottom 15% of slide)"
+}
 
 
-def align_titles_to_reference(slide_map: Dict[str, Any], reference_slide_num: int, target_slide_numbers: list):
-    """
-    Align title positions of multiple slides to match a reference slide.
-    
-    This is a utility function, not an API endpoint.
-    """
-    # Get slide_ids_by_index
-    slide_ids_by_index = list(slide_map.keys())
-    total_slides = len(slide_ids_by_index)
-    
-    # Validate reference slide number
-    ref_index = reference_slide_num - 1
-    if ref_index < 0 or ref_index >= total_slides:
-        return {
-            "error": f"Invalid reference slide number. Valid range is 1-{total_slides}"
-        }
-    
-    # Step 1: Get reference slide coordinates
-    ref_slide_id = slide_ids_by_index[ref_index]
-    ref_coordinates_response = get_title_coordinates(slide_map, ref_slide_id)
-    
-    # Check if reference slide has a title
-    if "error" in ref_coordinates_response or not ref_coordinates_response.get("has_title"):
-        return {
-            "error": f"Reference slide {reference_slide_num} does not have a title shape",
-            "details": ref_coordinates_response
-        }
-    
-    # Extract position from reference
-    reference_position = ref_coordinates_response["coordinates"]
-    
-    # Step 2: Apply position to target slides
-    bulk_request = {
-        "slide_numbers": target_slide_numbers,
-        "position": reference_position
-    }
-    
-    bulk_response = set_bulk_title_positions(slide_map, bulk_request)
-    
-    return {"data": "Success"}
+def resolve_role(roles, selector: str):
+    """Shape matching a role selector in a slide's SlideRoles, or None"""
+    if selector.startswith(NAME_SELECTOR_PREFIX):
+        return roles.by_name.get(selector[len(NAME_SELECTOR_PREFIX):])
+    if selector in ("title", "subtitle", "footnote"):
+        return getattr(roles, selector)
+    shapes = {
+        "body": roles.body,
+        "picture": roles.pictures,
+        "table": roles.tables,
+        "chart": roles.charts
+    }[selector]
+    return shapes[0] if shapes else None
 
 
-def align_subtitles_to_reference(slide_map: Dict[str, Any], reference_slide_num: int, target_slide_numbers: list):
+def validate_align_jobs(jobs, total_slides: int):
     """
-    Align subtitle positions of multiple slides to match a reference slide.
-    
-    This is a utility function, not an API endpoint.
+    Check and normalize alignment jobs. Returns (jobs, None), or (None, error)
+    when any job is malformed, so a bad request changes nothing.
+
+    Job format:
+    {
+        "role": "title",                  # or subtitle/footnote/body/picture/table/chart/"name:<shape name>"
+        "fields": ["left", "top"],        # optional, defaults to all four
+        "reference_slide_number": 2,
+        "target_slide_numbers": [1, 3]    # optional, defaults to every other slide
+    }
     """
-    # Slide index handling
-    slide_ids_by_index = list(slide_map.keys())
-    total_slides = len(slide_ids_by_index)
+    if not isinstance(jobs, list) or len(jobs) == 0:
+        return None, "jobs must be a non-empty array"
 
-    ref_index = reference_slide_num - 1
-    if ref_index < 0 or ref_index >= total_slides:
-        return {
-            "error": f"Invalid reference slide number. Valid range is 1-{total_slides}"
-        }
+    normalized = []
+    for idx, job in enumerate(jobs):
+        if not isinstance(job, dict):
+            return None, f"Job {idx} must be an object"
+        if "role" not in job or "reference_slide_number" not in job:
+            return None, f"Job {idx} is missing required fields: 'role' or 'reference_slide_number'"
 
-    # Get the reference slide object
-    ref_slide = slide_map[slide_ids_by_index[ref_index]]
+        role = job["role"]
+        if not isinstance(role, str) or not (role in ROLE_SELECTORS or role.startswith(NAME_SELECTOR_PREFIX)):
+            return None, f"Job {idx}: invalid role '{role}'. Valid roles: {list(ROLE_SELECTORS)} or '{NAME_SELECTOR_PREFIX}<shape name>'"
 
-    # Find reference subtitle
-    ref_subtitle_shape = _find_subtitle(ref_slide.shapes)
+        fields = job.get("fields") or list(ALIGN_FIELDS)
+        if not isinstance(fields, list) or any(field not in ALIGN_FIELDS for field in fields):
+            return None, f"Job {idx}: invalid fields {fields}. Valid fields: {list(ALIGN_FIELDS)}"
 
-    if ref_subtitle_shape is None:
-        return {
-            "error": f"Reference slide {reference_slide_num} does not contain a subtitle placeholder"
-        }
+        reference = job["reference_slide_number"]
+        if not isinstance(reference, int) or reference < 1 or reference > total_slides:
+            return None, f"Job {idx}: invalid reference slide number. Valid range is 1-{total_slides}"
+
+        targets = job.get("target_slide_numbers")
+        if targets is None:
+            targets = [num for num in range(1, total_slides + 1) if num != reference]
+        elif not isinstance(targets, list):
+            return None, f"Job {idx}: target_slide_numbers must be an array"
+
+        normalized.append({
+            "role": role,
+            "fields": list(dict.fromkeys(fields)),
+            "reference_slide_number": reference,
+            "target_slide_numbers": targets
+        })
+    return normalized, None
 
-    # Extract reference subtitle geometry
-    reference_position = {
-        "left": ref_subtitle_shape.left.inches,
-        "top": ref_subtitle_shape.top.inches,
-        "width": ref_subtitle_shape.width.inches,
-        "height": ref_subtitle_shape.height.inches
-    }
 
-    # Apply to targets
+def run_align_jobs(slide_map: SlideIndex, jobs: list):
+    """
+    Run validated alignment jobs against the deck.
+
+    Every reference shape and target shape is resolved first, from the cached
+    per-slide role index, and only then are the geometry writes applied. All
+    jobs therefore see the deck as it was before the request, even when one
+    job's target is another job's reference.
+
+    This is a utility function, not an API endpoint.
+    """
+    total_slides = len(slide_map)
     results = []
+    writes = []
 
-    for slide_num in target_slide_numbers:
-        slide_index = slide_num - 1
+    # Pass 1: resolve shapes and reference geometry
+    for job in jobs:
+        role = job["role"]
+        fields = job["fields"]
+        reference = job["reference_slide_number"]
+        result = {"role": role, "reference_slide": reference, "fields": fields}
+        results.append(result)
 
-        if slide_index < 0 or slide_index >= total_slides:
-            results.append({
-                "slide_number": slide_num,
-                "success": False,
-                "error": f"Invalid slide number. Valid range is 1-{total_slides}"
-            })
+        ref_shape = resolve_role(slide_map.roles_at(reference), role)
+        if ref_shape is None:
+            message = _MISSING_REFERENCE_ERRORS.get(role, "Reference slide {num} has no '{role}' shape")
+            result["error"] = message.format(num=reference, role=role)
             continue
 
-        slide = slide_map[slide_ids_by_index[slide_index]]
+        geometry = {field: getattr(ref_shape, field) for field in fields}
+        if any(value is None for value in geometry.values()):
+            result["error"] = f"Reference '{role}' shape on slide {reference} has no explicit position"
+            continue
 
-        subtitle_shape = _find_subtitle(slide.shapes)
+        aligned = []
+        skipped = []
+        for slide_num in job["target_slide_numbers"]:
+            roles = slide_map.roles_at(slide_num)
+            if roles is None:
+                skipped.append({
+                    "slide_number": slide_num,
+                    "error": f"Invalid slide number. Valid range is 1-{total_slides}"
+                })
+                continue
+            shape = resolve_role(roles, role)
+            if shape is None:
+                skipped.append({"slide_number": slide_num, "error": f"No '{role}' shape found on this slide"})
+                continue
+            writes.append((shape, geometry))
+            aligned.append(slide_num)
 
-        if subtitle_shape is None:
-            results.append({
-                "slide_number": slide_num,
-                "success": False,
-                "error": "No subtitle placeholder found on this slide"
-            })
-            continue
+        result["position"] = {field: value.inches for field, value in geometry.items()}
+        result["aligned_slides"] = aligned
+        result["skipped"] = skipped
 
-        try:
-            subtitle_shape.left = Inches(reference_position["left"])
-            subtitle_shape.top = Inches(reference_position["top"])
-            subtitle_shape.width = Inches(reference_position["width"])
-            subtitle_shape.height = Inches(reference_position["height"])
+    # Pass 2: apply all geometry writes
+    for shape, geometry in writes:
+        for field, value in geometry.items():
+            setattr(shape, field, value)
 
-            results.append({
-                "slide_number": slide_num,
-                "success": True,
-                "applied_position": reference_position
-            })
+    return {
+        "jobs": len(jobs),
+        "shapes_aligned": len(writes),
+        "results": results
+    }
 
-        except Exception as e:
-            results.append({
-                "slide_number": slide_num,
-                "success": False,
-                "error": str(e)
-            })
 
+def _align_role_to_reference(slide_map: SlideIndex, role: str, reference_slide_num: int, target_slide_numbers: list):
+    """Copy the full geometry of one role from a reference slide to target slides"""
+    total_slides = len(slide_map)
+    if slide_map.id_at(reference_slide_num) is None:
+        return {
+            "error": f"Invalid reference slide number. Valid range is 1-{total_slides}"
+        }
+
+    job = {
+        "role": role,
+        "fields": list(ALIGN_FIELDS),
+        "reference_slide_number": reference_slide_num,
+        "target_slide_numbers": target_slide_numbers
+    }
+    result = run_align_jobs(slide_map, [job])["results"][0]
+    if "error" in result:
+        return {"error": result["error"]}
     return {"data": "Success"}
 
 
-def align_footnotes_to_reference(slide_map: Dict[str, Any], reference_slide_num: int, target_slide_numbers: list):
+def align_titles_to_reference(slide_map: SlideIndex, reference_slide_num: int, target_slide_numbers: list):
     """
-    Align footnote positions of multiple slides to match a reference slide.
-    
-    Footnotes are detected as text boxes in the bottom 15% of the slide (top > slide_height * 0.85)
+    Align title positions of multiple slides to match a reference slide.
     
     This is a utility function, not an API endpoint.
     """
-    # Get slide_ids_by_index
-    slide_ids_by_index = list(slide_map.keys())
-    total_slides = len(slide_ids_by_index)
-    
-    # Validate reference slide number
-    ref_index = reference_slide_num - 1
-    if ref_index < 0 or ref_index >= total_slides:
-        return {
-            "error": f"Invalid reference slide number. Valid range is 1-{total_slides}"
-        }
-    
-    # Get reference slide
-    ref_slide_id = slide_ids_by_index[ref_index]
-    ref_slide = slide_map[ref_slide_id]
-    
-    # Standard slide dimensions in EMUs (PowerPoint uses 914400 EMUs per inch)
-    # Standard slide is 10 inches wide x 7.5 inches tall
-    slide_height = Inches(7.5)
-    footnote_threshold = slide_height * 0.85
-    
-    # Find footnote in reference slide (text box in bottom 15% of slide)
-    ref_footnote_shape = None
-    
-    for shape in ref_slide.shapes:
-        if shape.shape_type == MSO_SHAPE_TYPE.TEXT_BOX or (
-            shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE and shape.has_text_frame
-        ):
-            # Check if it's in the bottom 15% of the slide
-            if shape.top > footnote_threshold:
-                ref_footnote_shape = shape
-                break  # Take the first footnote found
-    
-    if ref_footnote_shape is None:
-        return {
-            "error": f"Reference slide {reference_slide_num} does not have a footnote (text box in bottom 15% of slide)"
-        }
-    
-    # Get reference position
-    reference_position = {
-        "left": ref_footnote_shape.left.inches,
-        "top": ref_footnote_shape.top.inches,
-        "width": ref_footnote_shape.width.inches,
-        "height": ref_footnote_shape.height.inches
-    }
+    return _align_role_to_reference(slide_map, "title", reference_slide_num, target_slide_numbers)
+
+
+def align_subtitles_to_reference(slide_map: SlideIndex, reference_slide_num: int, target_slide_numbers: list):
+    """
+    Align subtitle positions of multiple slides to match a reference slide.
     
-    # Apply to target slides
-    results = []
+    This is a utility function, not an API endpoint.
+    """
+    return _align_role_to_reference(slide_map, "subtitle", reference_slide_num, target_slide_numbers)
+
+
+def align_footnotes_to_reference(slide_map: SlideIndex, reference_slide_num: int, target_slide_numbers: list):
+    """
+    Align footnote positions of multiple slides to match a reference slide.
     
-    for slide_num in target_slide_numbers:
-        slide_index = slide_num - 1
-        
-        if slide_index < 0 or slide_index >= total_slides:
-            results.append({
-                "slide_number": slide_num,
-                "success": False,
-                "error": f"Invalid slide number. Valid range is 1-{total_slides}"
-            })
-            continue
-        
-        slide_id = slide_ids_by_index[slide_index]
-        slide = slide_map[slide_id]
-        
-        # Find footnote shape (text box in bottom 15%)
-        footnote_shape = None
-        for shape in slide.shapes:
-            if shape.shape_type == MSO_SHAPE_TYPE.TEXT_BOX or (
-                shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE and shape.has_text_frame
-            ):
-                if shape.top > footnote_threshold:
-                    footnote_shape = shape
-                    break
-        
-        if footnote_shape is None:
-            results.append({
-                "slide_number": slide_num,
-                "success": False,
-                "error": "No footnote shape found in this slide (no text box in bottom 15%)"
-            })
-            continue
-        
-        try:
-            footnote_shape.left = Inches(reference_position["left"])
-            footnote_shape.top = Inches(reference_position["top"])
-            footnote_shape.width = Inches(reference_position["width"])
-            footnote_shape.height = Inches(reference_position["height"])
-            
-            results.append({
-                "slide_number": slide_num,
-                "success": True,
-                "applied_position": reference_position
-            })
-        except Exception as e:
-            results.append({
-                "slide_number": slide_num,
-                "success": False,
-                "error": str(e)
-            })
+    Footnotes are detected as text boxes in the bottom 15% of the slide (top > slide_height * 0.85)
     
-    return {"data": "Success"}
+    This is a utility function, not an API endpoint.
+    """
+    return _align_role_to_reference(slide_map, "footnote", reference_slide_num, target_slide_numbers)
 
 
-def get_title_coordinates(slide_map: Dict[str, Any], slide_id: str):
+def get_title_coordinates(slide_map: SlideIndex, slide_id: str):
     """
     Get the position and dimensions of the title shape in a slide.
     
@@ -273,26 +211,8 @@ def get_title_coordinates(slide_map: Dict[str, Any], slide_id: str):
     if slide_id not in slide_map:
         return {"error": "slide not found"}
     
-    slide = slide_map[slide_id]
-    
-    # Try to find the title shape
-    title_shape = None
-    
-    # First check if slide has a title attribute
-    if hasattr(slide.shapes, "title"):
-        try:
-            title_shape = slide.shapes.title
-        except:
-            pass
-    
-    # If not found, look for placeholder with type 1 (title)
-    if title_shape is None:
-        for shape in slide.shapes:
-            if shape.shape_type == MSO_SHAPE_TYPE.PLACEHOLDER:
-                if hasattr(shape, "placeholder_format"):
-                    if shape.placeholder_format.type == 1:
-                        title_shape = shape
-                        break
+    # Title placeholder, or a title-type placeholder as fallback
+    title_shape = slide_map.roles(slide_id).title
     
     if title_shape is None:
         return {
@@ -314,7 +234,7 @@ def get_title_coordinates(slide_map: Dict[str, Any], slide_id: str):
     }
 
 
-def set_bulk_title_positions(slide_map: Dict[str, Any], request: dict):
+def set_bulk_title_positions(slide_map: SlideIndex, request: dict):
     """
     Set the same title position for multiple slides.
     
@@ -334,44 +254,24 @@ def set_bulk_title_positions(slide_map: Dict[str, Any], request: dict):
     slide_numbers = request["slide_numbers"]
     position = request["position"]
     
-    # Convert slide_map (UUID keys) to index-based lookup
-    slide_ids_by_index = list(slide_map.keys())  # Ordered list of UUIDs
-    
     results = []
     
     for slide_num in slide_numbers:
-        slide_index = slide_num - 1  # Convert 1-based to 0-based
+        # Get the actual UUID for this slide number
+        slide_id = slide_map.id_at(slide_num)
         
-        # Check if index is valid
-        if slide_index < 0 or slide_index >= len(slide_ids_by_index):
+        # Check if slide number is valid
+        if slide_id is None:
             results.append({
                 "slide_number": slide_num,
-                "slide_index": slide_index,
+                "slide_index": slide_num - 1,
                 "success": False,
-                "error": f"Invalid slide number. Valid range is 1-{len(slide_ids_by_index)}"
+                "error": f"Invalid slide number. Valid range is 1-{len(slide_map)}"
             })
             continue
         
-        # Get the actual UUID for this slide index
-        slide_id = slide_ids_by_index[slide_index]
-        slide = slide_map[slide_id]
-        
         # Find the title shape
-        title_shape = None
-        
-        if hasattr(slide.shapes, "title"):
-            try:
-                title_shape = slide.shapes.title
-            except:
-                pass
-        
-        if title_shape is None:
-            for shape in slide.shapes:
-                if shape.shape_type == MSO_SHAPE_TYPE.PLACEHOLDER:
-                    if hasattr(shape, "placeholder_format"):
-                        if shape.placeholder_format.type == 1:
-                            title_shape = shape
-                            break
+        title_shape = slide_map.roles(slide_id).title
         
         if title_shape is None:
             results.append({
@@ -0,0 +1,103 @@
+"""
+Utility for classifying the shapes of a slide into roles in a single pass.
+"""
+from typing import Dict, List
+
+from pptx.enum.shapes import MSO_SHAPE_TYPE, PP_PLACEHOLDER
+from pptx.util import Inches
+
+# Footnotes are text boxes whose top edge is in the bottom 15% of a standard
+# 7.5 inch tall slide
+SLIDE_HEIGHT = Inches(7.5)
+FOOTNOTE_THRESHOLD = SLIDE_HEIGHT * 0.85
+
+TITLE = "title"
+SUBTITLE = "subtitle"
+FOOTNOTE = "footnote"
+BODY = "body"
+PICTURE = "picture"
+TABLE = "table"
+CHART = "chart"
+
+_BODY_PLACEHOLDERS = (PP_PLACEHOLDER.BODY, PP_PLACEHOLDER.OBJECT)
+
+
+class SlideRoles:
+    """
+    Title, subtitle, footnote and body shapes of one slide, plus its pictures,
+    tables, charts and shapes by name, found with one walk over slide.shapes.
+    Shapes are kept (not their geometry) so positions are always read live.
+    """
+
+    __slots__ = (
+        "title", "subtitle", "footnote", "body",
+        "pictures", "tables", "charts", "by_name", "by_shape_id"
+    )
+
+    def __init__(self):
+        self.title = None
+        self.subtitle = None
+        self.footnote = None
+        self.body: List[object] = []
+        self.pictures: List[object] = []
+        self.tables: List[object] = []
+        self.charts: List[object] = []
+        # shape name -> first shape with that name
+        self.by_name: Dict[str, object] = {}
+        # shape_id -> first role assigned to that shape
+        self.by_shape_id: Dict[int, str] = {}
+
+    def _assign(self, role: str, shape) -> None:
+        self.by_shape_id.setdefault(shape.shape_id, role)
+
+    @classmethod
+    def build(cls, slide) -> "SlideRoles":
+        roles = cls()
+        title_by_type = None
+
+        for shape in slide.shapes:
+            shape_type = shape.shape_type
+            roles.by_name.setdefault(shape.name, shape)
+
+            if shape_type == MSO_SHAPE_TYPE.PLACEHOLDER:
+                ph = shape.placeholder_format
+                ph_type = ph.type
+
+                # slide.shapes.title is the first placeholder with idx 0
+                if roles.title is None and ph.idx == 0:
+                    roles.title = shape
+                    roles._assign(TITLE, shape)
+                elif title_by_type is None and ph_type == PP_PLACEHOLDER.TITLE:
+                    title_by_type = shape
+
+                # Official subtitle placeholder, or type == 2 (body) used as subtitle in our templates
+                if roles.subtitle is None and ph_type in (PP_PLACEHOLDER.SUBTITLE, PP_PLACEHOLDER.BODY):
+                    roles.subtitle = shape
+                    roles._assign(SUBTITLE, shape)
+
+                if ph_type in _BODY_PLACEHOLDERS:
+                    roles.body.append(shape)
+                    roles._assign(BODY, shape)
+
+            elif shape_type == MSO_SHAPE_TYPE.PICTURE:
+                roles.pictures.append(shape)
+                roles._assign(PICTURE, shape)
+            elif shape_type == MSO_SHAPE_TYPE.TABLE:
+                roles.tables.append(shape)
+                roles._assign(TABLE, shape)
+            elif shape_type == MSO_SHAPE_TYPE.CHART:
+                roles.charts.append(shape)
+                roles._assign(CHART, shape)
+            elif roles.footnote is None and (
+                shape_type == MSO_SHAPE_TYPE.TEXT_BOX or
+                (shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE and shape.has_text_frame)
+            ):
+                if shape.top is not None and shape.top > FOOTNOTE_THRESHOLD:
+                    roles.footnote = shape
+                    roles._assign(FOOTNOTE, shape)
+
+        # Fall back to a title-type placeholder when none has idx 0
+        if roles.title is None and title_by_type is not None:
+            roles.title = title_by_type
+            roles._assign(TITLE, title_by_type)
+        return roles
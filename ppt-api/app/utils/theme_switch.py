@@ -0,0 +1,147 @@
+"""
+Deck-wide theme switching.
+These are helper functions used by the theme APIs but not exposed as APIs themselves.
+
+The deck is walked once. Each text shape is classified in the same pass into
+one of the theme's styles and restyled by cloning the new theme's compiled
+run properties into it, and every slide gets the new compiled background.
+
+Classification:
+- title / center title placeholders -> title
+- subtitle placeholders -> subtitle
+- other content placeholders (body, object) -> bullet
+- any other text shape -> the style whose formatting the first paragraph
+  with text carries in the old theme (or any known theme), its first run's
+  properties overriding the paragraph's defaults
+Date, footer and slide number placeholders, and text shapes whose formatting
+matches no known style, are left alone.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+from pptx.oxml.ns import qn
+
+from ..state.slide_index import SlideIndex
+from ..themes.theme import Theme
+
+STYLE_NAMES = ("title", "subtitle", "heading", "body", "bullet")
+
+_TITLE_TYPES = {"title", "ctrTitle"}
+_SUBTITLE_TYPES = {"subTitle"}
+_CONTENT_TYPES = {"body", "obj"}
+
+_GRPSP = qn("p:grpSp")
+_DEFRPR = qn("a:defRPr")
+_RPR = qn("a:rPr")
+_R = qn("a:r")
+_T = qn("a:t")
+_SRGBCLR = qn("a:srgbClr")
+_LATIN = qn("a:latin")
+
+
+def _signature(defRPr) -> Optional[Tuple]:
+    """The formatting a compiled Style sets, read back from an a:defRPr or a:rPr"""
+    if defRPr is None:
+        return None
+    color = defRPr.find(f"{qn('a:solidFill')}/{_SRGBCLR}")
+    latin = defRPr.find(_LATIN)
+    return (
+        defRPr.get("sz"),
+        defRPr.get("b"),
+        defRPr.get("i"),
+        color.get("val") if color is not None else None,
+        latin.get("typeface") if latin is not None else None
+    )
+
+
+def _text_signature(p) -> Optional[Tuple]:
+    """The formatting of a paragraph's first run with text, or None if it has no text"""
+    for r in p.iterchildren(_R):
+        t = r.find(_T)
+        if t is None or not t.text:
+            continue
+        pPr = p.pPr
+        defaults = _signature(pPr.find(_DEFRPR) if pPr is not None else None) or (None,) * 5
+        run = _signature(r.find(_RPR)) or (None,) * 5
+        return tuple(value if value is not None else default for value, default in zip(run, defaults))
+    return None
+
+
+def style_signatures(themes: Iterable[Theme]) -> Dict[Tuple, str]:
+    """Formatting signature -> style name, earlier themes winning ties"""
+    signatures = {}
+    for theme in themes:
+        for name in STYLE_NAMES:
+            style = theme.get_style(name)
+            if style is not None:
+                signatures.setdefault(_signature(style.compiled()), name)
+    return signatures
+
+
+def classify_shape(sp, signatures: Dict[Tuple, str]) -> Optional[str]:
+    """Style name for a shape element, or None if it should keep its formatting"""
+    txBody = getattr(sp, "txBody", None)
+    if txBody is None:
+        return None
+    ph = sp.ph
+    if ph is not None:
+        ph_type = ph.get("type", "obj")
+        if ph_type in _TITLE_TYPES:
+            return "title"
+        if ph_type in _SUBTITLE_TYPES:
+            return "subtitle"
+        if ph_type in _CONTENT_TYPES:
+            return "bullet"
+        return None
+    for p in txBody.p_lst:
+        signature = _text_signature(p)
+        if signature is not None:
+            return signatures.get(signature)
+    return None
+
+
+def _text_shapes(spTree):
+    """Shape elements of a shape tree, descending into groups"""
+    for element in spTree.iter_shape_elms():
+        if element.tag == _GRPSP:
+            yield from _text_shapes(element)
+        else:
+            yield element
+
+
+def switch_theme(slide_map: SlideIndex, old_theme: Theme, new_theme: Theme, themes: Iterable[Theme],
+                 slide_numbers: Optional[list] = None, backgrounds: bool = True) -> dict:
+    """
+    Restyle slides (all by default) from old_theme to new_theme in one pass.
+    themes are the other known themes, used to recognise text styled with a
+    theme other than old_theme. Returns counts of restyled shapes per style.
+
+    This is a utility function, not an API endpoint.
+    """
+    signatures = style_signatures([old_theme, *themes])
+    # Compile once up front; the slide loop only clones
+    styles = {name: new_theme.get_style(name) for name in STYLE_NAMES}
+    for style in styles.values():
+        if style is not None:
+            style.compiled()
+
+    counts = {name: 0 for name in STYLE_NAMES}
+    if slide_numbers is None:
+        slides = slide_map.values()
+    else:
+        slides = [slide_map.slide_at(num) for num in slide_numbers]
+
+    for slide in slides:
+        if backgrounds:
+            new_theme.apply_background(slide)
+        for sp in _text_shapes(slide.shapes._spTree):
+            name = classify_shape(sp, signatures)
+            if name is None or styles[name] is None:
+                continue
+            styles[name].apply_to_txBody(sp.txBody)
+            counts[name] += 1
+
+    return {
+        "slides_restyled": len(slides),
+        "shapes_restyled": sum(counts.values()),
+        "by_style": counts
+    }
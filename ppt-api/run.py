@@ -1,4 +1,11 @@
+import os
+
 import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True) 
\ No newline at end of file
+    # More than one worker needs a shared state backend (PPT_STATE_BACKEND=disk or sqlite)
+    workers = int(os.environ.get("PPT_WORKERS", "1"))
+    if workers > 1:
+        uvicorn.run("app.main:app", host="127.0.0.1", port=8000, workers=workers)
+    else:
+        uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
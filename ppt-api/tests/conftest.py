@@ -0,0 +1,35 @@
+"""
+Test setup: the app's state directories point at a scratch directory, set
+before app.config is imported.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_SCRATCH = tempfile.mkdtemp(prefix="ppt-api-tests-")
+for _name, _subdir in (
+    ("PPT_JOURNAL_DIR", "journal"),
+    ("PPT_THEMES_DIR", "themes"),
+    ("PPT_SESSION_SPILL_DIR", "spill"),
+    ("PPT_STATE_BACKEND_PATH", "shared")
+):
+    os.environ[_name] = os.path.join(_SCRATCH, _subdir)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def headers():
+    """Headers selecting a session of the test's own"""
+    return {"X-Session-Id": f"test-{uuid.uuid4().hex}"}
@@ -0,0 +1,47 @@
+def _history(client, headers) -> dict:
+    return client.get("/api/v2/history", headers=headers).json()
+
+
+def _slides(client, headers) -> list:
+    return client.get("/api/v1/slides", headers=headers).json()
+
+
+def test_batch_resolves_references(client, headers):
+    operations = [
+        {"path": "/api/v1/slide/blank"},
+        {"path": "/api/v1/slide/$0.slide_id/text_box", "body": {"text": "Hello"}}
+    ]
+    result = client.post("/api/v2/batch", json={"operations": operations}, headers=headers).json()
+    assert result["status"] == "ok" and result["operations"] == 2, result
+    slide_id = result["results"][0]["slide_id"]
+    shapes = client.get(f"/api/v1/slide/{slide_id}/shapes", headers=headers).json()
+    assert "Hello" in str(shapes)
+
+
+def test_failed_batch_rolls_back_deck_and_history(client, headers):
+    slide_id = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    client.post(f"/api/v1/slide/{slide_id}/text_box", json={"text": "Kept"}, headers=headers)
+    slides = _slides(client, headers)
+    before = _history(client, headers)
+
+    operations = [
+        {"path": "/api/v1/slide/blank"},
+        {"path": "/api/v1/slide/$0.slide_id/text_box", "body": {"text": "Dropped"}},
+        {"path": f"/api/v1/slide/{slide_id}/text_box", "body": {"text": "Dropped too"}},
+        {"path": "/api/v1/slide/missing/text_box", "body": {"text": "Fails"}}
+    ]
+    result = client.post("/api/v2/batch", json={"operations": operations}, headers=headers).json()
+    assert result["status"] == "error" and result["failed_operation"] == 3 and result["rolled_back"], result
+
+    assert _slides(client, headers) == slides
+    after = _history(client, headers)
+    # The nested operations' revisions are gone; the number still moves forward
+    assert after["revisions"] == before["revisions"]
+    assert after["revision"] > before["revision"]
+
+    # Diffs against the rolled-back revision show the deck unchanged
+    diff = client.get("/api/v2/history/diff", params={"from_revision": before["revision"]}, headers=headers).json()
+    assert diff["added"] == diff["removed"] == diff["changed"] == []
+
+    client.post(f"/api/v1/slide/{slide_id}/text_box", json={"text": "Next"}, headers=headers)
+    assert _history(client, headers)["revisions"][-1]["revision"] == after["revision"] + 1
@@ -0,0 +1,37 @@
+import pytest
+
+from app.state.slide_index import SlideIndex
+from app.utils.bulk_components import validate_component_items
+
+
+@pytest.fixture
+def slide_map():
+    slide_map = SlideIndex()
+    slide_map.append("first", object())
+    slide_map.append("second", object())
+    return slide_map
+
+
+@pytest.mark.parametrize("number", [True, False, 1.0, "1", [1]])
+def test_slide_number_must_be_an_integer(slide_map, number):
+    items = [{"slide_number": number, "component_type": "callout_box", "content": {}}]
+    normalized, error = validate_component_items(items, slide_map)
+    assert normalized is None
+    assert error == f"Item 0: slide_number must be an integer, got {number!r}"
+
+
+def test_slide_number_must_be_in_range(slide_map):
+    items = [{"slide_number": 3, "component_type": "callout_box"}]
+    assert validate_component_items(items, slide_map) == (None, "Item 0: invalid slide number. Valid range is 1-2")
+
+    items = [{"slide_number": 2, "component_type": "callout_box"}]
+    normalized, error = validate_component_items(items, slide_map)
+    assert error is None
+    assert normalized == [{"ref": "slide_number", "slide": 2, "component_type": "callout_box", "content": {}}]
+
+
+def test_bulk_render_rejects_bool_slide_numbers(client, headers):
+    client.post("/api/v1/slide/blank", headers=headers)
+    items = [{"slide_number": True, "component_type": "callout_box", "content": {"message": "Hi"}}]
+    result = client.post("/api/v2/slides/components", json={"items": items}, headers=headers).json()
+    assert result == {"error": "Item 0: slide_number must be an integer, got True"}
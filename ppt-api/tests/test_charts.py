@@ -0,0 +1,86 @@
+import io
+
+import numpy as np
+import pytest
+from pptx import Presentation
+
+from app.components.charts import OTHER_LABEL, chart_columns, grid_thin, group_categories, lttb, min_max_buckets
+
+
+def test_lttb_keeps_the_ends_and_the_peak():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[537] = 50.0
+    keep = lttb(x, y, 20)
+    assert len(keep) == 20
+    assert keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    assert 537 in keep
+
+
+def test_lttb_returns_short_series_whole():
+    x = np.arange(10, dtype=float)
+    assert lttb(x, x, 10).tolist() == list(range(10))
+    assert lttb(x, x, 2).tolist() == list(range(10))
+
+
+def test_min_max_buckets_keep_every_spike():
+    y = np.sin(np.arange(10000) / 50.0)
+    y[1234], y[8765] = 10.0, -10.0
+    keep = min_max_buckets(y, 100)
+    assert len(keep) <= 100
+    assert {0, 9999, 1234, 8765} <= set(keep.tolist())
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_grid_thin_keeps_outliers_within_the_budget():
+    rng = np.random.default_rng(0)
+    x = np.concatenate([rng.normal(0, 1, 20000), [100.0]])
+    y = np.concatenate([rng.normal(0, 1, 20000), [-100.0]])
+    keep = grid_thin(x, y, 500)
+    assert 100 < len(keep) <= 500
+    assert 20000 in keep
+    assert len(np.unique(keep)) == len(keep)
+    assert grid_thin(x[:10], y[:10], 500).tolist() == list(range(10))
+
+
+def test_group_categories_combines_rows_in_first_appearance_order():
+    labels = ["b", "a", "b", "c", "a"]
+    values = np.array([1.0, 2.0, 3.0, np.nan, 4.0])
+    grouped, [sums] = group_categories(labels, [values], 10, "sum")
+    assert grouped == ["b", "a", "c"]
+    assert sums[:2].tolist() == [4.0, 6.0] and np.isnan(sums[2])
+
+    grouped, [means] = group_categories(labels, [values], 10, "mean")
+    assert means[:2].tolist() == [2.0, 3.0] and np.isnan(means[2])
+
+
+def test_group_categories_folds_the_smallest_into_other():
+    labels = ["a", "b", "c", "d", "e"]
+    values = np.array([5.0, 1.0, 9.0, 2.0, 7.0])
+    grouped, [sums] = group_categories(labels, [values], 3, "sum")
+    assert grouped == ["c", "e", OTHER_LABEL]
+    assert sums.tolist() == [9.0, 7.0, 8.0]
+
+
+def test_chart_columns_accepts_rows_and_pads_short_columns():
+    assert chart_columns([["x", "y"], [1, 2], [3]]) == (["x", "y"], [[1, 3], [2, None]])
+    assert chart_columns({"x": [1, 2, 3], "y": [4]}) == (["x", "y"], [[1, 2, 3], [4, None, None]])
+    with pytest.raises(ValueError):
+        chart_columns({"x": [1, 2]})
+
+
+def test_line_chart_embeds_at_most_max_points(client, headers):
+    slide_id = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    x = list(range(20000))
+    content = {"data": {"t": x, "a": np.sin(np.arange(20000) / 300.0).tolist(), "b": [v % 97 for v in x]}, "max_points": 400}
+    result = client.post(f"/api/v1/slide/{slide_id}/component",
+                         json={"component_type": "line_chart", "content": content}, headers=headers).json()
+    assert result["status"] == "ok", result
+
+    prs = Presentation(io.BytesIO(client.get("/api/v2/presentation", headers=headers).content))
+    chart = next(shape.chart for shape in prs.slides[0].shapes if shape.has_chart)
+    categories = list(chart.plots[0].categories)
+    assert 3 <= len(categories) <= 400
+    assert categories[0] == "0" and categories[-1] == "19999"
+    assert [len(series.values) for series in chart.plots[0].series] == [len(categories)] * 2
@@ -0,0 +1,27 @@
+import pytest
+
+from app.components.charts import ChartComponent
+from app.components.registry import COMPONENTS
+from app.components.templates import TemplateComponent
+
+
+def test_registered_components_are_complete():
+    for component_type, component_class in COMPONENTS.items():
+        assert component_class() is not None, component_type
+
+
+def test_template_component_needs_prototypes():
+    class Incomplete(TemplateComponent):
+        def render(self, slide, content):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_chart_component_needs_chart_data():
+    class Incomplete(ChartComponent):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
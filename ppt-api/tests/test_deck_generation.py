@@ -0,0 +1,119 @@
+import hashlib
+import io
+import re
+import zipfile
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+
+import app.utils.deck_generation as deck_generation
+from app.packaging.merge import MergeError
+
+_RIDS = re.compile(rb'r:(id|embed|link)="rId\d+"')
+
+
+def _outline(image_path, slides=40):
+    outline = [{"type": "title", "title": "Deck", "subtitle": "Generated"}]
+    for idx in range(slides):
+        if idx % 2 == 0:
+            outline.append({"type": "components", "layout": 6, "components": [
+                # The same data on every chart: their workbooks are byte-identical
+                {"component_type": "bar_chart", "content": {"data": {"Region": ["EMEA", "APAC"], "Revenue": [4.1, 3.2]}}}
+            ]})
+        else:
+            outline.append({"type": "components", "components": [
+                {"component_type": "header_with_image", "content": {"title": f"Slide {idx}", "image_path": image_path}}
+            ]})
+    return outline
+
+
+def _digest(part, seen=None) -> tuple:
+    """A part's content type and content, and those of the parts it relates to, regardless of partnames and rIds"""
+    seen = seen if seen is not None else set()
+    seen.add(part)
+    related = sorted(
+        (rel.reltype, _digest(rel.target_part, seen))
+        for rel in part.rels
+        if not rel.is_external and rel.target_part not in seen and rel.reltype.rsplit("/", 1)[-1] != "slideLayout"
+    )
+    return part.content_type, _content_digest(part), tuple(related)
+
+
+def _content_digest(part) -> str:
+    if part.content_type.endswith("spreadsheetml.sheet"):
+        # Workbooks carry their creation time in docProps; compare the data
+        with zipfile.ZipFile(io.BytesIO(part.blob)) as workbook:
+            blob = b"".join(workbook.read(name) for name in sorted(workbook.namelist()) if not name.startswith("docProps/"))
+    else:
+        blob = _RIDS.sub(b"", part.blob)
+    return hashlib.sha1(blob).hexdigest()
+
+
+def _generate(client, headers, outline, workers, monkeypatch):
+    monkeypatch.setattr(deck_generation, "GENERATION_WORKERS", workers)
+    monkeypatch.setattr(deck_generation, "GENERATION_CHUNK_SLIDES", 4)
+    result = client.post("/api/v2/presentation/generate", json={"slides": outline}, headers=headers).json()
+    assert result["status"] == "ok", result
+    assert result["workers"] == min(workers, result["chunks"])
+    return Presentation(io.BytesIO(client.get("/api/v2/presentation", headers=headers).content))
+
+
+@pytest.fixture(scope="module")
+def image_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("images") / "logo.png"
+    Image.new("RGB", (40, 30), (200, 10, 10)).save(path)
+    return str(path)
+
+
+def test_parallel_generation_builds_the_same_package(client, image_path, monkeypatch):
+    outline = _outline(image_path)
+    inline = _generate(client, {"X-Session-Id": "generation-inline"}, outline, 0, monkeypatch)
+    parallel = _generate(client, {"X-Session-Id": "generation-parallel"}, outline, 2, monkeypatch)
+
+    assert [_digest(slide.part) for slide in parallel.slides] == [_digest(slide.part) for slide in inline.slides]
+    content_types = lambda prs: sorted(part.content_type for part in prs.part.package.iter_parts())
+    assert content_types(parallel) == content_types(inline)
+
+
+def test_parallel_generation_gives_every_chart_its_own_workbook(client, image_path, monkeypatch):
+    prs = _generate(client, {"X-Session-Id": "generation-workbooks"}, _outline(image_path), 2, monkeypatch)
+    charts = [shape.chart for slide in prs.slides for shape in slide.shapes if shape.has_chart]
+    workbooks = {chart.part.chart_workbook.xlsx_part for chart in charts}
+    assert len(charts) == 20 and len(workbooks) == 20
+
+    # Pictures are still shared
+    images = [part for part in prs.part.package.iter_parts() if part.partname.startswith("/ppt/media/")]
+    assert len(images) == 1
+
+    untouched = charts[1].part.chart_workbook.xlsx_part.blob
+    chart_data = CategoryChartData()
+    chart_data.categories = ["A", "B", "C"]
+    chart_data.add_series("Changed", (1, 2, 3))
+    charts[0].replace_data(chart_data)
+    assert charts[1].part.chart_workbook.xlsx_part.blob == untouched
+
+
+def test_parallel_generation_adds_no_slide_when_a_chunk_fails_to_import(client, image_path, monkeypatch):
+    headers = {"X-Session-Id": "generation-merge-error"}
+    client.post("/api/v1/slide/blank", headers=headers)
+    monkeypatch.setattr(deck_generation, "GENERATION_WORKERS", 2)
+    monkeypatch.setattr(deck_generation, "GENERATION_CHUNK_SLIDES", 4)
+    real_add = deck_generation.SlideImporter.add
+    calls = []
+
+    def add(importer, chunk):
+        calls.append(chunk)
+        if len(calls) == 3:
+            raise MergeError("Slide layout 1/9 does not exist in this presentation")
+        return real_add(importer, chunk)
+
+    monkeypatch.setattr(deck_generation.SlideImporter, "add", add)
+    result = client.post("/api/v2/presentation/generate", json={"slides": _outline(image_path)}, headers=headers).json()
+    assert "does not exist" in result["error"]
+    assert len(calls) == 3
+
+    prs = Presentation(io.BytesIO(client.get("/api/v2/presentation", headers=headers).content))
+    assert len(prs.slides) == 1
+    assert len(client.get("/api/v1/slides", headers=headers).json()["slide_ids"]) == 1
@@ -0,0 +1,43 @@
+import base64
+import hashlib
+import io
+import zipfile
+
+
+def _members(client, headers) -> dict:
+    package = client.get("/api/v2/presentation", headers=headers).content
+    with zipfile.ZipFile(io.BytesIO(package)) as zf:
+        return {f"/{name}": zf.read(name) for name in zf.namelist()}
+
+
+def _sync(client, headers, members) -> dict:
+    manifest = {name: hashlib.sha256(blob).hexdigest() for name, blob in members.items()}
+    needed = client.post("/api/v2/presentation/delta/manifest", json={"parts": manifest}, headers=headers).json()["needed"]
+    parts = {name: base64.b64encode(members[name]).decode() for name in needed}
+    return client.post("/api/v2/presentation/delta/apply", json={"manifest": manifest, "parts": parts}, headers=headers).json()
+
+
+def _history(client, headers) -> dict:
+    return client.get("/api/v2/history", headers=headers).json()
+
+
+def test_delta_apply_bumps_the_revision_once(client, headers):
+    slide_id = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    client.post(f"/api/v1/slide/{slide_id}/text_box", json={"text": "Original"}, headers=headers)
+    members = _members(client, headers)
+
+    before = _history(client, headers)
+    result = _sync(client, headers, members)
+    assert result["mode"] == "rebuilt" and result["slide_ids"] == [slide_id], result
+    rebuilt = _history(client, headers)
+    assert rebuilt["revision"] == before["revision"] + 1
+
+    members["/ppt/slides/slide1.xml"] = members["/ppt/slides/slide1.xml"].replace(b"Original", b"Edited")
+    result = _sync(client, headers, members)
+    assert result["mode"] == "patched" and result["parts_received"] == 1, result
+    patched = _history(client, headers)
+    assert patched["revision"] == rebuilt["revision"] + 1
+    assert patched["revisions"][-1]["label"] == "delta_apply"
+
+    assert _sync(client, headers, members)["mode"] == "unchanged"
+    assert _history(client, headers)["revision"] == patched["revision"]
@@ -0,0 +1,29 @@
+from app.packaging.export import content_disposition
+
+
+def test_content_disposition_keeps_plain_names():
+    assert content_disposition("Q3 review.pptx") == 'attachment; filename="Q3 review.pptx"'
+
+
+def test_content_disposition_cannot_break_out_of_the_header():
+    header = content_disposition('a"b\r\nSet-Cookie: x=1.pptx')
+    assert "\r" not in header and "\n" not in header
+    assert header == ('attachment; filename="a_bSet-Cookie: x=1.pptx"; '
+                      "filename*=UTF-8''a%22bSet-Cookie%3A%20x%3D1.pptx")
+
+
+def test_content_disposition_encodes_non_ascii_names():
+    header = content_disposition("Überblick 日本.pptx")
+    header.encode("latin-1")
+    assert header == ('attachment; filename="_berblick __.pptx"; '
+                      "filename*=UTF-8''%C3%9Cberblick%20%E6%97%A5%E6%9C%AC.pptx")
+    assert content_disposition("\r\n") == 'attachment; filename="presentation.pptx"'
+
+
+def test_download_sanitizes_the_filename(client, headers):
+    response = client.get("/api/v2/presentation", params={"filename": 'deck"\r\nX-Evil: 1 é.pptx'}, headers=headers)
+    assert response.status_code == 200
+    assert "x-evil" not in response.headers
+    assert response.headers["content-disposition"] == (
+        'attachment; filename="deck_X-Evil: 1 _.pptx"; filename*=UTF-8\'\'deck%22X-Evil%3A%201%20%C3%A9.pptx'
+    )
@@ -0,0 +1,31 @@
+import numpy as np
+
+from app.utils.geometry_analysis import canonical_geometry, cluster_labels
+
+
+def test_cluster_labels_split_on_gaps_larger_than_the_tolerance():
+    values = np.array([1000, 149, 151, 1090, 140, 160], dtype=np.int64)
+    assert cluster_labels(values, 100).tolist() == [1, 0, 0, 1, 0, 0]
+    assert cluster_labels(values, 0).tolist() == [4, 1, 2, 5, 0, 3]
+
+
+def test_boxes_straddling_a_grid_line_stay_together():
+    # 149/151 would land in different cells of a 100 EMU grid
+    geometry = np.array([[140, 500], [149, 500], [151, 500], [160, 500], [1000, 500], [1000, 500]], dtype=np.int64)
+    canonical, cluster_size = canonical_geometry(geometry, 100)
+    assert cluster_size == 4
+    assert canonical.tolist() == [150, 500]
+
+
+def test_every_field_must_agree():
+    geometry = np.array([[0, 0], [10, 0], [0, 5000], [10, 5000], [20, 5000]], dtype=np.int64)
+    canonical, cluster_size = canonical_geometry(geometry, 50)
+    assert cluster_size == 3
+    assert canonical.tolist() == [10, 5000]
+
+
+def test_no_agreement_falls_back_to_the_median():
+    geometry = np.array([[0, 0], [1000, 1000], [3000, 3000]], dtype=np.int64)
+    canonical, cluster_size = canonical_geometry(geometry, 10)
+    assert cluster_size == 1
+    assert canonical.tolist() == [1000, 1000]
@@ -0,0 +1,73 @@
+import io
+
+from pptx import Presentation
+
+import app.packaging.ingest as ingest
+from app.state.parse_cache import copy_deck
+
+PPTX_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+def _package(titles) -> bytes:
+    prs = Presentation()
+    for title in titles:
+        prs.slides.add_slide(prs.slide_layouts[1]).shapes.title.text = title
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def _upload(client, headers, data) -> dict:
+    result = client.put("/api/v2/presentation", content=data, headers={**headers, "Content-Type": PPTX_TYPE}).json()
+    assert result["status"] == "ok", result
+    return result
+
+
+def _titles(client, headers) -> list:
+    prs = Presentation(io.BytesIO(client.get("/api/v2/presentation", headers=headers).content))
+    return [slide.shapes.title.text for slide in prs.slides]
+
+
+def test_reupload_after_edit_skips_the_parse(client, headers):
+    data = _package(["Parse cache A", "Parse cache B"])
+    assert _upload(client, headers, data)["parse_skipped"] is False
+    slide_id = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    client.post(f"/api/v1/slide/{slide_id}/text_box", json={"text": "Edit"}, headers=headers)
+
+    assert _upload(client, headers, data)["parse_skipped"] is True
+    assert _titles(client, headers) == ["Parse cache A", "Parse cache B"]
+
+    # Editing the copy leaves the cached deck untouched for the next upload
+    client.post("/api/v1/slide/blank", headers=headers)
+    other = {"X-Session-Id": headers["X-Session-Id"] + "-other"}
+    assert _upload(client, other, data)["parse_skipped"] is True
+    assert _titles(client, other) == ["Parse cache A", "Parse cache B"]
+
+
+def test_package_is_parsed_outside_the_write_lock(client, headers, monkeypatch):
+    session = client.app.state.sessions.acquire(headers["X-Session-Id"])
+    client.app.state.sessions.release(session)
+    writers = []
+
+    def parse(package):
+        writers.append(session.lock._writer)
+        return Presentation(package)
+
+    monkeypatch.setattr(ingest, "Presentation", parse)
+    _upload(client, headers, _package(["Outside the lock"]))
+    assert writers == [None]
+    assert _titles(client, headers) == ["Outside the lock"]
+
+
+def test_copy_deck_drops_the_source_file(tmp_path):
+    path = tmp_path / "deck.pptx"
+    path.write_bytes(_package(["From a file"]))
+    with open(path, "rb") as f:
+        prs = Presentation(f)
+        copied = copy_deck(prs)
+    assert copied.part.package._pkg_file is None
+    copied.slides[0].shapes.title.text = "Changed"
+    assert prs.slides[0].shapes.title.text == "From a file"
+    buffer = io.BytesIO()
+    copied.save(buffer)
+    assert Presentation(buffer).slides[0].shapes.title.text == "Changed"
@@ -0,0 +1,68 @@
+import threading
+
+from app.config import CHECKPOINT_EVERY_OPS, JOURNAL_DIR
+from app.state.journal import SessionJournal, _checkpoint_executor
+from app.state.session import PresentationSession
+
+
+def _texts(session) -> list:
+    return [
+        [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+        for slide in session.slide_map.values()
+    ]
+
+
+def test_journal_logs_only_successful_operations(client, headers):
+    slide_id = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    client.post(f"/api/v1/slide/{slide_id}/text_box", json={"text": "Kept"}, headers=headers)
+    client.post("/api/v1/slide/missing/text_box", json={"text": "Lost"}, headers=headers)
+    client.post("/api/v2/theme/apply", json={"theme": "no-such-theme"}, headers=headers)
+
+    journal = SessionJournal(JOURNAL_DIR, headers["X-Session-Id"], CHECKPOINT_EVERY_OPS)
+    _, _, entries = journal.recovery_plan()
+    assert [entry["endpoint"] for entry in entries] == ["create_blank_slide", "add_text_box"]
+    assert entries[0]["ids"] == [slide_id]
+
+
+def test_journal_replay_rebuilds_the_deck(client, headers):
+    first = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    second = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    client.post(f"/api/v1/slide/{first}/text_box", json={"text": "First"}, headers=headers)
+    client.post(f"/api/v1/slide/{second}/text_box", json={"text": "Second"}, headers=headers)
+    client.post(f"/api/v2/slide/{second}/move", json={"position": 1}, headers=headers)
+    live = client.app.state.sessions._sessions[headers["X-Session-Id"]]
+
+    recovered = PresentationSession(headers["X-Session-Id"])
+    recovered.journal = SessionJournal(JOURNAL_DIR, headers["X-Session-Id"], CHECKPOINT_EVERY_OPS)
+    recovered.ensure_loaded("/nonexistent", client.app.state.sessions.replay)
+
+    assert list(recovered.slide_map.keys()) == list(live.slide_map.keys()) == [second, first]
+    assert _texts(recovered) == _texts(live)
+
+
+def test_upload_is_durable_before_later_operations_are_logged(client, headers):
+    # A deck with two titled slides to upload
+    source = {"X-Session-Id": headers["X-Session-Id"] + "-source"}
+    for title in ("Uploaded one", "Uploaded two"):
+        slide_id = client.post("/api/v1/slide", headers=source).json()["slide_id"]
+        client.post(f"/api/v1/slide/{slide_id}/title", json={"text": title}, headers=source)
+    package = client.get("/api/v2/presentation", headers=source).content
+
+    client.post("/api/v1/slide/blank", headers=headers)
+    # Background checkpoints never land: as if the process died right after responding
+    stalled = threading.Event()
+    _checkpoint_executor.submit(stalled.wait)
+    try:
+        slide_ids = client.put("/api/v2/presentation", content=package, headers=headers).json()["slide_ids"]
+        client.post(f"/api/v1/slide/{slide_ids[1]}/text_box", json={"text": "After upload"}, headers=headers)
+
+        recovered = PresentationSession(headers["X-Session-Id"])
+        recovered.journal = SessionJournal(JOURNAL_DIR, headers["X-Session-Id"], CHECKPOINT_EVERY_OPS)
+        recovered.ensure_loaded("/nonexistent", client.app.state.sessions.replay)
+    finally:
+        stalled.set()
+
+    live = client.app.state.sessions._sessions[headers["X-Session-Id"]]
+    assert list(recovered.slide_map.keys()) == slide_ids
+    assert _texts(recovered) == _texts(live)
+    assert any("After upload" in text for text in _texts(recovered)[1])
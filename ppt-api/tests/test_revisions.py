@@ -0,0 +1,76 @@
+from pptx import Presentation
+from pptx.util import Inches
+
+from app.state.history import RevisionHistory
+from app.state.slide_index import SlideIndex
+from app.utils.deck_diff import shape_table
+
+
+def _history(client, headers) -> dict:
+    return client.get("/api/v2/history", headers=headers).json()
+
+
+def test_failed_calls_do_not_create_revisions(client, headers):
+    slide_id = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    before = _history(client, headers)
+
+    result = client.post("/api/v1/slide/missing/text_box", json={"text": "Nowhere"}, headers=headers).json()
+    assert result == {"error": "slide not found"}
+    result = client.post("/api/v2/theme/apply", json={"theme": "no-such-theme"}, headers=headers).json()
+    assert "error" in result
+    assert _history(client, headers) == before
+
+    client.post(f"/api/v1/slide/{slide_id}/text_box", json={"text": "Somewhere"}, headers=headers)
+    after = _history(client, headers)
+    assert after["revision"] == before["revision"] + 1
+    assert after["revisions"][-1]["label"] == "add_text_box"
+
+
+def test_shape_diff_reports_changed_shapes(client, headers):
+    slide_id = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    client.post(f"/api/v1/slide/{slide_id}/text_box", json={"text": "Draft"}, headers=headers)
+    start = _history(client, headers)["revision"]
+    client.post(f"/api/v1/slide/{slide_id}/text_box", json={"text": "Added", "top": 3}, headers=headers)
+
+    diff = client.get("/api/v2/history/diff/shapes", params={"from_revision": start}, headers=headers).json()
+    assert diff["shapes_added"] == 1 and diff["shapes_removed"] == 0 and diff["shapes_modified"] == 0
+    [slide] = diff["slides_changed"]
+    assert slide["slide_id"] == slide_id and slide["added"][0]["text"].strip() == "Added"
+    # Diffing again reuses the cached shape tables
+    again = client.get("/api/v2/history/diff/shapes", params={"from_revision": start}, headers=headers).json()
+    assert again == diff
+
+
+def test_shape_tables_are_counted_and_dropped_with_their_xml():
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    slide_map = SlideIndex()
+    slide_map.append("s1", slide)
+    history = RevisionHistory(max_revisions=2)
+
+    history.record(1, slide_map)
+    first = history.latest()
+    xml_bytes = history.nbytes
+    table = history.derived(first.digests()["s1"], shape_table)
+    assert history.derived(first.digests()["s1"], shape_table) is table
+    assert history.nbytes == 2 * xml_bytes
+
+    for number in (2, 3):
+        slide.shapes.add_textbox(0, 0, Inches(1), Inches(1)).text_frame.text = f"Revision {number}"
+        history.record(number, slide_map)
+    # Revision 1 fell out of the history, and its XML and shape table with it
+    assert history.get(1) is None
+    assert history.nbytes == sum(len(history.slide_xml(revision, "s1")) for revision in (history.get(2), history.get(3)))
+
+
+def test_reset_records_one_revision(client, headers):
+    client.post("/api/v1/slide/blank", headers=headers)
+    before = _history(client, headers)
+
+    result = client.post("/api/v1/presentation/reset", headers=headers).json()
+    assert result["status"] == "ok"
+    after = _history(client, headers)
+    assert after["revision"] == before["revision"] + 1
+    latest = after["revisions"][-1]
+    assert (latest["revision"], latest["label"], latest["slide_count"]) == (after["revision"], "reset", 0)
+    assert len(after["revisions"]) == len(before["revisions"]) + 1
@@ -0,0 +1,90 @@
+import os
+import time
+
+import pytest
+
+from app.state.shared import DiskBackend, LeaseLost, LeaseUnavailable, SQLiteBackend, StateBackend
+from app.state.store import SessionStore
+
+
+@pytest.fixture(params=["disk", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "disk":
+        return DiskBackend(str(tmp_path))
+    return SQLiteBackend(str(tmp_path / "state.db"))
+
+
+def test_lease_excludes_other_workers_until_released(backend):
+    assert backend.try_lease("deck", "a", ttl=30) is None
+    assert backend.try_lease("deck", "a", ttl=30) is None
+    assert backend.try_lease("deck", "b", ttl=30) == "a"
+    with pytest.raises(LeaseUnavailable):
+        backend.acquire_lease("deck", "b", ttl=30, wait=0.05)
+
+    backend.release_lease("deck", "b")
+    assert backend.try_lease("deck", "b", ttl=30) == "a"
+    backend.release_lease("deck", "a")
+    assert backend.try_lease("deck", "b", ttl=30) is None
+
+
+def test_expired_lease_is_taken_over(backend):
+    assert backend.try_lease("deck", "a", ttl=-1) is None
+    assert backend.try_lease("deck", "b", ttl=30) is None
+    assert backend.publish("deck", "a", b"stale", {}) is None
+
+
+def test_publish_needs_the_lease_and_bumps_the_generation(backend):
+    assert backend.generation("deck") == 0 and backend.fetch("deck") is None
+    assert backend.publish("deck", "a", b"v1", {"n": 1}) is None
+
+    backend.try_lease("deck", "a", ttl=30)
+    assert backend.publish("deck", "a", b"v1", {"n": 1}) == 1
+    assert backend.publish("deck", "a", b"v2", {"n": 2}) == 2
+    assert backend.generation("deck") == 2
+    assert backend.fetch("deck") == (2, b"v2", {"n": 2})
+
+
+def test_disk_lease_is_replaced_atomically(tmp_path):
+    backend = DiskBackend(str(tmp_path))
+    backend.try_lease("deck", "a", ttl=30)
+    lease_path = backend._base("deck") + ".lease"
+    assert not os.path.exists(lease_path + ".tmp")
+
+    # A torn lease file is no one's lease
+    with open(lease_path, "w", encoding="utf-8") as f:
+        f.write('{"owner": "a", "exp')
+    assert backend.try_lease("deck", "b", ttl=30) is None
+    assert backend.publish("deck", "a", b"v1", {}) is None
+    assert backend.publish("deck", "b", b"v1", {}) == 1
+
+
+def test_backends_must_implement_the_lease_and_package_methods():
+    with pytest.raises(TypeError):
+        StateBackend()
+
+
+def test_store_renews_leases_of_sessions_in_use(backend, tmp_path):
+    store = SessionStore(1 << 30, str(tmp_path / "spill"), backend=backend, lease_ttl=0.3, lease_wait=0.05)
+    session = store.acquire("deck")
+    time.sleep(1.0)
+    assert backend.try_lease("deck", "other", ttl=30) == store.worker_id
+    store.publish(session)
+    store.release(session)
+    assert backend.try_lease("deck", "other", ttl=30) is None
+
+
+def test_lost_lease_fails_the_publish(backend, tmp_path):
+    from app.api.v1 import routes as v1
+    store = SessionStore(1 << 30, str(tmp_path / "spill"), backend=backend)
+    session = store.acquire("deck")
+    v1.create_slide(layout=1, session=session)
+
+    # The lease lapses and another worker takes the session over
+    backend.release_lease("deck", store.worker_id)
+    backend.try_lease("deck", "other", ttl=30)
+    with pytest.raises(LeaseLost):
+        store.publish(session)
+    with pytest.raises(LeaseUnavailable):
+        store.acquire("deck")
+    store.release(session)
+    assert backend.fetch("deck") is None
@@ -0,0 +1,35 @@
+import io
+
+import pytest
+from pptx import Presentation
+from pptx.util import Inches
+
+from app.components.tables import BulkTable
+
+
+@pytest.mark.parametrize("font_size", ["12", True, -5, 0.5, 0, 4001, float("nan"), [12]])
+def test_font_size_must_be_in_range(font_size):
+    with pytest.raises(ValueError):
+        BulkTable([["a", "b"]], Inches(4), font_size=font_size)
+
+
+def test_font_size_sets_every_cell(client, headers):
+    slide_id = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    content = {"data": [["Region", "Revenue"], ["EMEA", 4.1]], "font_size": 10.5}
+    result = client.post(f"/api/v1/slide/{slide_id}/component",
+                         json={"component_type": "comparison_table", "content": content}, headers=headers).json()
+    assert result["status"] == "ok", result
+
+    prs = Presentation(io.BytesIO(client.get("/api/v2/presentation", headers=headers).content))
+    table = next(shape.table for shape in prs.slides[0].shapes if shape.has_table)
+    sizes = {run.font.size.pt for row in table.rows for cell in row.cells
+             for paragraph in cell.text_frame.paragraphs for run in paragraph.runs}
+    assert sizes == {10.5}
+
+
+def test_invalid_font_size_is_reported(client, headers):
+    slide_id = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    content = {"data": [["Region", "Revenue"], ["EMEA", 4.1]], "font_size": "12"}
+    result = client.post(f"/api/v1/slide/{slide_id}/component",
+                         json={"component_type": "comparison_table", "content": content}, headers=headers).json()
+    assert result == {"error": "font_size must be a number of points from 1 to 4000"}
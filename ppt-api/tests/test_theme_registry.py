@@ -0,0 +1,63 @@
+import threading
+
+from app.themes.registry import BUILTIN_THEME_ORDER, THEMES
+
+
+def _define(client, key, body_size):
+    definition = {"name": key.title(), "styles": {"body": {"font_size": body_size}}}
+    result = client.post(f"/api/v2/themes/{key}", json=definition).json()
+    assert result["status"] == "ok", result
+
+
+def test_themes_are_listed_in_declaration_order(client):
+    _define(client, "zz-listed", 18)
+    _define(client, "aa-listed", 18)
+    themes = client.get("/api/v1/themes").json()["themes"]
+    assert themes[:len(BUILTIN_THEME_ORDER)] == list(BUILTIN_THEME_ORDER)
+    assert themes.index("zz-listed") < themes.index("aa-listed")
+
+    # Redefining a theme keeps its place
+    _define(client, "zz-listed", 20)
+    assert client.get("/api/v1/themes").json()["themes"] == themes
+
+
+def test_reload_swaps_in_a_new_theme(client, headers):
+    # Sizes no other style uses, so the text can only be matched as body
+    _define(client, "reloaded", 17)
+    original = THEMES["reloaded"]
+    client.post("/api/v1/theme", json={"theme_name": "reloaded"}, headers=headers)
+    slide_id = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    client.post(f"/api/v1/slide/{slide_id}/text_box", json={"text": "Before"}, headers=headers)
+
+    _define(client, "reloaded", 31)
+    # The loaded Theme is left alone; sessions follow the key to the new one
+    assert original.get_style("body").font_size == 17
+    assert THEMES["reloaded"] is not original
+    session = client.app.state.sessions._sessions[headers["X-Session-Id"]]
+    assert session.current_theme is THEMES["reloaded"]
+    client.post(f"/api/v1/slide/{slide_id}/text_box", json={"text": "After"}, headers=headers)
+
+    # Text styled with the replaced definition is still recognised as body
+    result = client.post("/api/v2/theme/apply", json={"theme": "default"}, headers=headers).json()
+    assert result["by_style"]["body"] == 2, result
+
+
+def test_reload_while_reading_themes(client):
+    _define(client, "churned", 18)
+    errors = []
+
+    def read():
+        for _ in range(2000):
+            try:
+                assert THEMES["churned"].get_style("body").font_size in (18, 19, 20, 21)
+                THEMES.versions()
+            except Exception as e:
+                errors.append(e)
+                return
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for size in (19, 20, 21):
+        _define(client, "churned", size)
+    reader.join()
+    assert not errors
@@ -0,0 +1,55 @@
+import io
+
+from pptx import Presentation
+
+
+def _sizes(client, headers) -> dict:
+    """Font size (points) of each text paragraph of the first slide, by its text"""
+    prs = Presentation(io.BytesIO(client.get("/api/v2/presentation", headers=headers).content))
+    sizes = {}
+    for shape in prs.slides[0].shapes:
+        if not shape.has_text_frame:
+            continue
+        for paragraph in shape.text_frame.paragraphs:
+            if paragraph.text:
+                sizes[paragraph.text] = paragraph.font.size.pt if paragraph.font.size is not None else None
+    return sizes
+
+
+def _component(client, headers, slide_id, component_type, content):
+    result = client.post(f"/api/v1/slide/{slide_id}/component",
+                         json={"component_type": component_type, "content": content}, headers=headers).json()
+    assert result["status"] == "ok", result
+
+
+def test_theme_switch_keeps_component_text_sizes(client, headers):
+    slide_id = client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"]
+    _component(client, headers, slide_id, "statistic_highlight", {"value": "87%", "label": "Retention"})
+    _component(client, headers, slide_id, "quote_block", {"quote": "Less is more", "author": "Mies"})
+    _component(client, headers, slide_id, "callout_box", {"message": "Key point"})
+    result = client.post(f"/api/v1/slide/{slide_id}/text_box", json={"text": "Plain body"}, headers=headers).json()
+    assert result["status"] == "ok"
+    before = _sizes(client, headers)
+
+    result = client.post("/api/v2/theme/apply", json={"theme": "pitchbook"}, headers=headers).json()
+    assert result["status"] == "ok", result
+    after = _sizes(client, headers)
+
+    # Component text matches no theme style and keeps its formatting
+    size = lambda sizes, text: next(pt for key, pt in sizes.items() if text in key)
+    for text in ("87%", "Retention", "Less is more", "Mies", "Key point"):
+        assert size(after, text) == size(before, text), text
+    assert [size(before, text) for text in ("87%", "Less is more", "Key point")] == [48, 24, 20]
+    # Body text follows the new theme
+    assert size(after, "Plain body") == 16
+    assert result["by_style"]["body"] == 1
+
+
+def test_partial_theme_switch_keeps_deck_theme(client, headers):
+    slide_ids = [client.post("/api/v1/slide/blank", headers=headers).json()["slide_id"] for _ in range(2)]
+    result = client.post("/api/v2/theme/apply", json={"theme": "pitchbook", "slide_numbers": [2]}, headers=headers).json()
+    assert result["status"] == "ok" and result["slides_restyled"] == 1, result
+
+    # Text added afterwards still gets the deck's theme (default: 18pt body)
+    client.post(f"/api/v1/slide/{slide_ids[0]}/text_box", json={"text": "Added later"}, headers=headers)
+    assert _sizes(client, headers)["Added later"] == 18